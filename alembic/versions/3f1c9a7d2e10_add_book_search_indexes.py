@@ -0,0 +1,54 @@
+"""Add book full-text search indexes
+
+Revision ID: 3f1c9a7d2e10
+Revises: bd2b69fd0783
+Create Date: 2026-10-19 09:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2e10'
+down_revision = 'bd2b69fd0783'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # unaccent() is only STABLE; an IMMUTABLE wrapper can be used in index expressions
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent', $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+
+    # Weighted Portuguese document: title (A) > author (B) > publisher (C)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION books_search_document(title text, author text, publisher text)
+        RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('portuguese', f_unaccent(coalesce(title, ''))), 'A')
+                || setweight(to_tsvector('portuguese', f_unaccent(coalesce(author, ''))), 'B')
+                || setweight(to_tsvector('portuguese', f_unaccent(coalesce(publisher, ''))), 'C')
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """)
+
+    op.execute(
+        "CREATE INDEX ix_books_search_document ON books "
+        "USING gin (books_search_document(title, author, publisher))"
+    )
+    # Trigram fallback for ISBN and partial title terms
+    op.execute("CREATE INDEX ix_books_title_trgm ON books USING gin (f_unaccent(lower(title)) gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_books_isbn_trgm ON books USING gin (isbn gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_books_isbn_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_books_title_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_books_search_document")
+    op.execute("DROP FUNCTION IF EXISTS books_search_document(text, text, text)")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
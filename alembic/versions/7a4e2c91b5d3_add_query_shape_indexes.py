@@ -0,0 +1,46 @@
+"""Add composite and covering indexes for the services' query shapes
+
+Revision ID: 7a4e2c91b5d3
+Revises: 3f1c9a7d2e10
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e2c91b5d3'
+down_revision = '3f1c9a7d2e10'
+branch_labels = None
+depends_on = None
+
+# name -> (table, index definition); services creating tables with
+# Base.metadata.create_all may already have them, hence IF NOT EXISTS
+INDEXES = {
+    # Listing sort tuples (core/pagination.py); DESC sorts use backward scans
+    'ix_books_category_rating': ('books', '(category_id, average_rating, total_reviews, id)'),
+    'ix_books_rating': ('books', '(average_rating, total_reviews, id)'),
+    'ix_books_rating_id': ('books', '(average_rating, id)'),
+    'ix_books_price': ('books', '(price, id)'),
+    'ix_books_created_at': ('books', '(created_at, id)'),
+    # Catalog snapshot high-water mark
+    'ix_books_updated_at': ('books', '(updated_at)'),
+    'ix_book_tags_book_id': ('book_tags', '(book_id)'),
+    # cart_items (cart_id, book_id) is created, already unique, by e2b7f3a9c104
+    'ix_orders_user_id_status': ('orders', '(user_id, status)'),
+    'ix_orders_user_id_created_at': ('orders', '(user_id, created_at)'),
+    'ix_order_items_order_id': ('order_items', '(order_id) INCLUDE (book_id)'),
+    'ix_user_interactions_user_id': ('user_interactions', '(user_id) INCLUDE (book_id, interaction_value)'),
+    'ix_reviews_book_id': ('reviews', '(book_id, created_at)'),
+}
+
+
+def upgrade() -> None:
+    for name, (table, definition) in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade() -> None:
+    for name in reversed(list(INDEXES)):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
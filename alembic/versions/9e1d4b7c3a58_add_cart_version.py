@@ -0,0 +1,24 @@
+"""Add carts.version
+
+Revision ID: 9e1d4b7c3a58
+Revises: c5d8e1f4a6b2
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1d4b7c3a58'
+down_revision = 'c5d8e1f4a6b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('carts', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('carts', 'version')
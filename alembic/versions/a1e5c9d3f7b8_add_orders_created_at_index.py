@@ -0,0 +1,25 @@
+"""Add orders (created_at, id) index for exports
+
+Revision ID: a1e5c9d3f7b8
+Revises: f4c1a7e9b2d6
+Create Date: 2026-10-19 17:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1e5c9d3f7b8'
+down_revision = 'f4c1a7e9b2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Date-range exports stream orders in (created_at, id) order
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
@@ -0,0 +1,25 @@
+"""Index inventory reservations by order
+
+Revision ID: a9d4c6e2f871
+Revises: e2b7f3a9c104
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4c6e2f871'
+down_revision = 'e2b7f3a9c104'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Cancelling an order releases its reservations by order_id
+    op.execute("CREATE INDEX IF NOT EXISTS ix_inventory_reservations_order_id ON inventory_reservations (order_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_inventory_reservations_order_id")
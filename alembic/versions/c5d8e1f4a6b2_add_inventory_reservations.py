@@ -0,0 +1,37 @@
+"""Add inventory reservations
+
+Revision ID: c5d8e1f4a6b2
+Revises: 7a4e2c91b5d3
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d8e1f4a6b2'
+down_revision = '7a4e2c91b5d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_reservations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('order_id', sa.UUID(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'COMMITTED', 'RELEASED', name='reservationstatus'), nullable=False),
+    sa.Column('items', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_reservations_status_expires_at', 'inventory_reservations', ['status', 'expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_reservations_status_expires_at', table_name='inventory_reservations')
+    op.drop_table('inventory_reservations')
+    op.execute("DROP TYPE IF EXISTS reservationstatus")
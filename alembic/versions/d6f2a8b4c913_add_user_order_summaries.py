@@ -0,0 +1,45 @@
+"""Add per-user order summaries
+
+Revision ID: d6f2a8b4c913
+Revises: b3e8d1c7a520
+Create Date: 2026-10-19 15:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6f2a8b4c913'
+down_revision = 'b3e8d1c7a520'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('user_order_summaries',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('last_order_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Backfill from existing orders
+    op.execute("""
+        INSERT INTO user_order_summaries (user_id, orders_count, cancelled_count, total_spent, last_order_at, updated_at)
+        SELECT user_id,
+               count(*),
+               count(*) FILTER (WHERE status = 'CANCELLED'),
+               coalesce(sum(total_amount) FILTER (WHERE status IS DISTINCT FROM 'CANCELLED'), 0),
+               max(created_at),
+               now()
+        FROM orders
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_order_summaries')
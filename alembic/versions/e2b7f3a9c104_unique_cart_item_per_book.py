@@ -0,0 +1,52 @@
+"""Make cart items unique per (cart_id, book_id)
+
+Only migration that creates ix_cart_items_cart_id_book_id: duplicated rows
+are merged first, then the unique index is built.
+
+Revision ID: e2b7f3a9c104
+Revises: 9e1d4b7c3a58
+Create Date: 2026-10-19 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7f3a9c104'
+down_revision = '9e1d4b7c3a58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merge duplicated rows into the oldest one before enforcing uniqueness
+    op.execute("""
+        WITH ranked AS (
+            SELECT id,
+                   first_value(id) OVER w AS keep_id,
+                   sum(quantity) OVER (PARTITION BY cart_id, book_id) AS total
+            FROM cart_items
+            WINDOW w AS (PARTITION BY cart_id, book_id ORDER BY created_at, id)
+        )
+        UPDATE cart_items SET quantity = ranked.total
+        FROM ranked
+        WHERE cart_items.id = ranked.id AND ranked.id = ranked.keep_id
+    """)
+    op.execute("""
+        DELETE FROM cart_items
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY cart_id, book_id ORDER BY created_at, id) AS position
+                FROM cart_items
+            ) numbered
+            WHERE position > 1
+        )
+    """)
+    # Databases built with create_all may already have it
+    op.execute("DROP INDEX IF EXISTS ix_cart_items_cart_id_book_id")
+    op.execute("CREATE UNIQUE INDEX ix_cart_items_cart_id_book_id ON cart_items (cart_id, book_id) INCLUDE (quantity)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_cart_items_cart_id_book_id")
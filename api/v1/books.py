@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from core.database import get_db
 from core.dependencies import get_current_user, get_current_admin_user
+from core.pagination import cursor_headers
 from services.book_service import BookService
 from schemas.book import Book, BookCreate, BookUpdate, BookSearch
 from models.user import User
@@ -12,6 +13,7 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Book])
 async def get_books(
+    response: Response,
     query: Optional[str] = Query(None, description="Search query"),
     category_id: Optional[str] = Query(None, description="Category ID filter"),
     min_price: Optional[float] = Query(None, description="Minimum price"),
@@ -23,9 +25,14 @@ async def get_books(
     sort_by: str = Query("relevance", description="Sort by: relevance, price_asc, price_desc, rating, newest"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor / X-Prev-Cursor (overrides page)"),
     db: Session = Depends(get_db)
 ):
-    """Get books with search and filters."""
+    """Get books with search and filters.
+
+    Next/previous page cursors are returned in the X-Next-Cursor and
+    X-Prev-Cursor headers.
+    """
     book_service = BookService(db)
     search_params = BookSearch(
         query=query,
@@ -38,9 +45,18 @@ async def get_books(
         published_year=published_year,
         sort_by=sort_by,
         page=page,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
-    return await book_service.get_books(search_params)
+    try:
+        books, next_cursor, prev_cursor = await book_service.get_books_page(search_params)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    response.headers.update(cursor_headers(next_cursor, prev_cursor))
+    return books
 
 
 @router.get("/popular", response_model=List[Book])
@@ -30,13 +30,14 @@ async def record_interaction(
 @router.get("/for-you", response_model=List[BookRecommendation])
 async def get_personalized_recommendations(
     limit: int = Query(10, ge=1, le=50, description="Number of recommendations"),
-    algorithm: str = Query("hybrid", description="Algorithm: content, collaborative, hybrid"),
+    algorithm: str = Query("hybrid", description="Algorithm: content, collaborative, hybrid, session"),
+    diversify: bool = Query(False, description="Re-rank results for author/category diversity"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get personalized recommendations for current user."""
     service = RecommendationService()
-    recs = service.get_user_recommendations(str(current_user.id), db, limit, algorithm)
+    recs = service.get_user_recommendations(str(current_user.id), db, limit, algorithm, diversify)
 
     # Map service output to BookRecommendation schema
     result: List[BookRecommendation] = []
@@ -44,6 +45,7 @@ async def get_personalized_recommendations(
         result.append(BookRecommendation(
             book_id=r.get('book_id'),
             score=r.get('score', 0.0),
+            reason=r.get('reason'),
             book={
                 'title': r.get('title'),
                 'author': r.get('author'),
@@ -60,17 +62,46 @@ async def get_similar_books(
     book_id: str,
     limit: int = Query(10, ge=1, le=50, description="Number of books"),
     algorithm: str = Query("hybrid", description="Algorithm: content, collaborative, hybrid"),
+    diversify: bool = Query(False, description="Re-rank results for author/category diversity"),
     db: Session = Depends(get_db)
 ):
     """Get books similar to the specified book."""
     service = RecommendationService()
-    recs = service.get_item_recommendations(book_id, db, limit, algorithm)
+    recs = service.get_item_recommendations(book_id, db, limit, algorithm, diversify)
+
+    result: List[BookRecommendation] = []
+    for r in recs:
+        result.append(BookRecommendation(
+            book_id=r.get('book_id'),
+            score=r.get('score', 0.0),
+            reason=r.get('reason'),
+            book={
+                'title': r.get('title'),
+                'author': r.get('author'),
+                'price': r.get('price'),
+                'cover_image_url': r.get('cover_image_url')
+            }
+        ))
+
+    return result
+
+
+@router.get("/bought-together", response_model=List[BookRecommendation])
+async def get_bought_together(
+    book_ids: List[str] = Query(..., description="Books in the cart or order"),
+    limit: int = Query(8, ge=1, le=50, description="Number of books"),
+    db: Session = Depends(get_db)
+):
+    """Get books frequently bought together with the given books (cart page, order confirmation)."""
+    service = RecommendationService()
+    recs = service.get_bought_together(book_ids, db, limit)
 
     result: List[BookRecommendation] = []
     for r in recs:
         result.append(BookRecommendation(
             book_id=r.get('book_id'),
             score=r.get('score', 0.0),
+            reason=r.get('reason'),
             book={
                 'title': r.get('title'),
                 'author': r.get('author'),
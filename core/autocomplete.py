@@ -0,0 +1,147 @@
+"""
+Autocomplete de títulos e autores
+
+Índice de prefixos em processo: uma lista ordenada de chaves normalizadas (sem
+acentos, minúsculas) consultada com bisect. Cada título e autor gera uma chave
+por palavra ("dom casmurro" e "casmurro"), então o prefixo casa com o começo de
+qualquer palavra. Os resultados são ordenados por popularidade (reviews e
+avaliação) e o índice é atualizado livro a livro, sem reconstrução completa.
+"""
+import bisect
+import heapq
+import threading
+from typing import Optional, List, Dict, Tuple, Any, Iterable, Set
+
+from core.search import tokenize
+
+# Prefixos curtos casam com muitas chaves; o resultado deles fica memorizado
+MEMO_PREFIX_LENGTH = 2
+
+BOOK = "book"
+AUTHOR = "author"
+
+def prefix_keys(text: Optional[str]) -> List[str]:
+    """Chaves do texto: o texto normalizado a partir de cada palavra."""
+    tokens = tokenize(text)
+    return [" ".join(tokens[start:]) for start in range(len(tokens))]
+
+class AutocompleteIndex:
+    """Índice de prefixos de títulos e autores, alimentado pelo snapshot do catálogo.
+
+    Recebe os livros já serializados (JSON da API) via `index_books` e
+    `remove_book`; `clear` é chamado antes de uma recarga completa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[str, str, str]] = []  # (chave, tipo, referência), ordenado
+        self._books: Dict[str, Dict[str, Any]] = {}
+        self._authors: Dict[str, Dict[str, Any]] = {}  # autor normalizado -> nome e ids dos livros
+        self._memo: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = []
+            self._books = {}
+            self._authors = {}
+            self._memo = {}
+
+    def index_books(self, books: Iterable[Dict[str, Any]]) -> None:
+        """Insere ou atualiza livros (payloads com id, title, author, rating e reviews)."""
+        with self._lock:
+            added: List[Tuple[str, str, str]] = []
+            # Só a última versão de cada livro do lote
+            for payload in {str(payload["id"]): payload for payload in books}.values():
+                book_id = str(payload["id"])
+                self._remove(book_id)
+
+                author_key = " ".join(tokenize(payload.get("author")))
+                self._books[book_id] = {
+                    "title": payload["title"],
+                    "author": payload.get("author"),
+                    "author_key": author_key,
+                    "cover_image_url": payload.get("cover_image_url"),
+                    "popularity": (payload.get("total_reviews") or 0, payload.get("average_rating") or 0.0),
+                }
+                added.extend((key, BOOK, book_id) for key in prefix_keys(payload["title"]))
+
+                if author_key:
+                    author = self._authors.get(author_key)
+                    if author is None:
+                        author = self._authors[author_key] = {"name": payload["author"], "books": set()}
+                        added.extend((key, AUTHOR, author_key) for key in prefix_keys(payload["author"]))
+                    author["books"].add(book_id)
+
+            # Lotes grandes (carga inicial) são ordenados de uma vez; alterações pontuais usam insort
+            if len(added) > len(self._entries) // 4:
+                self._entries.extend(added)
+                self._entries.sort()
+            else:
+                for entry in added:
+                    bisect.insort(self._entries, entry)
+            self._memo = {}
+
+    def remove_book(self, book_id: Any) -> None:
+        with self._lock:
+            self._remove(str(book_id))
+            self._memo = {}
+
+    def _remove(self, book_id: str) -> None:
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return
+        self._delete_entries(book["title"], BOOK, book_id)
+
+        author = self._authors.get(book["author_key"])
+        if author is not None:
+            author["books"].discard(book_id)
+            if not author["books"]:
+                del self._authors[book["author_key"]]
+                self._delete_entries(author["name"], AUTHOR, book["author_key"])
+
+    def _delete_entries(self, text: str, kind: str, reference: str) -> None:
+        for key in prefix_keys(text):
+            entry = (key, kind, reference)
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def _popularity(self, kind: str, reference: str) -> Tuple[int, float]:
+        if kind == BOOK:
+            return self._books[reference]["popularity"]
+        popularities = [self._books[book_id]["popularity"] for book_id in self._authors[reference]["books"]]
+        return sum(reviews for reviews, _ in popularities), max(rating for _, rating in popularities)
+
+    def _suggestion(self, kind: str, reference: str) -> Dict[str, Any]:
+        if kind == BOOK:
+            book = self._books[reference]
+            return {
+                "type": BOOK,
+                "id": reference,
+                "title": book["title"],
+                "author": book["author"],
+                "cover_image_url": book["cover_image_url"],
+            }
+        author = self._authors[reference]
+        return {"type": AUTHOR, "name": author["name"], "books": len(author["books"])}
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Livros e autores cujo título/nome tem uma palavra começando pelo prefixo, mais populares primeiro."""
+        key = " ".join(tokenize(prefix))
+        if not key:
+            return []
+
+        with self._lock:
+            memo_key = (key, limit)
+            if memo_key in self._memo:
+                return self._memo[memo_key]
+
+            start = bisect.bisect_left(self._entries, (key,))
+            end = bisect.bisect_left(self._entries, (key + "\uffff",), start)
+            matches: Set[Tuple[str, str]] = {(kind, reference) for _, kind, reference in self._entries[start:end]}
+            best = heapq.nlargest(limit, matches, key=lambda match: (self._popularity(*match), match))
+            suggestions = [self._suggestion(kind, reference) for kind, reference in best]
+
+            if len(key) <= MEMO_PREFIX_LENGTH:
+                self._memo[memo_key] = suggestions
+            return suggestions
@@ -0,0 +1,87 @@
+"""
+Cache local de livros (existência e preço) para serviços fora do catálogo
+
+Evita uma chamada ao catalog-service por operação: os livros são buscados em
+lote via POST /books:batch (get_books_batch) só quando faltam no cache, e
+ficam válidos por BOOK_CACHE_TTL_SECONDS ou até um evento de alteração do
+catálogo (core.catalog_events) descartá-los. Livros inexistentes também são
+guardados, para que ids inválidos repetidos não voltem ao catálogo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple, Any, Iterable
+
+from core.config import settings
+from core.utils import get_books_batch
+
+class BookCache:
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # book_id -> (preço ou None se o livro não existe, expira em)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], float]]" = OrderedDict()
+
+    def _lookup(self, book_ids: List[str]) -> Tuple[Dict[str, Optional[float]], List[str]]:
+        now = time.monotonic()
+        known: Dict[str, Optional[float]] = {}
+        unknown: List[str] = []
+        with self._lock:
+            for book_id in book_ids:
+                entry = self._entries.get(book_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(book_id)
+                    known[book_id] = entry[0]
+                else:
+                    unknown.append(book_id)
+        return known, unknown
+
+    def _store(self, prices: Dict[str, Optional[float]]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for book_id, price in prices.items():
+                self._entries[book_id] = (price, expires_at)
+                self._entries.move_to_end(book_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def prices(self, book_ids: Iterable[Any]) -> Tuple[Dict[str, float], List[str]]:
+        """(preço por id, ids inexistentes); busca no catálogo, em um lote, só o que falta.
+
+        Levanta HTTPException (como get_books_batch) se o catálogo estiver indisponível.
+        """
+        ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+        known, unknown = self._lookup(ids)
+        if unknown:
+            books, missing = await get_books_batch(unknown)
+            fetched: Dict[str, Optional[float]] = {book_id: float(book["price"]) for book_id, book in books.items()}
+            fetched.update((book_id, None) for book_id in missing)
+            self._store(fetched)
+            known.update(fetched)
+        prices = {book_id: known[book_id] for book_id in ids if known.get(book_id) is not None}
+        return prices, [book_id for book_id in ids if book_id not in prices]
+
+    async def warm(self, book_ids: Iterable[Any]) -> int:
+        """Pré-carrega livros em lote (ex.: os que já estão em carrinhos); retorna quantos foram buscados."""
+        _, unknown = self._lookup(list(dict.fromkeys(str(book_id) for book_id in book_ids)))
+        if unknown:
+            await self.prices(unknown)
+        return len(unknown)
+
+    def invalidate(self, book_ids: Optional[Iterable[Any]] = None) -> None:
+        """Descarta os livros informados, ou o cache inteiro."""
+        with self._lock:
+            if book_ids is None:
+                self._entries.clear()
+                return
+            for book_id in book_ids:
+                self._entries.pop(str(book_id), None)
+
+_book_cache: Optional[BookCache] = None
+
+def get_book_cache() -> BookCache:
+    global _book_cache
+    if _book_cache is None:
+        _book_cache = BookCache(ttl=settings.BOOK_CACHE_TTL_SECONDS, max_entries=settings.BOOK_CACHE_MAX_ENTRIES)
+    return _book_cache
@@ -0,0 +1,194 @@
+"""
+Cache de respostas HTTP pré-serializadas
+
+Guarda o corpo JSON já em bytes com um ETag forte (hash do conteúdo) em um
+LRU em processo com TTL, opcionalmente compartilhado entre workers via Redis.
+Requisições com If-None-Match igual ao ETag recebem 304 sem corpo.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Callable, Iterable, Tuple
+from fastapi import Response
+
+logger = logging.getLogger("core.cache")
+
+def json_bytes(content: Any) -> bytes:
+    """Serializa como o JSONResponse do FastAPI (compacto, UTF-8)."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Compara o header If-None-Match com o ETag (comparação fraca, como pede o RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+class CachedResponse:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def to_response(self, if_none_match: Optional[str] = None, media_type: str = "application/json") -> Response:
+        """200 com o corpo em cache, ou 304 se o cliente já tem esta versão."""
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if if_none_match and etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type=media_type, headers=headers)
+
+# Geração, versão da rota e entrada em uma ida ao Redis
+GET_ENTRY = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+local version = redis.call('HGET', KEYS[2], ARGV[1]) or '0'
+local entry = redis.call('HMGET', ARGV[2] .. generation .. ':' .. version .. ':' .. ARGV[3], 'body', 'etag')
+return {generation, version, entry[1], entry[2]}
+"""
+
+# Grava só se a geração e a versão da rota ainda são as lidas antes de montar a resposta
+SET_ENTRY = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] or (redis.call('HGET', KEYS[2], ARGV[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+redis.call('HSET', KEYS[3], 'body', ARGV[4], 'etag', ARGV[5])
+redis.call('EXPIRE', KEYS[3], ARGV[6])
+return 1
+"""
+
+def key_path(key: str) -> str:
+    """Rota de uma chave "path?query"."""
+    return key.partition("?")[0]
+
+class ResponseCache:
+    """LRU com TTL de respostas serializadas, com Redis opcional como segundo nível.
+
+    As chaves são "path?query". No Redis, cada entrada fica em
+    {namespace}:response:{geração}:{versão da rota}:{chave}: `invalidate_paths`
+    incrementa a versão das rotas afetadas (ex.: /books/{id} de um livro cujo
+    estoque mudou) e `invalidate` incrementa a geração, sem SCAN; as entradas
+    antigas deixam de ser lidas e expiram pelo TTL. A gravação confere geração
+    e versão no próprio Redis, então um worker que montou a resposta antes de
+    uma invalidação não grava o conteúdo antigo de volta.
+
+    Entradas locais expiram após `ttl` segundos; `clear_local` descarta só o
+    LRU do processo.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, redis_url: Optional[str] = None, namespace: str = "responses"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Tuple[CachedResponse, float]]" = OrderedDict()
+        self._epoch = 0  # muda a cada invalidação local; respostas montadas antes dela não entram no LRU
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url:
+            import redis
+
+            self._redis = redis.Redis.from_url(redis_url)
+            self._get_entry = self._redis.register_script(GET_ENTRY)
+            self._set_entry = self._redis.register_script(SET_ENTRY)
+        self._generation_key = f"{namespace}:generation"
+        self._versions_key = f"{namespace}:versions"
+        self._entry_prefix = f"{namespace}:response:"
+
+    def get_or_set(self, key: str, build: Callable[[], Optional[bytes]]) -> Optional[CachedResponse]:
+        """Resposta em cache para `key`; em miss grava o resultado de `build` (None não é cacheado)."""
+        now = time.monotonic()
+        with self._lock:
+            epoch = self._epoch
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+
+        stamp = None
+        if self._redis is not None:
+            try:
+                generation, version, body, etag = self._get_entry(
+                    keys=[self._generation_key, self._versions_key],
+                    args=[key_path(key), self._entry_prefix, key]
+                )
+                stamp = (generation, version)
+            except Exception as e:
+                logger.warning(f"Falha ao ler cache no Redis | key={key} | error={e}")
+            else:
+                if body is not None:
+                    cached = CachedResponse(body, etag.decode())
+                    self._store_local(key, cached, epoch)
+                    return cached
+
+        body = build()
+        if body is None:
+            return None
+        cached = CachedResponse(body)
+        self._store_local(key, cached, epoch)
+        if stamp is not None:
+            generation, version = stamp
+            try:
+                self._set_entry(
+                    keys=[self._generation_key, self._versions_key, self._entry_key(generation, version, key)],
+                    args=[generation, key_path(key), version, cached.body, cached.etag, max(int(self.ttl), 1)]
+                )
+            except Exception as e:
+                logger.warning(f"Falha ao gravar cache no Redis | key={key} | error={e}")
+        return cached
+
+    def _entry_key(self, generation: bytes, version: bytes, key: str) -> str:
+        return f"{self._entry_prefix}{generation.decode()}:{version.decode()}:{key}"
+
+    def _store_local(self, key: str, cached: CachedResponse, epoch: int) -> None:
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._entries[key] = (cached, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_local(self, paths: Optional[Iterable[str]] = None) -> None:
+        """Descarta o LRU do processo, ou só as entradas das rotas `paths`."""
+        with self._lock:
+            if paths is None:
+                self._entries.clear()
+            else:
+                paths = set(paths)
+                for key in [key for key in self._entries if key_path(key) in paths]:
+                    del self._entries[key]
+            self._epoch += 1
+
+    def invalidate_paths(self, paths: Iterable[str]) -> None:
+        """Descarta as respostas das rotas `paths` (qualquer query), no processo e no Redis."""
+        paths = set(paths)
+        if not paths:
+            return
+        self.clear_local(paths)
+        if self._redis is None:
+            return
+        try:
+            pipeline = self._redis.pipeline()
+            for path in paths:
+                pipeline.hincrby(self._versions_key, path, 1)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar rotas no Redis | namespace={self.namespace} | paths={len(paths)} | error={e}")
+
+    def invalidate(self) -> None:
+        """Descarta todas as respostas em cache (processo e Redis)."""
+        self.clear_local()
+        if self._redis is None:
+            return
+        try:
+            # Nova geração: as versões por rota recomeçam junto com ela
+            pipeline = self._redis.pipeline()
+            pipeline.incr(self._generation_key)
+            pipeline.delete(self._versions_key)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao invalidar cache no Redis | namespace={self.namespace} | error={e}")
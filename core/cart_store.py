@@ -0,0 +1,447 @@
+"""
+Armazenamento de carrinhos ativos fora do PostgreSQL
+
+Cada carrinho é um hash (book_id -> quantidade) em um key-value store: Redis
+em produção ou um dicionário em processo (só testes/desenvolvimento com um
+único processo: o orders-service não enxerga esse store). Mutações
+são operações atômicas no hash (HINCRBY, HSET, HDEL), sem idas ao banco;
+um lote de operações (CartStore.apply) roda em um único script Lua.
+
+O PostgreSQL continua sendo a cópia durável (carts/cart_items):
+- CART_STORE_WRITE_MODE=async: carrinhos alterados ficam marcados como sujos e
+  um flush periódico do cart-service grava o estado no banco;
+- CART_STORE_WRITE_MODE=checkout: o banco só é atualizado no checkout (flush_cart).
+
+Um carrinho ausente do store é carregado do banco na primeira leitura/mutação.
+
+carts.version avança sempre que o carrinho é consumido no banco (esvaziado
+ou convertido em pedido). A cópia do store guarda a versão com que foi
+carregada e o flush só grava enquanto o banco estiver nela: uma cópia antiga
+(ex.: flush concorrente com o checkout) é descartada do store em vez de
+regravar itens já consumidos.
+"""
+import logging
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple, Any
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.cart import Cart, CartItem
+
+logger = logging.getLogger("core.cart_store")
+
+# Campo presente em todo hash carregado, com a versão do banco: distingue
+# carrinho vazio de carrinho ainda não carregado
+CART_MARKER = "__cart__"
+
+# Ids de item determinísticos: o mesmo (usuário, livro) gera sempre o mesmo cart_items.id
+CART_ITEM_NAMESPACE = uuid.UUID("6f1c2b1e-3d4a-4c5b-9e8f-7a6b5c4d3e2f")
+
+def cart_item_id(user_id: Any, book_id: Any) -> uuid.UUID:
+    return uuid.uuid5(CART_ITEM_NAMESPACE, f"{user_id}:{book_id}")
+
+# Operações de CartStore.apply: soma, define (criando) e remove
+ADD, PUT, REMOVE = "add", "put", "remove"
+
+class CartStore(ABC):
+    """Interface dos stores de carrinho; chaves e ids sempre como texto."""
+
+    @abstractmethod
+    def load(self, user_id: Any) -> Optional[Dict[str, int]]:
+        """Itens do carrinho, ou None se o carrinho não está no store."""
+
+    @abstractmethod
+    def version(self, user_id: Any) -> Optional[int]:
+        """Versão do banco (carts.version) com que o carrinho foi carregado, ou None se ele não está no store."""
+
+    @abstractmethod
+    def seed(self, user_id: Any, items: Dict[str, int], version: int) -> None:
+        """Carrega no store os itens vindos do banco sem sobrescrever mutações concorrentes."""
+
+    @abstractmethod
+    def add(self, user_id: Any, book_id: Any, quantity: int) -> int:
+        """Incrementa a quantidade (cria o item se preciso); retorna a nova quantidade."""
+
+    @abstractmethod
+    def set(self, user_id: Any, book_id: Any, quantity: int) -> bool:
+        """Define a quantidade de um item existente; False se o item não está no carrinho."""
+
+    @abstractmethod
+    def put(self, user_id: Any, book_id: Any, quantity: int) -> None:
+        """Define a quantidade, criando o item se preciso."""
+
+    @abstractmethod
+    def remove(self, user_id: Any, book_id: Any) -> bool:
+        """Remove o item; False se ele não estava no carrinho."""
+
+    @abstractmethod
+    def apply(self, user_id: Any, changes: Dict[str, Tuple[str, int]]) -> None:
+        """Aplica book_id -> (ADD | PUT | REMOVE, quantidade) de uma vez: outras mutações veem tudo ou nada."""
+
+    @abstractmethod
+    def clear(self, user_id: Any) -> None:
+        """Esvazia o carrinho, mantendo-o carregado no store."""
+
+    @abstractmethod
+    def discard(self, user_id: Any, version: int) -> None:
+        """Tira o carrinho do store se ele foi carregado antes da versão version do banco."""
+
+    @abstractmethod
+    def pop_dirty(self, limit: int = 100) -> List[str]:
+        """Retira até limit carrinhos alterados desde o último flush."""
+
+    @abstractmethod
+    def mark_dirty(self, user_ids: List[str]) -> None:
+        """Marca carrinhos como alterados de novo (flush que falhou)."""
+
+class InMemoryCartStore(CartStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carts: Dict[str, Dict[str, int]] = {}
+        self._versions: Dict[str, int] = {}
+        self._dirty: Dict[str, None] = {}
+
+    def _cart(self, user_id: Any) -> Dict[str, int]:
+        self._versions.setdefault(str(user_id), 0)
+        return self._carts.setdefault(str(user_id), {})
+
+    def load(self, user_id: Any) -> Optional[Dict[str, int]]:
+        with self._lock:
+            items = self._carts.get(str(user_id))
+            return dict(items) if items is not None else None
+
+    def version(self, user_id: Any) -> Optional[int]:
+        with self._lock:
+            return self._versions.get(str(user_id)) if str(user_id) in self._carts else None
+
+    def seed(self, user_id: Any, items: Dict[str, int], version: int) -> None:
+        with self._lock:
+            self._versions.setdefault(str(user_id), version)
+            cart = self._carts.setdefault(str(user_id), {})
+            for book_id, quantity in items.items():
+                cart.setdefault(book_id, quantity)
+
+    def add(self, user_id: Any, book_id: Any, quantity: int) -> int:
+        with self._lock:
+            cart = self._cart(user_id)
+            cart[str(book_id)] = cart.get(str(book_id), 0) + quantity
+            self._dirty[str(user_id)] = None
+            return cart[str(book_id)]
+
+    def set(self, user_id: Any, book_id: Any, quantity: int) -> bool:
+        with self._lock:
+            cart = self._carts.get(str(user_id), {})
+            if str(book_id) not in cart:
+                return False
+            cart[str(book_id)] = quantity
+            self._dirty[str(user_id)] = None
+            return True
+
+    def put(self, user_id: Any, book_id: Any, quantity: int) -> None:
+        with self._lock:
+            self._cart(user_id)[str(book_id)] = quantity
+            self._dirty[str(user_id)] = None
+
+    def remove(self, user_id: Any, book_id: Any) -> bool:
+        with self._lock:
+            removed = self._carts.get(str(user_id), {}).pop(str(book_id), None) is not None
+            if removed:
+                self._dirty[str(user_id)] = None
+            return removed
+
+    def apply(self, user_id: Any, changes: Dict[str, Tuple[str, int]]) -> None:
+        with self._lock:
+            cart = self._cart(user_id)
+            for book_id, (kind, quantity) in changes.items():
+                if kind == REMOVE:
+                    cart.pop(str(book_id), None)
+                elif kind == ADD:
+                    cart[str(book_id)] = cart.get(str(book_id), 0) + quantity
+                else:
+                    cart[str(book_id)] = quantity
+            self._dirty[str(user_id)] = None
+
+    def clear(self, user_id: Any) -> None:
+        with self._lock:
+            self._cart(user_id).clear()
+            self._dirty[str(user_id)] = None
+
+    def discard(self, user_id: Any, version: int) -> None:
+        with self._lock:
+            if str(user_id) in self._carts and self._versions.get(str(user_id), 0) < version:
+                del self._carts[str(user_id)]
+                del self._versions[str(user_id)]
+
+    def pop_dirty(self, limit: int = 100) -> List[str]:
+        with self._lock:
+            user_ids = list(self._dirty)[:limit]
+            for user_id in user_ids:
+                del self._dirty[user_id]
+            return user_ids
+
+    def mark_dirty(self, user_ids: List[str]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._dirty[user_id] = None
+
+# HSET só se o campo já existe (não recria item removido concorrentemente)
+SET_IF_PRESENT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Lote de operações (ARGV[4..]: operação, book_id, quantidade) em um só script:
+# nenhuma outra mutação ou flush vê o lote pela metade
+APPLY_BATCH = """
+redis.call('HSETNX', KEYS[1], ARGV[1], 0)
+for i = 4, #ARGV, 3 do
+    if ARGV[i] == 'remove' then
+        redis.call('HDEL', KEYS[1], ARGV[i + 1])
+    elseif ARGV[i] == 'add' then
+        redis.call('HINCRBY', KEYS[1], ARGV[i + 1], ARGV[i + 2])
+    else
+        redis.call('HSET', KEYS[1], ARGV[i + 1], ARGV[i + 2])
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+"""
+
+# Remove os itens mantendo o marcador com a versão
+CLEAR_ITEMS = """
+local version = redis.call('HGET', KEYS[1], ARGV[1]) or '0'
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], ARGV[1], version)
+"""
+
+# DEL só se o hash foi carregado antes da versão ARGV[2]
+DISCARD_IF_OLDER = """
+local version = redis.call('HGET', KEYS[1], ARGV[1])
+if version and tonumber(version) < tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+class RedisCartStore(CartStore):
+    """Um hash por carrinho (cart:{user_id}) com TTL renovado a cada mutação."""
+
+    DIRTY_KEY = "cart:dirty"
+
+    def __init__(self, url: str, ttl: int = 604800):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+        self._set_if_present = self.client.register_script(SET_IF_PRESENT)
+        self._clear_items = self.client.register_script(CLEAR_ITEMS)
+        self._discard_if_older = self.client.register_script(DISCARD_IF_OLDER)
+        self._apply_batch = self.client.register_script(APPLY_BATCH)
+
+    @staticmethod
+    def _key(user_id: Any) -> str:
+        return f"cart:{user_id}"
+
+    def _touch(self, pipeline, user_id: Any) -> None:
+        pipeline.expire(self._key(user_id), self.ttl)
+        pipeline.sadd(self.DIRTY_KEY, str(user_id))
+
+    def load(self, user_id: Any) -> Optional[Dict[str, int]]:
+        stored = self.client.hgetall(self._key(user_id))
+        if not stored:
+            return None
+        return {book_id: int(quantity) for book_id, quantity in stored.items() if book_id != CART_MARKER}
+
+    def version(self, user_id: Any) -> Optional[int]:
+        version = self.client.hget(self._key(user_id), CART_MARKER)
+        return int(version) if version is not None else None
+
+    def seed(self, user_id: Any, items: Dict[str, int], version: int) -> None:
+        pipeline = self.client.pipeline()
+        pipeline.hsetnx(self._key(user_id), CART_MARKER, version)
+        for book_id, quantity in items.items():
+            pipeline.hsetnx(self._key(user_id), book_id, quantity)
+        pipeline.expire(self._key(user_id), self.ttl)
+        pipeline.execute()
+
+    def add(self, user_id: Any, book_id: Any, quantity: int) -> int:
+        pipeline = self.client.pipeline()
+        pipeline.hincrby(self._key(user_id), str(book_id), quantity)
+        pipeline.hsetnx(self._key(user_id), CART_MARKER, 0)
+        self._touch(pipeline, user_id)
+        return int(pipeline.execute()[0])
+
+    def set(self, user_id: Any, book_id: Any, quantity: int) -> bool:
+        updated = self._set_if_present(keys=[self._key(user_id)], args=[str(book_id), quantity])
+        if updated:
+            pipeline = self.client.pipeline()
+            self._touch(pipeline, user_id)
+            pipeline.execute()
+        return bool(updated)
+
+    def put(self, user_id: Any, book_id: Any, quantity: int) -> None:
+        pipeline = self.client.pipeline()
+        pipeline.hset(self._key(user_id), str(book_id), quantity)
+        pipeline.hsetnx(self._key(user_id), CART_MARKER, 0)
+        self._touch(pipeline, user_id)
+        pipeline.execute()
+
+    def remove(self, user_id: Any, book_id: Any) -> bool:
+        pipeline = self.client.pipeline()
+        pipeline.hdel(self._key(user_id), str(book_id))
+        self._touch(pipeline, user_id)
+        return bool(pipeline.execute()[0])
+
+    def apply(self, user_id: Any, changes: Dict[str, Tuple[str, int]]) -> None:
+        args = [CART_MARKER, self.ttl, str(user_id)]
+        for book_id, (kind, quantity) in changes.items():
+            args.extend([kind, str(book_id), quantity])
+        self._apply_batch(keys=[self._key(user_id), self.DIRTY_KEY], args=args)
+
+    def clear(self, user_id: Any) -> None:
+        self._clear_items(keys=[self._key(user_id)], args=[CART_MARKER])
+        pipeline = self.client.pipeline()
+        self._touch(pipeline, user_id)
+        pipeline.execute()
+
+    def discard(self, user_id: Any, version: int) -> None:
+        self._discard_if_older(keys=[self._key(user_id)], args=[CART_MARKER, version])
+
+    def pop_dirty(self, limit: int = 100) -> List[str]:
+        return self.client.spop(self.DIRTY_KEY, limit) or []
+
+    def mark_dirty(self, user_ids: List[str]) -> None:
+        if user_ids:
+            self.client.sadd(self.DIRTY_KEY, *user_ids)
+
+def load_cart_items(store: CartStore, db: Session, user_id: Any) -> Dict[str, int]:
+    """Itens do carrinho no store, carregando do banco (itens e versão, uma consulta) na primeira vez."""
+    items = store.load(user_id)
+    if items is not None:
+        return items
+    rows = db.query(Cart.version, CartItem.book_id, CartItem.quantity)\
+        .outerjoin(CartItem, CartItem.cart_id == Cart.id)\
+        .filter(Cart.user_id == user_id).all()
+    version = rows[0].version if rows else 0
+    store.seed(user_id, {str(row.book_id): row.quantity for row in rows if row.book_id is not None}, version)
+    return store.load(user_id) or {}
+
+def _lock_cart(db: Session, user_id: Any, version: int) -> Optional[uuid.UUID]:
+    """Trava a linha do carrinho se carts.version ainda for version; id do carrinho ou None.
+
+    Um carrinho que nunca foi gravado (versão 0) é criado.
+    """
+    cart_id = db.execute(
+        update(Cart).where(Cart.user_id == user_id, Cart.version == version)
+            .values(updated_at=datetime.utcnow()).returning(Cart.id),
+        execution_options={"synchronize_session": False}
+    ).scalar()
+    if cart_id is not None or version != 0:
+        return cart_id
+    if db.query(Cart.id).filter(Cart.user_id == user_id).first() is not None:
+        return None
+    cart = Cart(user_id=user_id, version=0)
+    db.add(cart)
+    db.flush()
+    return cart.id
+
+def flush_cart(db: Session, user_id: Any, store: Optional[CartStore] = None) -> None:
+    """Grava no banco (sem commit) o carrinho de um usuário, se ele estiver no store.
+
+    Substitui os cart_items. Se o carrinho foi consumido no banco depois que a
+    cópia foi carregada, nada é gravado e a cópia sai do store (a próxima
+    leitura recarrega do banco).
+    """
+    store = store or get_cart_store()
+    if store is None:
+        return
+    version = store.version(user_id)
+    if version is None:
+        return
+    cart_id = _lock_cart(db, user_id, version)
+    if cart_id is None:
+        logger.info(f"Cópia antiga do carrinho descartada | user_id={user_id} | version={version}")
+        store.discard(user_id, version + 1)
+        return
+    # Lidos depois da trava: flushes concorrentes gravam na ordem em que leem
+    items = store.load(user_id)
+    if items is None:
+        return
+    db.query(CartItem).filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(CartItem, [
+        {
+            "id": cart_item_id(user_id, book_id),
+            "cart_id": cart_id,
+            "book_id": uuid.UUID(book_id),
+            "quantity": quantity,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for book_id, quantity in items.items()
+    ])
+
+def reset_cart(db: Session, user_id: Any) -> int:
+    """Esvazia o carrinho no banco e avança carts.version (sem commit); retorna a nova versão.
+
+    Cópias do store carregadas antes disso não são mais gravadas pelo flush.
+    """
+    cart = db.execute(
+        update(Cart).where(Cart.user_id == user_id)
+            .values(version=Cart.version + 1, updated_at=datetime.utcnow())
+            .returning(Cart.id, Cart.version),
+        execution_options={"synchronize_session": False}
+    ).first()
+    if cart is None:
+        return 0
+    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete(synchronize_session=False)
+    return cart.version
+
+def flush_dirty(db: Session, store: CartStore, limit: int = 100) -> int:
+    """Grava no banco os carrinhos alterados desde o último flush; retorna quantos.
+
+    Se a gravação falhar, os carrinhos voltam a ficar marcados como sujos
+    para o próximo flush (o chamador faz o rollback).
+    """
+    user_ids = store.pop_dirty(limit)
+    if not user_ids:
+        return 0
+    try:
+        for user_id in user_ids:
+            flush_cart(db, uuid.UUID(user_id), store)
+        db.commit()
+    except Exception:
+        store.mark_dirty(user_ids)
+        raise
+    return len(user_ids)
+
+_store: Optional[CartStore] = None
+
+def get_cart_store() -> Optional[CartStore]:
+    """Store configurado em CART_STORE (memory ou redis); None quando os carrinhos ficam só no banco (sql).
+
+    O store memory vive dentro de um processo: outros serviços (o checkout no
+    orders-service, o worker do outbox) não enxergam os carrinhos. Serve só
+    para testes/desenvolvimento com um único processo e é recusado com
+    CART_STORE_WRITE_MODE=checkout, em que o banco só recebe o carrinho no
+    checkout.
+    """
+    global _store
+    if _store is None and settings.CART_STORE != "sql":
+        if settings.CART_STORE == "memory" and settings.CART_STORE_WRITE_MODE == "checkout":
+            raise RuntimeError("CART_STORE=memory não suporta CART_STORE_WRITE_MODE=checkout: use CART_STORE=redis")
+        if settings.CART_STORE == "redis":
+            _store = RedisCartStore(settings.REDIS_URL, ttl=settings.CART_STORE_TTL_SECONDS)
+        else:
+            _store = InMemoryCartStore()
+        logger.info(f"Cart store inicializado | store={settings.CART_STORE} | write_mode={settings.CART_STORE_WRITE_MODE}")
+    return _store
@@ -0,0 +1,61 @@
+"""
+Eventos de alteração de livros do catálogo
+
+O catalog-service publica os ids dos livros criados, alterados ou removidos
+em um canal Redis (pub/sub); outros serviços assinam o canal para invalidar
+caches locais de livros. Com CATALOG_EVENTS_REDIS desligado nada é publicado
+e os caches dependem só do próprio TTL.
+"""
+import json
+import logging
+from typing import Optional, List, Any, Callable, Iterable
+
+from core.config import settings
+
+logger = logging.getLogger("core.catalog_events")
+
+# Mensagem que invalida todos os livros (ex.: importação em massa)
+ALL_BOOKS = "*"
+
+_publisher = None
+
+def _client():
+    import redis
+
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+def publish_book_changes(book_ids: Iterable[Any]) -> None:
+    """Publica os ids alterados; falhas no Redis só são logadas (o TTL dos caches cobre)."""
+    global _publisher
+    if not settings.CATALOG_EVENTS_REDIS:
+        return
+    try:
+        if _publisher is None:
+            _publisher = _client()
+        _publisher.publish(settings.CATALOG_EVENTS_CHANNEL, json.dumps([str(book_id) for book_id in book_ids]))
+    except Exception as e:
+        logger.warning(f"Falha ao publicar alteração de livros | error={str(e)}")
+
+def subscribe_book_changes(callback: Callable[[Optional[List[str]]], None]):
+    """Chama callback(ids) a cada evento, ou callback(None) para invalidar tudo.
+
+    Roda em uma thread daemon do redis-py; retorna a thread (ou None se os
+    eventos estão desligados ou o Redis não está acessível).
+    """
+    if not settings.CATALOG_EVENTS_REDIS:
+        return None
+
+    def handle(message) -> None:
+        try:
+            book_ids = json.loads(message["data"])
+        except (TypeError, ValueError):
+            book_ids = ALL_BOOKS
+        callback(None if book_ids == ALL_BOOKS else book_ids)
+
+    try:
+        pubsub = _client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{settings.CATALOG_EVENTS_CHANNEL: handle})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    except Exception as e:
+        logger.warning(f"Falha ao assinar alterações de livros | error={str(e)}")
+        return None
@@ -0,0 +1,126 @@
+"""
+Checkout transacional (orders-service)
+
+Transforma o carrinho do usuário em pedido em uma única transação, sem
+chamadas HTTP ao cart-service:
+- uma consulta lê os itens do carrinho com os preços atuais dos livros
+  (travando as linhas do carrinho contra checkouts concorrentes);
+- o pedido é inserido e os itens entram em um único INSERT de várias linhas;
+- o estoque é descontado via core.inventory (tudo ou nada), os totais do
+  usuário (user_order_summaries) são atualizados e o carrinho é esvaziado
+  antes do commit, avançando carts.version;
+- logo após o commit a cópia do carrinho no cart store é descartada, para
+  que um flush atrasado não a regrave; se isso falhar, o evento do outbox
+  tenta de novo;
+- os demais efeitos (interações de compra, caches de livros) entram como
+  evento "order.created" no outbox e rodam depois do commit
+  (core.order_events);
+- a resposta é montada com os dados já lidos, sem recarregar o pedido.
+"""
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Dict, Any
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core import inventory
+from core.cart_store import get_cart_store, flush_cart, reset_cart
+from core.order_events import order_created
+from core.order_history import record_order
+from models.book import Book
+from models.cart import Cart, CartItem
+from models.inventory import ReservationStatus
+from models.order import Order, OrderItem, OrderStatus, PaymentStatus
+
+logger = logging.getLogger("core.checkout")
+
+class EmptyCart(Exception):
+    """O usuário não tem itens no carrinho."""
+
+def _cart_lines(db: Session, user_id: Any) -> List[Any]:
+    """Itens do carrinho com os dados atuais do livro, em ordem de book_id (uma consulta)."""
+    return db.query(
+        CartItem.cart_id, CartItem.book_id, CartItem.quantity,
+        Book.title, Book.author, Book.isbn, Book.price, Book.cover_image_url
+    ).join(Cart, Cart.id == CartItem.cart_id)\
+        .join(Book, Book.id == CartItem.book_id)\
+        .filter(Cart.user_id == user_id)\
+        .order_by(CartItem.book_id)\
+        .with_for_update(of=CartItem)\
+        .all()
+
+def place_order(db: Session, user_id: Any, shipping_address: Dict[str, Any], payment_method: str) -> Dict[str, Any]:
+    """Cria o pedido a partir do carrinho e faz commit; devolve o pedido no formato do schema Order.
+
+    Levanta EmptyCart ou inventory.InsufficientStock (já com rollback feito).
+    """
+    store = get_cart_store()
+    try:
+        if store is not None:
+            # Carrinhos no cart store (modo checkout) chegam ao banco agora, na mesma transação
+            flush_cart(db, user_id, store)
+
+        lines = _cart_lines(db, user_id)
+        if not lines:
+            raise EmptyCart(str(user_id))
+
+        now = datetime.utcnow()
+        order_id = uuid.uuid4()
+        items = [
+            {
+                "id": uuid.uuid4(),
+                "order_id": order_id,
+                "book_id": line.book_id,
+                "quantity": line.quantity,
+                "unit_price": line.price,
+                "subtotal": line.price * line.quantity,
+                "created_at": now,
+            }
+            for line in lines
+        ]
+        order = {
+            "id": order_id,
+            "user_id": user_id,
+            "status": OrderStatus.PENDING,
+            "total_amount": sum((item["subtotal"] for item in items), Decimal("0")),
+            "shipping_address": shipping_address,
+            "payment_method": payment_method,
+            "payment_status": PaymentStatus.PENDING,
+            "tracking_code": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+        db.execute(insert(Order).values(order))
+        db.execute(insert(OrderItem).values(items))
+        record_order(db, user_id, order["total_amount"], now)
+        inventory.reserve(db, items, order_id=order_id, status=ReservationStatus.COMMITTED)
+        cart_version = reset_cart(db, user_id)
+        order_created(db, order_id, user_id, [item["book_id"] for item in items], cart_version)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if store is not None:
+        try:
+            store.discard(user_id, cart_version)
+        except Exception as e:
+            logger.warning(f"Falha ao descartar carrinho do cart store | user_id={user_id} | error={e}")
+
+    books = {
+        line.book_id: {
+            "id": line.book_id,
+            "title": line.title,
+            "author": line.author,
+            "isbn": line.isbn,
+            "price": line.price,
+            "cover_image_url": line.cover_image_url,
+        }
+        for line in lines
+    }
+    order["items"] = [{**item, "book": books[item["book_id"]]} for item in items]
+    return order
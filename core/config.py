@@ -13,6 +13,36 @@ class Settings(BaseSettings):
     # Elasticsearch
     ELASTICSEARCH_URL: str = "http://localhost:9200"
     
+    # Catalog search
+    SEARCH_BACKEND: str = "memory"  # memory, postgres or elasticsearch
+    SEARCH_INDEX_TTL: int = 300  # Seconds before the in-process index is rebuilt
+    SEARCH_MAX_RESULTS: int = 1000  # Max ids sent to SQL as IN (...); larger result sets are filtered in the database instead
+    CATALOG_SNAPSHOT_REFRESH_SECONDS: float = 5.0  # How often catalog-service checks books.updated_at for changes
+    RESPONSE_CACHE_TTL: int = 60  # Seconds a cached catalog response stays valid
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_REDIS: bool = False  # Share cached responses between workers through REDIS_URL
+    INVENTORY_RESERVATION_TTL_SECONDS: int = 900  # Pending stock reservations are released after this
+    CATALOG_EVENTS_REDIS: bool = False  # Publish book changes on REDIS_URL so other services can drop cached books
+    CATALOG_EVENTS_CHANNEL: str = "catalog:books"
+    BOOK_CACHE_TTL_SECONDS: int = 300  # Book existence/price cached by services outside the catalog
+    BOOK_CACHE_MAX_ENTRIES: int = 10000
+
+    # Cart storage
+    CART_STORE: str = "sql"  # sql, memory (single process, tests only) or redis (active carts kept as one hash per cart)
+    CART_STORE_WRITE_MODE: str = "async"  # async (periodic flush of changed carts) or checkout (persist only at checkout)
+    CART_FLUSH_INTERVAL_SECONDS: float = 2.0
+    CART_STORE_TTL_SECONDS: int = 604800  # Idle carts expire from the store after a week
+
+    # Idempotency-Key (POST /orders, POST /payments)
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400  # Stored responses are replayed for a day
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 30  # How long a duplicate waits for the original request
+    IDEMPOTENCY_POOL_SIZE: int = 10  # Connections per process holding idempotency key locks, on top of DATABASE_POOL_SIZE
+
+    # Outbox (post-commit side effects of orders)
+    OUTBOX_WORKER: str = "local"  # local (background task in orders-service) or celery (tasks.outbox_tasks via beat)
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 5  # Failing events are retried this many times, then left with last_error
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
@@ -51,7 +81,11 @@ class Settings(BaseSettings):
     
     # ML Models
     MODEL_PATH: str = "/app/ml/models"
+    MODEL_MMAP: bool = True  # Share model arrays between worker processes via read-only mmap
     RECOMMENDATION_THRESHOLD: float = 0.5
+    SESSION_STORE: str = "memory"  # memory (per process) or redis (session buffers shared through REDIS_URL, fed by order purchases)
+    SESSION_LENGTH: int = 20  # Interactions kept per session
+    SESSION_TTL_SECONDS: int = 1800  # Idle sessions expire after this
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -0,0 +1,102 @@
+"""
+Contagens por faceta (categoria, faixa de preço, avaliação e ano de publicação)
+
+As contagens são feitas sobre o conjunto filtrado de livros, em memória pelo
+snapshot do catálogo ou com uma única consulta agrupada (GROUPING SETS) no
+banco, e formatadas aqui para que os dois caminhos devolvam o mesmo JSON.
+"""
+from typing import Dict, List, Any
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Query, Session
+from models.book import Book
+
+# Limites das faixas de preço: [0, 25), [25, 50), [50, 100), [100, ...)
+PRICE_EDGES = (25, 50, 100)
+
+# Faixas de avaliação cumulativas ("4 ou mais", "3 ou mais", ...), como o filtro min_rating
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+def empty_counts() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "categories": {},
+        "price": [0] * (len(PRICE_EDGES) + 1),
+        "rating": {threshold: 0 for threshold in RATING_THRESHOLDS},
+        "published_year": {},
+    }
+
+def cumulative_ratings(floor_counts: Dict[int, int]) -> Dict[int, int]:
+    """Contagem por piso da avaliação -> contagem de livros com avaliação >= cada limite."""
+    return {
+        threshold: sum(count for floor, count in floor_counts.items() if floor >= threshold)
+        for threshold in RATING_THRESHOLDS
+    }
+
+def format_facets(counts: Dict[str, Any], categories: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Formata as contagens brutas (chaves internas) no JSON devolvido pela API."""
+    price_bounds = (0,) + PRICE_EDGES + (None,)
+    return {
+        "total": counts["total"],
+        "categories": [
+            {"id": category["id"], "slug": category["slug"], "name": category["name"], "count": counts["categories"][category["id"]]}
+            for category in categories
+            if counts["categories"].get(category["id"])
+        ],
+        "price": [
+            {"min": price_bounds[band], "max": price_bounds[band + 1], "count": count}
+            for band, count in enumerate(counts["price"])
+        ],
+        "rating": [
+            {"min_rating": threshold, "count": counts["rating"][threshold]}
+            for threshold in RATING_THRESHOLDS
+        ],
+        "published_year": [
+            {"year": year, "count": count}
+            for year, count in sorted(counts["published_year"].items(), reverse=True)
+        ],
+    }
+
+def sql_facet_counts(db: Session, query: Query) -> Dict[str, Any]:
+    """Contagens brutas das facetas de uma query de livros já filtrada, em uma consulta.
+
+    A query não deve ter ordenação nem paginação aplicadas.
+    """
+    price_band = case(
+        *[(Book.price < edge, band) for band, edge in enumerate(PRICE_EDGES)],
+        else_=len(PRICE_EDGES)
+    )
+    filtered = query.order_by(None).with_entities(
+        Book.category_id.label("category_id"),
+        price_band.label("price_band"),
+        func.floor(func.coalesce(Book.average_rating, 0)).label("rating_floor"),
+        Book.published_year.label("published_year"),
+    ).subquery()
+
+    statement = select(
+        filtered.c.category_id,
+        filtered.c.price_band,
+        filtered.c.rating_floor,
+        filtered.c.published_year,
+        func.count().label("count"),
+    ).group_by(func.grouping_sets(
+        filtered.c.category_id,
+        filtered.c.price_band,
+        filtered.c.rating_floor,
+        filtered.c.published_year,
+    ))
+
+    counts = empty_counts()
+    rating_floors: Dict[int, int] = {}
+    for category_id, band, rating_floor, year, count in db.execute(statement):
+        # Em cada conjunto de agrupamento só a coluna agrupada vem preenchida
+        if category_id is not None:
+            counts["categories"][str(category_id)] = count
+        elif band is not None:
+            counts["price"][int(band)] = count
+            counts["total"] += count
+        elif rating_floor is not None:
+            rating_floors[int(rating_floor)] = count
+        elif year is not None:
+            counts["published_year"][year] = count
+    counts["rating"] = cumulative_ratings(rating_floors)
+    return counts
@@ -0,0 +1,180 @@
+"""
+Idempotency-Key para POSTs que criam recursos (pedidos, pagamentos)
+
+A primeira requisição com uma chave insere a linha em idempotency_keys e a
+mantém travada (SELECT ... FOR UPDATE, em uma sessão própria) enquanto
+processa; ao terminar grava o status e o corpo da resposta. Repetições da
+mesma chave esperam essa trava (até IDEMPOTENCY_LOCK_TIMEOUT_SECONDS) e
+recebem a resposta guardada, com o header Idempotent-Replayed.
+
+- a mesma chave com outro corpo de requisição é rejeitada (422);
+- se a primeira requisição falha, nada é guardado e a chave pode ser reusada;
+- respostas ficam guardadas por IDEMPOTENCY_KEY_TTL_SECONDS.
+
+A trava ocupa uma conexão durante todo o handler, que usa outra conexão
+(a sessão do endpoint). As travas usam um pool próprio
+(IDEMPOTENCY_POOL_SIZE): com o pool de core.database compartilhado,
+requisições concorrentes podiam ocupar todas as conexões com travas e
+esperar para sempre pela conexão do handler. Cada processo abre até
+DATABASE_POOL_SIZE + IDEMPOTENCY_POOL_SIZE conexões; acima de
+IDEMPOTENCY_POOL_SIZE requisições com chave simultâneas, as demais esperam
+na fila do pool antes de travar qualquer coisa.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Any, Callable, Awaitable
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, text, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from core.config import settings
+from models.idempotency import IdempotencyKey
+
+logger = logging.getLogger("core.idempotency")
+
+# Conexões que seguram as travas das chaves (separadas das do endpoint)
+lock_engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.IDEMPOTENCY_POOL_SIZE,
+    max_overflow=0
+)
+LockSession = sessionmaker(autocommit=False, autoflush=False, bind=lock_engine)
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# lock_not_available: a trava não saiu dentro do lock_timeout
+LOCK_NOT_AVAILABLE = "55P03"
+
+class IdempotencyKeyReused(Exception):
+    """A chave já foi usada com outro corpo de requisição."""
+
+class IdempotencyInProgress(Exception):
+    """A requisição original ainda está processando após o tempo de espera."""
+
+def request_hash(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")).hexdigest()
+
+class IdempotentRequest:
+    """Trava de uma chave durante o processamento, em uma transação separada da do endpoint."""
+
+    def __init__(self, scope: str, key: str, fingerprint: str):
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.session = LockSession()
+
+    def acquire(self) -> Optional[IdempotencyKey]:
+        """Trava a chave (criando-a se preciso); devolve o registro se já há resposta guardada."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        try:
+            self.session.execute(text(f"SET LOCAL lock_timeout = '{int(settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS * 1000)}ms'"))
+            # Duplicata concorrente espera aqui até a original fazer commit ou rollback
+            self.session.execute(insert(IdempotencyKey).values(
+                scope=self.scope, key=self.key, request_hash=self.fingerprint, created_at=now, expires_at=expires_at
+            ).on_conflict_do_nothing())
+            record = self.session.query(IdempotencyKey)\
+                .filter(IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key)\
+                .with_for_update().one()
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) == LOCK_NOT_AVAILABLE:
+                raise IdempotencyInProgress(self.key)
+            raise
+
+        if record.expires_at <= now:
+            # Chave expirada: vale como nova
+            record.request_hash = self.fingerprint
+            record.response_status = None
+            record.response_body = None
+            record.created_at = now
+            record.expires_at = expires_at
+            return None
+        if record.request_hash != self.fingerprint:
+            raise IdempotencyKeyReused(self.key)
+        return record if record.response_status is not None else None
+
+    def complete(self, status_code: int, body: Any) -> None:
+        """Guarda a resposta e libera a trava."""
+        try:
+            record = self.session.query(IdempotencyKey)\
+                .filter(IdempotencyKey.scope == self.scope, IdempotencyKey.key == self.key).one()
+            record.response_status = status_code
+            record.response_body = body
+            self.session.commit()
+            purge_expired(self.session)
+        finally:
+            self.session.close()
+
+    def abort(self) -> None:
+        """Libera a trava sem guardar nada (chave nova é descartada)."""
+        self.session.rollback()
+        self.session.close()
+
+def purge_expired(db, limit: int = 100) -> int:
+    """Apaga até limit chaves expiradas (com commit)."""
+    expired = select(IdempotencyKey.scope, IdempotencyKey.key)\
+        .where(IdempotencyKey.expires_at < datetime.utcnow())\
+        .limit(limit)
+    result = db.execute(
+        delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+    status_code: int = 200
+) -> Any:
+    """Executa handler uma única vez por chave; repetições recebem a resposta guardada.
+
+    handler devolve o corpo já em formato JSON. Sem Idempotency-Key o handler
+    só é executado.
+    """
+    if not idempotency_key:
+        return await handler()
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key deve ter no máximo {MAX_KEY_LENGTH} caracteres")
+
+    request = IdempotentRequest(scope, idempotency_key, request_hash(payload))
+    try:
+        # A espera pela trava bloqueia: fora do event loop
+        stored = await asyncio.to_thread(request.acquire)
+    except IdempotencyKeyReused:
+        request.abort()
+        raise HTTPException(status_code=422, detail="Idempotency-Key já usada com outra requisição")
+    except IdempotencyInProgress:
+        request.abort()
+        raise HTTPException(status_code=409, detail="Requisição com esta Idempotency-Key ainda em processamento")
+    except Exception:
+        request.abort()
+        raise
+
+    if stored is not None:
+        response = JSONResponse(content=stored.response_body, status_code=stored.response_status, headers={REPLAYED_HEADER: "true"})
+        request.abort()
+        logger.info(f"Resposta idempotente repetida | scope={scope} | key={idempotency_key}")
+        return response
+
+    try:
+        body = await handler()
+    except Exception:
+        request.abort()
+        raise
+
+    try:
+        request.complete(status_code, body)
+    except Exception as e:
+        # O recurso já foi criado; só a repetição deixa de ser garantida
+        logger.error(f"Falha ao guardar resposta idempotente | scope={scope} | key={idempotency_key} | error={str(e)}")
+    return JSONResponse(content=body, status_code=status_code)
@@ -0,0 +1,172 @@
+"""
+Reserva de estoque em lote
+
+Todos os itens de um pedido são descontados com um único
+UPDATE books ... FROM (VALUES ...) WHERE stock_quantity >= quantidade RETURNING:
+cada linha só muda se houver estoque, sem ler-alterar-gravar em Python. Se
+algum livro não voltar no RETURNING, nada é aplicado (o chamador faz rollback).
+
+Uma reserva nasce PENDING (estoque já descontado) e termina COMMITTED (pedido
+confirmado) ou RELEASED (estoque devolvido, por liberação explícita ou
+expiração). As transições são UPDATEs condicionais no status, então liberar
+duas vezes não devolve o estoque em dobro.
+"""
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple, Any, Iterable
+from uuid import UUID
+
+from sqlalchemy import update, values, column, case, Integer
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.book import Book
+from models.inventory import InventoryReservation, ReservationStatus
+
+class InsufficientStock(Exception):
+    """Algum livro não existe ou não tem estoque para a quantidade pedida."""
+
+    def __init__(self, book_ids: List[UUID]):
+        self.book_ids = book_ids
+        super().__init__(f"Estoque insuficiente para {len(book_ids)} livro(s)")
+
+class ReservationStateError(Exception):
+    """A reserva não está mais pendente (já confirmada, liberada ou expirada)."""
+
+def _requested(items: Iterable[Any]) -> List[Tuple[UUID, int]]:
+    """(book_id, quantidade) somando ids repetidos, ordenado por id.
+
+    A ordem fixa faz transações concorrentes travarem as linhas na mesma ordem.
+    """
+    totals: Dict[UUID, int] = {}
+    for item in items:
+        book_id = UUID(str(item["book_id"] if isinstance(item, dict) else item.book_id))
+        quantity = item["quantity"] if isinstance(item, dict) else item.quantity
+        totals[book_id] = totals.get(book_id, 0) + quantity
+    return sorted(totals.items(), key=lambda entry: str(entry[0]))
+
+def _requested_values(requested: List[Tuple[UUID, int]]):
+    return values(
+        column("book_id", PG_UUID(as_uuid=True)),
+        column("quantity", Integer),
+        name="requested"
+    ).data(requested)
+
+def decrement_stock(db: Session, items: Iterable[Any]) -> Dict[UUID, int]:
+    """Desconta o estoque de todos os itens em um UPDATE condicional.
+
+    Retorna o estoque restante por livro; levanta InsufficientStock (sem
+    desfazer: o chamador deve fazer rollback) se algum item não couber.
+    """
+    requested = _requested(items)
+    if not requested:
+        return {}
+    rows = _requested_values(requested)
+    statement = update(Book)\
+        .where(Book.id == rows.c.book_id, Book.stock_quantity >= rows.c.quantity)\
+        .values(stock_quantity=Book.stock_quantity - rows.c.quantity)\
+        .returning(Book.id, Book.stock_quantity)
+    remaining = dict(db.execute(statement, execution_options={"synchronize_session": False}).all())
+
+    missing = [book_id for book_id, _ in requested if book_id not in remaining]
+    if missing:
+        raise InsufficientStock(missing)
+    return remaining
+
+def increment_stock(db: Session, items: Iterable[Any]) -> None:
+    """Devolve ao estoque as quantidades dos itens (um único UPDATE)."""
+    requested = _requested(items)
+    if not requested:
+        return
+    rows = _requested_values(requested)
+    statement = update(Book)\
+        .where(Book.id == rows.c.book_id)\
+        .values(stock_quantity=Book.stock_quantity + rows.c.quantity)
+    db.execute(statement, execution_options={"synchronize_session": False})
+
+def adjust_stock(db: Session, book_id: UUID, change: int) -> Optional[int]:
+    """Soma change ao estoque atomicamente (sem ficar negativo); None se o livro não existir."""
+    new_quantity = Book.stock_quantity + change
+    statement = update(Book)\
+        .where(Book.id == book_id)\
+        .values(stock_quantity=case((new_quantity < 0, 0), else_=new_quantity))\
+        .returning(Book.stock_quantity)
+    return db.execute(statement, execution_options={"synchronize_session": False}).scalar()
+
+def reserve(
+    db: Session,
+    items: Iterable[Any],
+    order_id: Optional[UUID] = None,
+    ttl_seconds: Optional[int] = None,
+    status: ReservationStatus = ReservationStatus.PENDING
+) -> InventoryReservation:
+    """Desconta o estoque e registra a reserva (sem commit).
+
+    PENDING expira se não for confirmada; COMMITTED (checkout) já nasce definitiva.
+    """
+    requested = _requested(items)
+    decrement_stock(db, [{"book_id": book_id, "quantity": quantity} for book_id, quantity in requested])
+
+    ttl = ttl_seconds if ttl_seconds is not None else settings.INVENTORY_RESERVATION_TTL_SECONDS
+    reservation = InventoryReservation(
+        order_id=order_id,
+        status=status,
+        items=[{"book_id": str(book_id), "quantity": quantity} for book_id, quantity in requested],
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+    )
+    db.add(reservation)
+    db.flush()
+    return reservation
+
+def _transition(db: Session, reservation_id: UUID, status: ReservationStatus) -> Optional[List[Dict[str, Any]]]:
+    """Muda PENDING -> status; devolve os itens, ou None se a reserva não estava pendente."""
+    statement = update(InventoryReservation)\
+        .where(InventoryReservation.id == reservation_id, InventoryReservation.status == ReservationStatus.PENDING)\
+        .values(status=status)\
+        .returning(InventoryReservation.items)
+    return db.execute(statement, execution_options={"synchronize_session": False}).scalar()
+
+def commit_reservation(db: Session, reservation_id: UUID) -> None:
+    """Confirma a reserva: o estoque descontado passa a ser definitivo (sem commit)."""
+    if _transition(db, reservation_id, ReservationStatus.COMMITTED) is None:
+        raise ReservationStateError(str(reservation_id))
+
+def release_reservation(db: Session, reservation_id: UUID) -> None:
+    """Libera a reserva e devolve o estoque (sem commit)."""
+    items = _transition(db, reservation_id, ReservationStatus.RELEASED)
+    if items is None:
+        raise ReservationStateError(str(reservation_id))
+    increment_stock(db, items)
+
+def release_expired(db: Session, limit: int = 100) -> List[str]:
+    """Libera reservas pendentes expiradas (sem commit); retorna os livros cujo estoque voltou."""
+    expired = db.query(InventoryReservation.id)\
+        .filter(InventoryReservation.status == ReservationStatus.PENDING, InventoryReservation.expires_at < datetime.utcnow())\
+        .limit(limit).all()
+    book_ids: Dict[str, None] = {}
+    for (reservation_id,) in expired:
+        # Outra transação pode ter confirmado/liberado no meio do caminho
+        items = _transition(db, reservation_id, ReservationStatus.RELEASED)
+        if items is not None:
+            increment_stock(db, items)
+            book_ids.update((item["book_id"], None) for item in items)
+    return list(book_ids)
+
+def release_order(db: Session, order_id: UUID) -> int:
+    """Libera as reservas (pendentes ou confirmadas) de um pedido cancelado e devolve o estoque (sem commit)."""
+    return release_orders(db, [order_id])
+
+def release_orders(db: Session, order_ids: List[UUID]) -> int:
+    """Como release_order, para vários pedidos: um UPDATE nas reservas e um no estoque."""
+    if not order_ids:
+        return 0
+    statement = update(InventoryReservation)\
+        .where(
+            InventoryReservation.order_id.in_(order_ids),
+            InventoryReservation.status.in_([ReservationStatus.PENDING, ReservationStatus.COMMITTED])
+        )\
+        .values(status=ReservationStatus.RELEASED)\
+        .returning(InventoryReservation.items)
+    released = db.execute(statement, execution_options={"synchronize_session": False}).scalars().all()
+    increment_stock(db, [item for items in released for item in items])
+    return len(released)
@@ -0,0 +1,86 @@
+"""
+Efeitos de um pedido criado (evento "order.created" do outbox)
+
+O checkout (core.checkout) só faz a transação crítica: pedido, itens,
+estoque e itens do carrinho no banco. O restante roda depois do commit,
+pelo worker do outbox:
+- registrar as compras como interações (perfil de recomendação) e na
+  sessão do usuário (SESSION_STORE=redis), para as recomendações em tempo
+  real;
+- descartar a cópia do carrinho no cart store (Redis/memória), se houver;
+  o checkout já faz isso logo após o commit, e o handler é só a nova
+  tentativa caso aquela chamada tenha falhado;
+- publicar os livros comprados como alterados, para os caches de livros
+  (catálogo e cart-service) descartarem o estoque antigo.
+
+Não há cache de recomendações a invalidar: as recomendações são calculadas
+a partir das interações e da sessão, que os dois primeiros itens atualizam.
+
+Os dois últimos são idempotentes; o registro de interações roda no savepoint
+do evento e é desfeito se um handler seguinte falhar. Uma nova tentativa do
+evento pode repetir as compras na sessão, o que só reforça o mesmo sinal.
+"""
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core.cart_store import get_cart_store
+from core.catalog_events import publish_book_changes
+from core.outbox import on_event, add_event
+from core.session_store import get_session_store
+from models.recommendation import UserInteraction, InteractionType, INTERACTION_WEIGHTS
+
+ORDER_CREATED = "order.created"
+
+def order_created(db: Session, order_id: Any, user_id: Any, book_ids: List[Any], cart_version: int) -> None:
+    """Enfileira o evento de pedido criado na transação do checkout.
+
+    cart_version é a versão do carrinho depois do checkout (core.cart_store.reset_cart).
+    """
+    add_event(db, ORDER_CREATED, {
+        "order_id": str(order_id),
+        "user_id": str(user_id),
+        "book_ids": [str(book_id) for book_id in book_ids],
+        "cart_version": cart_version,
+    })
+
+@on_event(ORDER_CREATED)
+def record_purchase_interactions(db: Session, payload: Dict[str, Any]) -> None:
+    now = datetime.utcnow()
+    db.execute(insert(UserInteraction).values([
+        {
+            "id": uuid.uuid4(),
+            "user_id": uuid.UUID(payload["user_id"]),
+            "book_id": uuid.UUID(book_id),
+            "interaction_type": InteractionType.PURCHASE,
+            "interaction_value": INTERACTION_WEIGHTS[InteractionType.PURCHASE],
+            "created_at": now,
+        }
+        for book_id in payload["book_ids"]
+    ]))
+
+@on_event(ORDER_CREATED)
+def record_purchase_sessions(db: Session, payload: Dict[str, Any]) -> None:
+    store = get_session_store()
+    if store is not None:
+        weight = INTERACTION_WEIGHTS[InteractionType.PURCHASE]
+        store.record(payload["user_id"], [(book_id, weight) for book_id in payload["book_ids"]])
+
+@on_event(ORDER_CREATED)
+def clear_cart_store(db: Session, payload: Dict[str, Any]) -> None:
+    store = get_cart_store()
+    if store is None:
+        return
+    if "cart_version" in payload:
+        # Só descarta cópias anteriores ao checkout: itens adicionados depois dele ficam
+        store.discard(payload["user_id"], payload["cart_version"])
+    else:
+        # Eventos enfileirados antes de o payload ter a versão
+        store.clear(payload["user_id"])
+
+@on_event(ORDER_CREATED)
+def invalidate_book_caches(db: Session, payload: Dict[str, Any]) -> None:
+    publish_book_changes(payload["book_ids"])
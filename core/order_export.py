@@ -0,0 +1,121 @@
+"""
+Exportação de pedidos em streaming (relatórios)
+
+Uma única consulta (pedidos + itens + título do livro, em ordem de
+created_at, id) é lida com cursor no servidor (yield_per): só um lote de
+linhas fica em memória de cada vez, qualquer que seja o período exportado.
+As linhas são serializadas direto das tuplas do SQL, sem objetos ORM, em:
+- NDJSON: uma linha por pedido, com a lista de itens;
+- CSV: uma linha por item, repetindo as colunas do pedido.
+
+O texto sai em blocos de EXPORT_BATCH_SIZE linhas para o StreamingResponse.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Optional, Iterator, List, Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.book import Book
+from models.order import Order, OrderItem, OrderStatus
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = (
+    "order_id", "user_id", "status", "payment_status", "payment_method", "total_amount",
+    "tracking_code", "created_at", "updated_at",
+    "item_id", "book_id", "book_title", "quantity", "unit_price", "subtotal",
+)
+
+ORDER_COLUMNS = CSV_COLUMNS[:9]
+
+def export_rows(
+    db: Session,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None
+) -> Iterator[Any]:
+    """Linhas (pedido, item) do período em ordem de pedido, lidas em lotes do cursor do servidor."""
+    statement = select(
+        Order.id.label("order_id"), Order.user_id, Order.status, Order.payment_status, Order.payment_method,
+        Order.total_amount, Order.tracking_code, Order.created_at, Order.updated_at,
+        OrderItem.id.label("item_id"), OrderItem.book_id, Book.title.label("book_title"),
+        OrderItem.quantity, OrderItem.unit_price, OrderItem.subtotal
+    ).select_from(Order)\
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)\
+        .outerjoin(Book, Book.id == OrderItem.book_id)
+    if created_from is not None:
+        statement = statement.where(Order.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(Order.created_at < created_to)
+    if status is not None:
+        statement = statement.where(Order.status == status)
+    statement = statement.order_by(Order.created_at, Order.id, OrderItem.id)
+
+    result = db.execute(statement, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def ndjson_chunks(rows: Iterator[Any]) -> Iterator[str]:
+    """Um objeto JSON por pedido (itens agrupados); as linhas precisam vir em ordem de pedido."""
+    buffer: List[str] = []
+    order = None
+    for row in rows:
+        if order is None or order["order_id"] != _text(row.order_id):
+            if order is not None:
+                buffer.append(json.dumps(order))
+                if len(buffer) >= EXPORT_BATCH_SIZE:
+                    yield "\n".join(buffer) + "\n"
+                    buffer = []
+            order = {column: _text(getattr(row, column)) for column in ORDER_COLUMNS}
+            order["items"] = []
+        if row.item_id is not None:
+            order["items"].append({
+                "item_id": _text(row.item_id),
+                "book_id": _text(row.book_id),
+                "book_title": row.book_title,
+                "quantity": row.quantity,
+                "unit_price": _text(row.unit_price),
+                "subtotal": _text(row.subtotal),
+            })
+    if order is not None:
+        buffer.append(json.dumps(order))
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+def csv_chunks(rows: Iterator[Any]) -> Iterator[str]:
+    """Cabeçalho e uma linha por item (pedidos sem itens saem com as colunas de item vazias)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow([_text(getattr(row, column)) for column in CSV_COLUMNS])
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
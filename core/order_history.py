@@ -0,0 +1,112 @@
+"""
+Histórico de pedidos: listagem keyset de resumos e totais por usuário
+
+A listagem devolve OrderSummary (sem itens nem livros), com items_count
+calculado no próprio SQL, ordenada por (created_at, id) decrescente e
+paginada por cursor (X-Next-Cursor). Os detalhes do pedido vêm de
+GET /orders/{id}.
+
+user_order_summaries guarda os totais de cada usuário e é atualizada com
+upserts atômicos na mesma transação que cria ou cancela o pedido.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, List, Dict, Tuple, Any, Iterable
+from uuid import UUID
+
+from sqlalchemy import func, select, tuple_, update, values, column, Integer, Numeric
+from sqlalchemy.dialects.postgresql import insert, UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from core.pagination import encode_cursor, decode_cursor
+from models.order import Order, OrderItem, OrderStatus, UserOrderSummary
+
+HISTORY_SORT_FIELDS = ("created_at", "id")
+
+def _decode_history_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """(created_at, id) do cursor; ValueError também para valores de outro tipo."""
+    cursor_values, _ = decode_cursor(cursor, HISTORY_SORT_FIELDS)
+    created_at, order_id = cursor_values
+    if not isinstance(created_at, str) or not isinstance(order_id, str):
+        raise ValueError("Cursor inválido: valores devem ser texto")
+    return datetime.fromisoformat(created_at), UUID(order_id)
+
+def order_history(
+    db: Session,
+    user_id: Any,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    status: Optional[OrderStatus] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página de resumos de pedidos (mais recentes primeiro) e o cursor da próxima página.
+
+    ValueError se o cursor for inválido.
+    """
+    items_count = select(func.count(OrderItem.id))\
+        .where(OrderItem.order_id == Order.id)\
+        .correlate(Order)\
+        .scalar_subquery()
+    query = db.query(
+        Order.id, Order.status, Order.total_amount, Order.created_at, items_count.label("items_count")
+    ).filter(Order.user_id == user_id)
+    if status is not None:
+        query = query.filter(Order.status == status)
+    if cursor:
+        created_at, order_id = _decode_history_cursor(cursor)
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(created_at, order_id))
+
+    rows = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(HISTORY_SORT_FIELDS, [rows[-1].created_at, rows[-1].id])
+    return [row._asdict() for row in rows], next_cursor
+
+def record_order(db: Session, user_id: Any, total_amount: Decimal, created_at: datetime) -> None:
+    """Soma um pedido novo aos totais do usuário (sem commit)."""
+    statement = insert(UserOrderSummary).values(
+        user_id=user_id, orders_count=1, cancelled_count=0, total_spent=total_amount,
+        last_order_at=created_at, updated_at=created_at
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[UserOrderSummary.user_id],
+        set_={
+            "orders_count": UserOrderSummary.orders_count + 1,
+            "total_spent": UserOrderSummary.total_spent + statement.excluded.total_spent,
+            "last_order_at": func.greatest(UserOrderSummary.last_order_at, statement.excluded.last_order_at),
+            "updated_at": statement.excluded.updated_at,
+        }
+    ))
+
+def record_cancellation(db: Session, user_id: Any, total_amount: Decimal) -> None:
+    """Tira um pedido cancelado do total gasto do usuário (sem commit)."""
+    db.query(UserOrderSummary)\
+        .filter(UserOrderSummary.user_id == user_id)\
+        .update({
+            UserOrderSummary.cancelled_count: UserOrderSummary.cancelled_count + 1,
+            UserOrderSummary.total_spent: UserOrderSummary.total_spent - total_amount,
+            UserOrderSummary.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
+
+def record_cancellations(db: Session, cancelled: Iterable[Tuple[Any, Decimal]]) -> None:
+    """Como record_cancellation, para vários pedidos (user_id, total): um UPDATE para todos os usuários."""
+    totals: Dict[UUID, Tuple[int, Decimal]] = {}
+    for user_id, total_amount in cancelled:
+        count, amount = totals.get(user_id, (0, Decimal("0")))
+        totals[user_id] = (count + 1, amount + total_amount)
+    if not totals:
+        return
+    rows = values(
+        column("user_id", PG_UUID(as_uuid=True)),
+        column("cancelled", Integer),
+        column("amount", Numeric(10, 2)),
+        name="cancelled"
+    ).data([(user_id, count, amount) for user_id, (count, amount) in totals.items()])
+    statement = update(UserOrderSummary)\
+        .where(UserOrderSummary.user_id == rows.c.user_id)\
+        .values(
+            cancelled_count=UserOrderSummary.cancelled_count + rows.c.cancelled,
+            total_spent=UserOrderSummary.total_spent - rows.c.amount,
+            updated_at=datetime.utcnow()
+        )
+    db.execute(statement, execution_options={"synchronize_session": False})
@@ -0,0 +1,114 @@
+"""
+Transições de status de pedidos em lote (admin)
+
+Todas as mudanças pedidas entram em um único
+UPDATE orders ... FROM (VALUES (order_id, status, tracking_code)) RETURNING:
+a transição é validada no próprio WHERE (status atual -> status pedido
+precisa estar em ALLOWED_TRANSITIONS), então não há leitura prévia nem
+objetos ORM carregados. Os pedidos que não voltam no RETURNING são
+classificados com uma consulta de (id, status).
+
+Pedidos cancelados devolvem o estoque e saem dos totais dos usuários com
+UPDATEs em conjunto (core.inventory.release_orders e
+core.order_history.record_cancellations), na mesma transação.
+
+cancel_order faz o mesmo para um pedido (endpoints do usuário), também
+com UPDATE condicional no status.
+"""
+from datetime import datetime
+from typing import List, Dict, Any, Iterable
+from uuid import UUID
+
+from sqlalchemy import update, values, column, cast, func, or_, and_, String
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+from core import inventory
+from core.order_history import record_cancellation, record_cancellations
+from models.order import Order, OrderStatus
+from schemas.order import OrderStatusResult
+
+# Status atual -> status para os quais o pedido pode ir
+ALLOWED_TRANSITIONS = {
+    OrderStatus.PENDING: (OrderStatus.PAID, OrderStatus.CANCELLED),
+    OrderStatus.PAID: (OrderStatus.SHIPPED, OrderStatus.CANCELLED),
+    OrderStatus.SHIPPED: (OrderStatus.DELIVERED,),
+}
+
+def cancel_order(db: Session, order_id: Any, from_statuses: Iterable[OrderStatus]) -> bool:
+    """Cancela o pedido se ele ainda estiver em um de from_statuses (sem commit).
+
+    A mudança é um UPDATE condicional no status: entre cancelamentos
+    concorrentes (ou um cancelamento em lote), só um recebe a linha de volta e
+    devolve o estoque/atualiza os totais do usuário. Retorna False se o pedido
+    não estava mais em from_statuses.
+    """
+    statement = update(Order)\
+        .where(Order.id == order_id, Order.status.in_(list(from_statuses)))\
+        .values(status=OrderStatus.CANCELLED, updated_at=datetime.utcnow())\
+        .returning(Order.user_id, Order.total_amount)
+    cancelled = db.execute(statement, execution_options={"synchronize_session": False}).first()
+    if cancelled is None:
+        return False
+    inventory.release_order(db, order_id)
+    record_cancellation(db, cancelled.user_id, cancelled.total_amount)
+    return True
+
+def _changes_values(changes: List[Any]):
+    return values(
+        column("order_id", PG_UUID(as_uuid=True)),
+        column("status", String),
+        column("tracking_code", String),
+        name="changes"
+    ).data([(change.order_id, change.status.name, change.tracking_code) for change in changes])
+
+def bulk_transition(db: Session, changes: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Aplica as mudanças (order_id, status, tracking_code) e faz commit; um resultado por pedido.
+
+    Ids repetidos valem pela última mudança da lista.
+    """
+    requested = list({change.order_id: change for change in changes}.values())
+    rows = _changes_values(requested)
+    new_status = cast(rows.c.status, Order.status.type)
+    allowed = or_(*[
+        and_(Order.status == current, new_status.in_(targets))
+        for current, targets in ALLOWED_TRANSITIONS.items()
+    ])
+    statement = update(Order)\
+        .where(Order.id == rows.c.order_id, allowed)\
+        .values(
+            status=new_status,
+            tracking_code=func.coalesce(rows.c.tracking_code, Order.tracking_code),
+            updated_at=datetime.utcnow()
+        )\
+        .returning(Order.id, Order.status, Order.user_id, Order.total_amount)
+    try:
+        updated = db.execute(statement, execution_options={"synchronize_session": False}).all()
+        cancelled = [row for row in updated if row.status == OrderStatus.CANCELLED]
+        if cancelled:
+            inventory.release_orders(db, [row.id for row in cancelled])
+            record_cancellations(db, [(row.user_id, row.total_amount) for row in cancelled])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    results = {row.id: (OrderStatusResult.UPDATED, row.status) for row in updated}
+    pending = [change.order_id for change in requested if change.order_id not in results]
+    if pending:
+        current = dict(db.query(Order.id, Order.status).filter(Order.id.in_(pending)).all())
+        for change in requested:
+            if change.order_id in results:
+                continue
+            status = current.get(change.order_id)
+            if status is None:
+                results[change.order_id] = (OrderStatusResult.NOT_FOUND, None)
+            elif status == change.status:
+                results[change.order_id] = (OrderStatusResult.UNCHANGED, status)
+            else:
+                results[change.order_id] = (OrderStatusResult.INVALID_TRANSITION, status)
+
+    return [
+        {"order_id": change.order_id, "result": results[change.order_id][0], "status": results[change.order_id][1]}
+        for change in requested
+    ]
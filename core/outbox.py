@@ -0,0 +1,99 @@
+"""
+Outbox transacional
+
+Efeitos colaterais de uma escrita (limpar caches, registrar interações,
+notificar outros serviços) não rodam dentro da requisição: a escrita grava
+um OutboxEvent na mesma transação (add_event) e um worker processa os
+eventos pendentes depois do commit (dispatch_pending):
+- OUTBOX_WORKER=local: tarefa em segundo plano no orders-service, acordada
+  logo após cada checkout (wake) e, no pior caso, a cada OUTBOX_POLL_INTERVAL_SECONDS;
+- OUTBOX_WORKER=celery: tarefa periódica tasks.outbox_tasks.process_outbox.
+
+Os eventos são lidos com FOR UPDATE SKIP LOCKED, então vários workers podem
+rodar ao mesmo tempo sem processar o mesmo evento. Cada evento roda em um
+savepoint: se um handler falha, as escritas dos handlers daquele evento são
+desfeitas e o evento é tentado de novo (até OUTBOX_MAX_ATTEMPTS). Handlers
+devem portanto ser idempotentes fora do banco.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.outbox import OutboxEvent
+
+logger = logging.getLogger("core.outbox")
+
+OutboxHandler = Callable[[Session, Dict[str, Any]], None]
+
+_handlers: Dict[str, List[OutboxHandler]] = {}
+
+def on_event(event_type: str):
+    """Registra um handler(db, payload) para um tipo de evento; handlers rodam na ordem de registro."""
+    def register(handler: OutboxHandler) -> OutboxHandler:
+        _handlers.setdefault(event_type, []).append(handler)
+        return handler
+    return register
+
+def add_event(db: Session, event_type: str, payload: Dict[str, Any]) -> None:
+    """Grava o evento na transação corrente (sem commit): só é processado se ela fizer commit."""
+    db.add(OutboxEvent(event_type=event_type, payload=payload, attempts=0))
+
+def dispatch_pending(db: Session, limit: int = 100) -> int:
+    """Processa até limit eventos pendentes e faz commit; retorna quantos foram concluídos."""
+    events = db.query(OutboxEvent)\
+        .filter(OutboxEvent.processed_at.is_(None), OutboxEvent.attempts < settings.OUTBOX_MAX_ATTEMPTS)\
+        .order_by(OutboxEvent.created_at)\
+        .limit(limit)\
+        .with_for_update(skip_locked=True)\
+        .all()
+
+    processed = 0
+    for event in events:
+        try:
+            with db.begin_nested():
+                for handler in _handlers.get(event.event_type, []):
+                    handler(db, event.payload)
+        except Exception as e:
+            event.attempts += 1
+            event.last_error = str(e)[:1000]
+            logger.error(f"Falha ao processar evento do outbox | event_id={event.id} | type={event.event_type} | attempts={event.attempts} | error={str(e)}")
+            continue
+        event.processed_at = datetime.utcnow()
+        processed += 1
+
+    db.commit()
+    return processed
+
+# Worker local: acordado pelo checkout para não esperar o próximo intervalo
+_wakeup: Optional[asyncio.Event] = None
+
+def wake() -> None:
+    """Avisa o worker local que há eventos novos (no-op sem worker local rodando)."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+async def run_local_worker(session_factory: Callable[[], Session]) -> None:
+    """Loop do worker local: processa os eventos pendentes a cada wake() ou intervalo."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+        db = session_factory()
+        try:
+            processed = await asyncio.to_thread(dispatch_pending, db)
+            if processed:
+                logger.info(f"Eventos do outbox processados | events={processed}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro no worker do outbox | error={str(e)}")
+        finally:
+            db.close()
@@ -0,0 +1,142 @@
+"""
+Paginação keyset (cursor) das listagens de livros
+
+Em vez de OFFSET, cada página continua a partir da tupla de ordenação do
+último livro entregue, então páginas profundas custam o mesmo que a primeira.
+Os cursores são opacos (base64 de JSON) e viajam nos headers X-Next-Cursor e
+X-Prev-Cursor, mantendo o corpo da resposta como lista de livros.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, List, Dict, Tuple, Any, Callable
+from uuid import UUID
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from models.book import Book
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+CURSOR_HEADERS = (NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER)
+
+# sort_by -> (campos da tupla de ordenação, decrescente); o id desempata
+BOOK_SORT_KEYS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "relevance": (("average_rating", "total_reviews", "id"), True),
+    "rating": (("average_rating", "id"), True),
+    "price_asc": (("price", "id"), False),
+    "price_desc": (("price", "id"), True),
+    "newest": (("created_at", "id"), True),
+    "oldest": (("created_at", "id"), False),
+}
+
+# Relevância da busca textual, quando presente, é o primeiro campo da tupla
+SEARCH_RANK_FIELD = "search_rank"
+
+# Conversão dos valores do cursor (JSON) para os tipos das colunas
+FIELD_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "average_rating": float,
+    "total_reviews": int,
+    "price": Decimal,
+    "created_at": datetime.fromisoformat,
+    "id": UUID,
+    SEARCH_RANK_FIELD: float,
+}
+
+def sort_fields(sort_by: Optional[str], searching: bool = False) -> Tuple[Tuple[str, ...], bool]:
+    """Campos da tupla de ordenação e direção para um sort_by (padrão: relevance)."""
+    sort_by = sort_by if sort_by in BOOK_SORT_KEYS else "relevance"
+    fields, descending = BOOK_SORT_KEYS[sort_by]
+    if searching and sort_by == "relevance":
+        fields = (SEARCH_RANK_FIELD,) + fields
+    return fields, descending
+
+def json_value(value: Any) -> Any:
+    """Valor de ordenação no formato em que aparece no JSON da API."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+def encode_cursor(fields: Tuple[str, ...], values: List[Any], backward: bool = False) -> str:
+    """Cursor opaco para continuar depois (ou antes, se backward) da tupla dada."""
+    payload = {"f": list(fields), "v": [json_value(value) for value in values], "b": backward}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+def decode_cursor(cursor: str, fields: Tuple[str, ...]) -> Tuple[List[Any], bool]:
+    """Valores (JSON) e direção de um cursor; ValueError se for inválido ou de outra ordenação."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values, backward = payload["v"], bool(payload["b"])
+        if tuple(payload["f"]) != tuple(fields) or len(values) != len(fields):
+            raise ValueError("cursor de outra ordenação")
+        return values, backward
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+class BookKeyset:
+    """Paginação keyset de uma query SQLAlchemy de livros.
+
+    Filtra com comparação de tuplas ((a, b, id) < (:a, :b, :id)), ordena pela
+    mesma tupla e busca limit + 1 linhas para saber se há próxima página.
+    """
+
+    def __init__(self, sort_by: Optional[str], search_rank: Any = None):
+        self.fields, self.descending = sort_fields(sort_by, searching=search_rank is not None)
+        self.expressions = [
+            search_rank if field == SEARCH_RANK_FIELD else getattr(Book, field)
+            for field in self.fields
+        ]
+        self.cursor: Optional[str] = None
+        self.backward = False
+
+    def apply(self, query: Query, cursor: Optional[str]) -> Query:
+        """Aplica o filtro do cursor e a ordenação; ValueError se o cursor for inválido."""
+        self.cursor = cursor
+        if cursor:
+            values, self.backward = decode_cursor(cursor, self.fields)
+            bound = [FIELD_PARSERS[field](value) for field, value in zip(self.fields, values)]
+            row = tuple_(*self.expressions)
+            query = query.filter(row < tuple_(*bound) if self.descending != self.backward else row > tuple_(*bound))
+
+        descending = self.descending != self.backward
+        return query.order_by(*[expression.desc() if descending else expression.asc() for expression in self.expressions])
+
+    def values(self, book: Book, search_rank: Any = None) -> List[Any]:
+        return [search_rank if field == SEARCH_RANK_FIELD else getattr(book, field) for field in self.fields]
+
+    def page(
+        self,
+        rows: List[Any],
+        limit: int,
+        values: Callable[[Any], List[Any]],
+        skip: int = 0
+    ) -> Tuple[List[Any], Optional[str], Optional[str]]:
+        """Corta as limit + 1 linhas buscadas e gera os cursores vizinhos.
+
+        Retorna (linhas da página, cursor da próxima, cursor da anterior).
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if self.backward:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if has_more or self.backward:
+                next_cursor = encode_cursor(self.fields, values(rows[-1]))
+            if (has_more and self.backward) or (not self.backward and (self.cursor or skip > 0)):
+                prev_cursor = encode_cursor(self.fields, values(rows[0]), backward=True)
+        return rows, next_cursor, prev_cursor
+
+def cursor_headers(next_cursor: Optional[str], prev_cursor: Optional[str]) -> Dict[str, str]:
+    """Headers de resposta com os cursores presentes."""
+    headers = {}
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if prev_cursor:
+        headers[PREV_CURSOR_HEADER] = prev_cursor
+    return headers
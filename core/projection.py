@@ -0,0 +1,68 @@
+"""
+Projeção de campos nas listagens de livros (parâmetro fields=)
+
+Em vez do schema Book completo (com categoria e tags aninhadas), a listagem
+pode devolver só algumas colunas: "summary" (id, título, autor, preço, capa e
+avaliação) ou uma lista separada por vírgulas. Os conversores de cada conjunto
+de campos são montados uma vez e reaproveitados.
+"""
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from typing import Optional, List, Dict, Tuple, Any, Callable, Iterable
+
+from schemas.book import BOOK_COLUMN_FIELDS, BOOK_SUMMARY_FIELDS
+
+SUMMARY = "summary"
+
+# Conversão das colunas para o formato JSON do schema Book (mesmo formato do Pydantic)
+FIELD_SERIALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "id": str,
+    "category_id": str,
+    "price": str,
+    "created_at": datetime.isoformat,
+    "updated_at": datetime.isoformat,
+}
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Campos pedidos em fields=; None devolve o livro completo. ValueError se algum campo não existir."""
+    if not fields:
+        return None
+    if fields == SUMMARY:
+        return BOOK_SUMMARY_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in BOOK_COLUMN_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Campos inválidos em fields: {', '.join(unknown) or fields}")
+    return names
+
+@lru_cache(maxsize=128)
+def _row_serializer(fields: Tuple[str, ...]) -> Callable[[Any], Dict[str, Any]]:
+    converters = [(field, FIELD_SERIALIZERS.get(field)) for field in fields]
+
+    def serialize(row: Any) -> Dict[str, Any]:
+        item = {}
+        for field, convert in converters:
+            value = getattr(row, field)
+            item[field] = convert(value) if convert is not None and value is not None else value
+        return item
+    return serialize
+
+def serialize_rows(rows: Iterable[Any], fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Linhas do banco (ou livros ORM) com só os campos pedidos, já no formato JSON."""
+    serialize = _row_serializer(fields)
+    return [serialize(row) for row in rows]
+
+@lru_cache(maxsize=128)
+def payload_projector(fields: Tuple[str, ...]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Recorte de um livro já serializado nos campos pedidos, montado uma vez por conjunto de campos."""
+    getter = itemgetter(*fields)
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda payload: {field: getter(payload)}
+    return lambda payload: dict(zip(fields, getter(payload)))
+
+def project(payloads: Iterable[Dict[str, Any]], fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Recorta livros já serializados (ex.: do snapshot) nos campos pedidos."""
+    projector = payload_projector(fields)
+    return [projector(payload) for payload in payloads]
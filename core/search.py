@@ -0,0 +1,388 @@
+"""
+Busca textual do catálogo com backend plugável
+
+Substitui os quatro ILIKE '%termo%' (que forçam seq scan em books) por um
+mecanismo com ranking e comparação sem acentos:
+
+- memory: índice invertido em processo, construído a partir do catálogo
+- postgres: tsvector/GIN em português com fallback trigram para ISBN e termos parciais
+- elasticsearch: índice "books" no Elasticsearch do compose (opcional)
+
+O backend é escolhido por SEARCH_BACKEND.
+"""
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from operator import itemgetter
+from typing import Optional, List, Dict, Tuple, Any
+from uuid import UUID
+from sqlalchemy import case, false, func, literal, or_
+from sqlalchemy.orm import Session, Query
+from core.config import settings
+from models.book import Book
+
+logger = logging.getLogger("core.search")
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Peso de cada campo do livro no ranking
+FIELD_WEIGHTS = (("title", 3.0), ("author", 2.0), ("publisher", 1.0), ("isbn", 1.0))
+
+# Termos que só casam por prefixo ("roman" -> "romance") valem menos que o termo exato
+PREFIX_WEIGHT = 0.5
+MIN_PREFIX_LENGTH = 2
+
+LIKE_ESCAPE = "\\"
+
+def normalize_text(text: Optional[str]) -> str:
+    """Minúsculas e sem acentos: "Coração" -> "coracao"."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Quebra o texto normalizado em termos."""
+    return TOKEN_RE.findall(normalize_text(text))
+
+def like_contains(text: str) -> str:
+    """Padrão LIKE '%texto%' em que %, _ e o próprio escape do texto valem como literais (usar com escape=LIKE_ESCAPE)."""
+    escaped = text.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+    return f"%{escaped}%"
+
+def book_terms(book: Any) -> Dict[str, float]:
+    """Termos de um livro com o peso acumulado dos campos em que aparecem."""
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        value = getattr(book, field, None)
+        tokens = tokenize(value)
+        if field == "isbn" and len(tokens) > 1:
+            # ISBN também indexado sem hífens, para buscas por "9788535902778"
+            tokens.append("".join(tokens))
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+class SearchBackend:
+    """Interface dos backends de busca."""
+
+    def apply(self, db: Session, query: Query, text: str) -> Tuple[Query, Any]:
+        """Filtra a query pelos livros que casam com o texto.
+
+        Retorna a query filtrada e uma expressão de relevância para ordenação.
+        """
+        raise NotImplementedError
+
+    def index_book(self, book: Book) -> None:
+        """Atualiza o livro no índice após create/update."""
+
+    def remove_book(self, book_id: Any) -> None:
+        """Remove o livro do índice após delete."""
+
+    def invalidate(self) -> None:
+        """Descarta o índice; ele é reconstruído na próxima busca."""
+
+class RankedSearchBackend(SearchBackend):
+    """Backend que devolve ids ranqueados fora do banco (memória, Elasticsearch).
+
+    Em `apply` os ids entram na query como um IN e a relevância como um CASE,
+    então filtros, ordenação e paginação continuam sendo feitos em SQL. O IN
+    leva no máximo `max_results` ids: se a busca casar com mais livros, o
+    filtro passa a ser feito no banco, sem descartar resultados e com um SQL
+    de tamanho fixo (PostgresSearchBackend no PostgreSQL, LIKE por termo nos
+    demais bancos).
+    """
+
+    def __init__(self, max_results: int = 1000):
+        self.max_results = max_results
+
+    def search(self, db: Session, text: str, limit: Optional[int]) -> List[Tuple[UUID, float]]:
+        """(book_id, relevância) dos livros que casam, os mais relevantes primeiro; limit=None devolve todos."""
+        raise NotImplementedError
+
+    def apply(self, db: Session, query: Query, text: str) -> Tuple[Query, Any]:
+        results = self.search(db, text, self.max_results + 1)
+        if not results:
+            return query.filter(false()), literal(0.0)
+
+        if len(results) > self.max_results:
+            logger.info(f"Busca acima de SEARCH_MAX_RESULTS, filtrando no banco | text={text} | max_results={self.max_results}")
+            if db.get_bind().dialect.name == "postgresql":
+                return PostgresSearchBackend().apply(db, query, text)
+            return self._apply_text_filter(query, text, results[:self.max_results])
+
+        scores = {book_id: score for book_id, score in results}
+        rank = case(scores, value=Book.id, else_=0.0)
+        return query.filter(Book.id.in_(list(scores))), rank
+
+    @staticmethod
+    def _apply_text_filter(query: Query, text: str, top: List[Tuple[UUID, float]]) -> Tuple[Query, Any]:
+        """Fallback fora do PostgreSQL: cada termo precisa aparecer (LIKE) em algum campo do livro.
+
+        O CASE de relevância cobre só os livros de `top`; os demais casam com 0.
+        Sem unaccent, termos sem acento não casam com campos acentuados.
+        """
+        fields = [func.lower(getattr(Book, field)) for field, _ in FIELD_WEIGHTS]
+        for token in tokenize(text):
+            pattern = like_contains(token)
+            query = query.filter(or_(*[field.like(pattern, escape=LIKE_ESCAPE) for field in fields]))
+        rank = case(dict(top), value=Book.id, else_=0.0) if top else literal(0.0)
+        return query, rank
+
+class InMemorySearchBackend(RankedSearchBackend):
+    """Índice invertido em processo sobre título, autor, editora e ISBN.
+
+    Cada termo aponta para {book_id: peso}; a busca exige todos os termos
+    (AND), pontua com peso do campo * idf e aceita prefixos para termos
+    parciais. O índice é reconstruído a cada `ttl` segundos e mantido em dia
+    pelos endpoints de escrita do próprio worker; workers diferentes convergem
+    no máximo após `ttl`.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_results: int = 1000):
+        super().__init__(max_results)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[UUID, float]] = {}
+        self._documents: Dict[UUID, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []  # ordenado, para busca por prefixo com bisect
+        self._built_at: Optional[float] = None
+
+    def rebuild(self, db: Session) -> None:
+        """Reconstrói o índice a partir da tabela books."""
+        started = time.monotonic()
+        postings: Dict[str, Dict[UUID, float]] = {}
+        documents: Dict[UUID, Dict[str, float]] = {}
+
+        rows = db.query(Book.id, Book.title, Book.author, Book.publisher, Book.isbn).yield_per(5000)
+        for row in rows:
+            terms = book_terms(row)
+            documents[row.id] = terms
+            for term, weight in terms.items():
+                postings.setdefault(term, {})[row.id] = weight
+
+        with self._lock:
+            self._postings = postings
+            self._documents = documents
+            self._vocabulary = sorted(postings)
+            self._built_at = time.monotonic()
+
+        logger.info(
+            f"Índice de busca reconstruído | books={len(documents)} | terms={len(postings)} "
+            f"| duration_ms={(time.monotonic() - started) * 1000:.1f}"
+        )
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    def index_book(self, book: Book) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(book.id)
+            terms = book_terms(book)
+            self._documents[book.id] = terms
+            for term, weight in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                self._postings[term][book.id] = weight
+
+    def remove_book(self, book_id: Any) -> None:
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(book_id)
+
+    def _remove(self, book_id: Any) -> None:
+        for term in self._documents.pop(book_id, {}):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect.bisect_left(self._vocabulary, term)
+                if position < len(self._vocabulary) and self._vocabulary[position] == term:
+                    del self._vocabulary[position]
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Termos do vocabulário que casam com o token: exato e, se longo o bastante, por prefixo."""
+        matches = [(token, 1.0)] if token in self._postings else []
+        if len(token) >= MIN_PREFIX_LENGTH:
+            start = bisect.bisect_left(self._vocabulary, token)
+            end = bisect.bisect_left(self._vocabulary, token + "\uffff", start)
+            matches.extend((term, PREFIX_WEIGHT) for term in self._vocabulary[start:end] if term != token)
+        return matches
+
+    def search(self, db: Session, text: str, limit: int) -> List[Tuple[UUID, float]]:
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return []
+
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self.rebuild(db)
+
+        with self._lock:
+            n_documents = len(self._documents)
+            scores: Optional[Dict[UUID, float]] = None
+            for token in tokens:
+                token_scores: Dict[UUID, float] = {}
+                for term, match_weight in self._expand(token):
+                    postings = self._postings[term]
+                    idf = math.log(1 + n_documents / len(postings))
+                    for book_id, weight in postings.items():
+                        # Cada token conta uma vez por livro: vale o melhor termo casado
+                        score = match_weight * weight * idf
+                        if score > token_scores.get(book_id, 0.0):
+                            token_scores[book_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {book_id: score + token_scores[book_id] for book_id, score in scores.items() if book_id in token_scores}
+                if not scores:
+                    return []
+
+        if limit is None:
+            return sorted(scores.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+class PostgresSearchBackend(SearchBackend):
+    """Busca no PostgreSQL com tsvector/GIN e fallback trigram.
+
+    Depende da migração de busca (extensões unaccent e pg_trgm, função
+    books_search_document e índices GIN). Os termos viram prefixos em um
+    tsquery português ("amor:* & perdi:*"); ISBN e trechos no meio do título
+    casam pelos índices trigram.
+    """
+
+    def apply(self, db: Session, query: Query, text: str) -> Tuple[Query, Any]:
+        tokens = tokenize(text)
+        if not tokens:
+            return query, literal(0.0)
+
+        normalized = " ".join(tokens)
+        document = func.books_search_document(Book.title, Book.author, Book.publisher)
+        ts_query = func.to_tsquery("portuguese", " & ".join(f"{token}:*" for token in tokens))
+        title = func.f_unaccent(func.lower(Book.title))
+
+        query = query.filter(
+            or_(
+                document.op("@@")(ts_query),
+                title.like(like_contains(normalized), escape=LIKE_ESCAPE),
+                Book.isbn.ilike(like_contains(text.strip()), escape=LIKE_ESCAPE)
+            )
+        )
+        rank = func.greatest(func.ts_rank_cd(document, ts_query), func.similarity(title, normalized))
+        return query, rank
+
+class ElasticsearchSearchBackend(RankedSearchBackend):
+    """Busca no índice "books" do Elasticsearch (analisador com asciifolding).
+
+    O índice é mantido pelos endpoints de escrita; `rebuild` recria tudo a
+    partir do banco.
+    """
+
+    INDEX = "books"
+
+    def __init__(self, url: str, max_results: int = 1000):
+        super().__init__(max_results)
+        from elasticsearch import Elasticsearch
+
+        self.client = Elasticsearch(url)
+
+    def _ensure_index(self) -> None:
+        if self.client.indices.exists(index=self.INDEX):
+            return
+        self.client.indices.create(
+            index=self.INDEX,
+            settings={
+                "analysis": {
+                    "analyzer": {
+                        "folded_portuguese": {
+                            "tokenizer": "standard",
+                            "filter": ["lowercase", "asciifolding"]
+                        }
+                    }
+                }
+            },
+            mappings={
+                "properties": {
+                    field: {"type": "text", "analyzer": "folded_portuguese"}
+                    for field, _ in FIELD_WEIGHTS
+                }
+            }
+        )
+
+    @staticmethod
+    def _document(book: Any) -> Dict[str, Any]:
+        return {field: getattr(book, field, None) for field, _ in FIELD_WEIGHTS}
+
+    def rebuild(self, db: Session) -> None:
+        """Reindexa todos os livros."""
+        from elasticsearch import helpers
+
+        self._ensure_index()
+        rows = db.query(Book.id, Book.title, Book.author, Book.publisher, Book.isbn).yield_per(5000)
+        helpers.bulk(self.client, (
+            {"_index": self.INDEX, "_id": str(row.id), "_source": self._document(row)}
+            for row in rows
+        ))
+
+    def index_book(self, book: Book) -> None:
+        try:
+            self._ensure_index()
+            self.client.index(index=self.INDEX, id=str(book.id), document=self._document(book))
+        except Exception as e:
+            logger.warning(f"Falha ao indexar livro no Elasticsearch | book_id={book.id} | error={e}")
+
+    def remove_book(self, book_id: Any) -> None:
+        try:
+            self.client.options(ignore_status=404).delete(index=self.INDEX, id=str(book_id))
+        except Exception as e:
+            logger.warning(f"Falha ao remover livro do Elasticsearch | book_id={book_id} | error={e}")
+
+    @staticmethod
+    def _query(text: str) -> Dict[str, Any]:
+        return {
+            "multi_match": {
+                "query": text,
+                "type": "bool_prefix",
+                "operator": "and",
+                "fields": [f"{field}^{weight:g}" for field, weight in FIELD_WEIGHTS]
+            }
+        }
+
+    def search(self, db: Session, text: str, limit: Optional[int]) -> List[Tuple[UUID, float]]:
+        if limit is None:
+            # Todos os resultados: scroll, já que `size` para em index.max_result_window
+            from elasticsearch import helpers
+
+            hits = helpers.scan(
+                self.client, index=self.INDEX, query={"query": self._query(text)},
+                preserve_order=True, _source=False
+            )
+            return [(UUID(hit["_id"]), hit["_score"]) for hit in hits]
+
+        response = self.client.search(index=self.INDEX, size=limit, source=False, query=self._query(text))
+        return [(UUID(hit["_id"]), hit["_score"]) for hit in response["hits"]["hits"]]
+
+_backend: Optional[SearchBackend] = None
+
+def get_search_backend() -> SearchBackend:
+    """Backend de busca do processo, conforme SEARCH_BACKEND (memory, postgres, elasticsearch)."""
+    global _backend
+    if _backend is None:
+        if settings.SEARCH_BACKEND == "postgres":
+            _backend = PostgresSearchBackend()
+        elif settings.SEARCH_BACKEND == "elasticsearch":
+            _backend = ElasticsearchSearchBackend(settings.ELASTICSEARCH_URL, settings.SEARCH_MAX_RESULTS)
+        else:
+            _backend = InMemorySearchBackend(settings.SEARCH_INDEX_TTL, settings.SEARCH_MAX_RESULTS)
+    return _backend
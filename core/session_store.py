@@ -0,0 +1,102 @@
+"""
+Sessões de navegação para recomendações em tempo real
+
+Cada usuário tem um buffer com as últimas interações (book_id, peso), usado
+pelo ml.session_recommender. Com SESSION_STORE=redis o buffer é uma lista por
+usuário (session:{user_id}) compartilhada por todos os workers e serviços:
+o worker do outbox registra as compras de um pedido na mesma sessão que o
+recommendation-service lê. Com SESSION_STORE=memory cada processo mantém
+as próprias sessões (só desenvolvimento com um único worker).
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Iterable, List, Optional, Tuple
+
+from core.config import settings
+
+class InMemorySessionStore:
+    """Sessões em um dicionário do processo, limitado a max_sessions usuários (LRU)."""
+
+    def __init__(self, session_length: int = 20, ttl: float = 1800.0, max_sessions: int = 10000):
+        self.session_length = session_length
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[deque, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, user_id: Any, interactions: Iterable[Tuple[str, float]]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.pop(str(user_id), None)
+            if entry is None or now - entry[1] > self.ttl:
+                buffer = deque(maxlen=self.session_length)
+            else:
+                buffer = entry[0]
+            buffer.extend(interactions)
+            self._sessions[str(user_id)] = (buffer, now)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, user_id: Any) -> List[Tuple[str, float]]:
+        with self._lock:
+            entry = self._sessions.get(str(user_id))
+            if entry is None:
+                return []
+            if time.monotonic() - entry[1] > self.ttl:
+                del self._sessions[str(user_id)]
+                return []
+            return list(entry[0])
+
+    def clear(self, user_id: Any) -> None:
+        with self._lock:
+            self._sessions.pop(str(user_id), None)
+
+class RedisSessionStore:
+    """Uma lista por usuário com as últimas session_length interações, expirando após ttl sem atividade."""
+
+    def __init__(self, url: str, session_length: int = 20, ttl: int = 1800):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.session_length = session_length
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: Any) -> str:
+        return f"session:{user_id}"
+
+    def record(self, user_id: Any, interactions: Iterable[Tuple[str, float]]) -> None:
+        entries = [f"{book_id}|{value}" for book_id, value in interactions]
+        if not entries:
+            return
+        # MULTI/EXEC: RPUSH, corte e TTL entram juntos
+        pipeline = self.client.pipeline()
+        pipeline.rpush(self._key(user_id), *entries)
+        pipeline.ltrim(self._key(user_id), -self.session_length, -1)
+        pipeline.expire(self._key(user_id), self.ttl)
+        pipeline.execute()
+
+    def get(self, user_id: Any) -> List[Tuple[str, float]]:
+        session = []
+        for entry in self.client.lrange(self._key(user_id), 0, -1):
+            book_id, _, value = entry.partition("|")
+            session.append((book_id, float(value or 1.0)))
+        return session
+
+    def clear(self, user_id: Any) -> None:
+        self.client.delete(self._key(user_id))
+
+_store: Optional[RedisSessionStore] = None
+
+def get_session_store() -> Optional[RedisSessionStore]:
+    """Store compartilhado (SESSION_STORE=redis), ou None quando cada processo guarda as próprias sessões."""
+    global _store
+    if _store is None and settings.SESSION_STORE == "redis":
+        _store = RedisSessionStore(
+            settings.REDIS_URL,
+            session_length=settings.SESSION_LENGTH,
+            ttl=settings.SESSION_TTL_SECONDS
+        )
+    return _store
@@ -3,9 +3,10 @@ Utilitários compartilhados para os microserviços
 """
 import httpx
 from fastapi import HTTPException
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Tuple, List
 import logging
 from core.config import settings
+from schemas.book import BOOK_BATCH_MAX_IDS
 
 # Logger compartilhado
 logger = logging.getLogger("core.utils")
@@ -56,6 +57,30 @@ async def verify_book_exists(book_id: int) -> Dict[Any, Any]:
     """Verifica se um livro existe no catálogo"""
     return await verify_service_call(settings.CATALOG_SERVICE_URL, f"/books/{book_id}")
 
+async def get_books_batch(book_ids: Iterable[Any]) -> Tuple[Dict[str, Dict[Any, Any]], List[str]]:
+    """Busca vários livros no catálogo via POST /books:batch (em lotes de BOOK_BATCH_MAX_IDS)
+
+    Retorna (livros por id, ids inexistentes), preservando a ordem dos ids pedidos.
+    """
+    ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+    books: Dict[str, Dict[Any, Any]] = {}
+    missing: List[str] = []
+    for start in range(0, len(ids), BOOK_BATCH_MAX_IDS):
+        chunk = ids[start:start + BOOK_BATCH_MAX_IDS]
+        logger.debug(f"Service call | url={settings.CATALOG_SERVICE_URL} | endpoint=/books:batch | count={len(chunk)}")
+        try:
+            response = await http_client.post(f"{settings.CATALOG_SERVICE_URL}/books:batch", json={"ids": chunk})
+        except Exception as e:
+            logger.error(f"Service unavailable | url={settings.CATALOG_SERVICE_URL} | endpoint=/books:batch | error={str(e)}")
+            raise HTTPException(status_code=503, detail="Service unavailable")
+        if response.status_code != 200:
+            logger.warning(f"Service call failed | url={settings.CATALOG_SERVICE_URL} | endpoint=/books:batch | status={response.status_code}")
+            raise HTTPException(status_code=response.status_code, detail="Service call failed")
+        data = response.json()
+        books.update((book["id"], book) for book in data["books"])
+        missing.extend(data["missing"])
+    return {book_id: books[book_id] for book_id in ids if book_id in books}, missing
+
 async def verify_order_exists(order_id: int) -> Dict[Any, Any]:
     """Verifica se um pedido existe"""
     return await verify_service_call(settings.ORDERS_SERVICE_URL, f"/orders/{order_id}")
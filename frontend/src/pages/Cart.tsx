@@ -30,7 +30,15 @@ export function Cart() {
         try {
           setLoadingRecommendations(true)
           
-          // Obter recomendações similares baseadas no primeiro livro do carrinho
+          // Priorizar livros frequentemente comprados junto com os itens do carrinho
+          const bookIds = cart.items.map((item) => item.book_id)
+          const boughtTogether = await recommendationService.getBoughtTogether(bookIds, 8)
+          if (boughtTogether.length > 0) {
+            setRecommendations(boughtTogether)
+            return
+          }
+
+          // Sem histórico de compras: recomendações similares ao primeiro livro do carrinho
           // Isso garante que as recomendações sejam de categorias similares
           const firstBookId = cart.items[0].book_id
           if (firstBookId) {
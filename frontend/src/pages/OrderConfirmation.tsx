@@ -5,6 +5,9 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { CheckCircle2, Package, AlertCircle } from 'lucide-react'
 import { useOrderService } from '@/services/orderService'
 import { useToast } from '@/hooks/use-toast'
+import { recommendationService } from '@/services/recommendationService'
+import { BookCard } from '@/components/books/BookCard'
+import { BookRecommendation } from '@/types/recommendation'
 
 export function OrderConfirmation() {
   const { orderId } = useParams<{ orderId: string }>()
@@ -13,6 +16,7 @@ export function OrderConfirmation() {
   const [order, setOrder] = useState<any>(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  const [boughtTogether, setBoughtTogether] = useState<BookRecommendation[]>([])
 
   useEffect(() => {
     // Não incluir getOrder e toast como dependências para evitar re-renders infinitos
@@ -50,6 +54,16 @@ export function OrderConfirmation() {
     fetchOrder()
   }, [orderId]) // Apenas orderId como dependência
 
+  // Livros frequentemente comprados junto com os itens do pedido
+  useEffect(() => {
+    if (!order?.items?.length) return
+
+    const bookIds = order.items.map((item: any) => item.book_id)
+    recommendationService.getBoughtTogether(bookIds, 4)
+      .then(setBoughtTogether)
+      .catch((err) => console.error('Erro ao carregar recomendações:', err))
+  }, [order])
+
   const formatPrice = (price: number) => {
     return new Intl.NumberFormat('pt-BR', {
       style: 'currency',
@@ -272,6 +286,20 @@ export function OrderConfirmation() {
         </Button>
       </div>
 
+      {/* Frequently Bought Together */}
+      {boughtTogether.length > 0 && (
+        <div className="mt-8">
+          <h2 className="text-xl font-bold mb-4">Quem Comprou Estes Livros Também Comprou</h2>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
+            {boughtTogether.map((rec) =>
+              rec.book ? (
+                <BookCard key={rec.book_id} book={rec.book} />
+              ) : null
+            )}
+          </div>
+        </div>
+      )}
+
       {/* Support Message */}
       <div className="mt-8 p-4 bg-gray-50 rounded-lg text-center">
         <p className="text-sm text-gray-600">
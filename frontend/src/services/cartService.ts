@@ -1,5 +1,5 @@
 import { api } from './api'
-import { Cart, CartItemCreate, CartItemUpdate } from '@/types/cart'
+import { Cart, CartItemCreate, CartItemUpdate, CartOperation } from '@/types/cart'
 
 export const cartService = {
   async getCart(): Promise<Cart> {
@@ -24,5 +24,17 @@ export const cartService = {
 
   async clearCart(): Promise<void> {
     await api.delete('/cart')
+  },
+
+  // Várias alterações em uma requisição; retorna o carrinho já recalculado
+  async applyOperations(operations: CartOperation[]): Promise<Cart> {
+    const response = await api.post('/cart/items:bulk', { operations })
+    return response.data
+  },
+
+  // Soma os itens do carrinho de visitante ao carrinho do usuário (login)
+  async mergeGuestCart(items: CartItemCreate[]): Promise<Cart> {
+    const response = await api.post('/cart/merge', { items })
+    return response.data
   }
 }
@@ -33,6 +33,14 @@ export const recommendationService = {
     return response.data
   },
 
+  async getBoughtTogether(bookIds: string[], limit: number = 8): Promise<BookRecommendation[]> {
+    const response = await api.get('/recommendations/bought-together', {
+      params: { book_ids: bookIds, limit },
+      paramsSerializer: { indexes: null }
+    })
+    return response.data
+  },
+
   async recordInteraction(bookId: string, interactionType: string): Promise<void> {
     try {
       await api.post('/recommendations/interactions', {
@@ -30,3 +30,11 @@ export interface CartItemCreate {
 export interface CartItemUpdate {
   quantity: number
 }
+
+export type CartOperationType = 'add' | 'set' | 'remove'
+
+export interface CartOperation {
+  op: CartOperationType
+  book_id: string
+  quantity?: number
+}
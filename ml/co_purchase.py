@@ -0,0 +1,180 @@
+import numpy as np
+import scipy.sparse as sp
+from array import array
+from typing import List, Any, Tuple, Iterable
+import pickle
+import os
+from .model_store import model_store_lock
+
+class CoPurchaseRecommender:
+    """Frequently-bought-together recommendations from order items.
+
+    Orders become rows of a sparse binary order x item matrix X; X^T X gives
+    every item-item co-purchase count in one sparse product. Counts are
+    normalized with PMI (log lift) so best sellers do not pair with
+    everything, and each row is pruned to its top-K partners.
+    """
+
+    def __init__(self, model_path: str = "/app/ml/models", top_k: int = 20, min_support: int = 2):
+        self.model_path = model_path
+        self.top_k = top_k
+        self.min_support = min_support
+        self.item_ids = None
+        self.item_index = {}
+        self.pmi_matrix = None
+        self.n_orders = 0
+
+    def build_order_matrix(self, order_items: Iterable[Tuple[Any, Any]]) -> sp.csr_matrix:
+        """Build the binary order x item matrix from a stream of (order_id, book_id).
+
+        Rows are expected grouped by order_id (ORDER BY order_id), so only the
+        current order needs to be tracked while streaming.
+        """
+        self.item_ids = []
+        self.item_index = {}
+        rows = array('q')
+        cols = array('q')
+        current_order = None
+        n_orders = 0
+
+        for order_id, book_id in order_items:
+            if order_id != current_order:
+                current_order = order_id
+                n_orders += 1
+            book_id = str(book_id)
+            col = self.item_index.get(book_id)
+            if col is None:
+                col = len(self.item_ids)
+                self.item_index[book_id] = col
+                self.item_ids.append(book_id)
+            rows.append(n_orders - 1)
+            cols.append(col)
+
+        self.n_orders = n_orders
+        data = np.ones(len(rows), dtype=np.float64)
+        matrix = sp.csr_matrix(
+            (data, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+            shape=(n_orders, len(self.item_ids))
+        )
+        # The same book twice in one order counts once
+        matrix.data[:] = 1.0
+        return matrix
+
+    def train(self, order_items: Iterable[Tuple[Any, Any]]) -> None:
+        """Train the co-purchase model from streamed order items."""
+        print("Training co-purchase recommender...")
+
+        order_matrix = self.build_order_matrix(order_items)
+        if order_matrix.nnz == 0:
+            print("No order items available for training")
+            return
+
+        co_counts = (order_matrix.T @ order_matrix).tocoo()
+        item_counts = np.asarray(order_matrix.sum(axis=0)).ravel()
+
+        # PMI = log(P(i,j) / (P(i) P(j))) on off-diagonal pairs with enough support
+        keep = (co_counts.row != co_counts.col) & (co_counts.data >= self.min_support)
+        row, col, count = co_counts.row[keep], co_counts.col[keep], co_counts.data[keep]
+        pmi = np.log(count * self.n_orders / (item_counts[row] * item_counts[col]))
+        positive = pmi > 0
+
+        pmi_matrix = sp.csr_matrix(
+            (pmi[positive], (row[positive], col[positive])),
+            shape=(len(self.item_ids), len(self.item_ids))
+        )
+        self.pmi_matrix = self._prune_top_k(pmi_matrix)
+
+        self.save_model()
+
+        print(f"Co-purchase model trained with {self.n_orders} orders and {self.pmi_matrix.nnz} item pairs")
+
+    def _prune_top_k(self, matrix: sp.csr_matrix) -> sp.csr_matrix:
+        """Keep only the top-K entries of each row."""
+        matrix.sort_indices()
+        indptr = [0]
+        indices = []
+        data = []
+        for i in range(matrix.shape[0]):
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            row_data = matrix.data[start:end]
+            row_indices = matrix.indices[start:end]
+            if row_data.size > self.top_k:
+                top = np.argpartition(-row_data, self.top_k - 1)[:self.top_k]
+                row_data, row_indices = row_data[top], row_indices[top]
+            indices.append(row_indices)
+            data.append(row_data)
+            indptr.append(indptr[-1] + row_data.size)
+
+        return sp.csr_matrix(
+            (np.concatenate(data) if data else np.array([]),
+             np.concatenate(indices) if indices else np.array([], dtype=np.int32),
+             np.array(indptr)),
+            shape=matrix.shape
+        )
+
+    def get_recommendations(
+        self,
+        book_ids: List[str],
+        n_recommendations: int = 10,
+        explain: bool = False
+    ) -> List[Tuple]:
+        """Books frequently bought together with the given books (e.g. a cart)."""
+        if self.pmi_matrix is None or self.item_ids is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        seeds = np.array([self.item_index[b] for b in dict.fromkeys(book_ids) if b in self.item_index], dtype=np.int64)
+        if seeds.size == 0:
+            return []
+
+        # (seeds, items) slice of the pruned matrix: summed for the score, argmax for the reason
+        partners = self.pmi_matrix[seeds].toarray()
+        scores = partners.sum(axis=0)
+        scores[seeds] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        top = candidates[np.argsort(-scores[candidates], kind='stable')][:n_recommendations]
+
+        if not explain:
+            return [(self.item_ids[idx], scores[idx]) for idx in top]
+
+        best_seeds = seeds[np.argmax(partners[:, top], axis=0)]
+        return [
+            (self.item_ids[idx], scores[idx], {'type': 'bought_together', 'book_id': self.item_ids[seed]})
+            for idx, seed in zip(top, best_seeds)
+        ]
+
+    def save_model(self) -> None:
+        """Save the trained model."""
+        os.makedirs(self.model_path, exist_ok=True)
+
+        model_data = {
+            'item_ids': self.item_ids,
+            'n_orders': self.n_orders
+        }
+
+        with model_store_lock(self.model_path):
+            sp.save_npz(os.path.join(self.model_path, 'co_purchase_pmi.npz'), self.pmi_matrix)
+            with open(os.path.join(self.model_path, 'co_purchase_model.pkl'), 'wb') as f:
+                pickle.dump(model_data, f)
+
+    def load_model(self) -> bool:
+        """Load the trained model."""
+        model_file = os.path.join(self.model_path, 'co_purchase_model.pkl')
+        matrix_file = os.path.join(self.model_path, 'co_purchase_pmi.npz')
+
+        if not os.path.exists(model_file) or not os.path.exists(matrix_file):
+            return False
+
+        try:
+            with open(model_file, 'rb') as f:
+                model_data = pickle.load(f)
+
+            self.item_ids = model_data['item_ids']
+            self.n_orders = model_data['n_orders']
+            self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids)}
+            self.pmi_matrix = sp.load_npz(matrix_file).tocsr()
+
+            return True
+        except Exception as e:
+            print(f"Error loading co-purchase model: {e}")
+            return False
@@ -5,6 +5,9 @@ from sklearn.neighbors import NearestNeighbors
 from typing import List, Dict, Any, Tuple
 import pickle
 import os
+from .model_store import model_store_lock, save_array, load_array
+
+USER_ITEM_ARRAY = 'collaborative_user_item_matrix'
 
 class CollaborativeFilteringRecommender:
     def __init__(self, model_path: str = "/app/ml/models"):
@@ -12,6 +15,8 @@ class CollaborativeFilteringRecommender:
         self.user_item_matrix = None
         self.user_ids = None
         self.item_ids = None
+        self.user_index = {}
+        self.item_index = {}
         self.svd_model = None
         self.knn_model = None
         
@@ -26,18 +31,24 @@ class CollaborativeFilteringRecommender:
         # Get unique users and items
         self.user_ids = df['user_id'].unique().tolist()
         self.item_ids = df['book_id'].unique().tolist()
+        self._build_indexes()
         
         # Create user-item matrix
         user_item_matrix = np.zeros((len(self.user_ids), len(self.item_ids)))
         
         # Fill matrix with interaction values
         for _, row in df.iterrows():
-            user_idx = self.user_ids.index(row['user_id'])
-            item_idx = self.item_ids.index(row['book_id'])
+            user_idx = self.user_index[row['user_id']]
+            item_idx = self.item_index[row['book_id']]
             user_item_matrix[user_idx, item_idx] = row.get('interaction_value', 1.0)
         
         return user_item_matrix
     
+    def _build_indexes(self) -> None:
+        """Build id -> row/column lookups for the user-item matrix."""
+        self.user_index = {user_id: idx for idx, user_id in enumerate(self.user_ids or [])}
+        self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids or [])}
+    
     def train(self, interactions_data: List[Dict[str, Any]]) -> None:
         """Train the collaborative filtering recommender."""
         print("Training collaborative filtering recommender...")
@@ -68,14 +79,18 @@ class CollaborativeFilteringRecommender:
         
         print(f"Collaborative filtering model trained with {len(interactions_data)} interactions")
     
-    def get_user_recommendations(self, user_id: str, n_recommendations: int = 10) -> List[Tuple[str, float]]:
-        """Get collaborative filtering recommendations for a user."""
+    def get_user_recommendations(self, user_id: str, n_recommendations: int = 10, explain: bool = False) -> List[Tuple]:
+        """Get collaborative filtering recommendations for a user.
+        
+        Neighbor contributions are kept as a (neighbors, items) matrix, so with
+        explain=True the neighbor that contributed most to each result is
+        returned as (book_id, score, reason) from the same pass.
+        """
         if self.user_item_matrix is None or self.svd_model is None or self.knn_model is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        try:
-            user_idx = self.user_ids.index(user_id)
-        except ValueError:
+        user_idx = self.user_index.get(user_id)
+        if user_idx is None:
             raise ValueError(f"User ID {user_id} not found in training data")
         
         # Get user's interaction history
@@ -85,65 +100,55 @@ class CollaborativeFilteringRecommender:
         user_factors = self.svd_model.transform(self.user_item_matrix[user_idx:user_idx+1])
         distances, indices = self.knn_model.kneighbors(user_factors)
         
-        # Calculate recommendations based on similar users
-        recommendations = {}
+        # Skip the user themselves
+        neighbor_mask = indices[0] != user_idx
+        neighbors = indices[0][neighbor_mask]
+        weights = 1.0 / (distances[0][neighbor_mask] + 1e-6)  # Inverse distance as weight
         
-        for i, similar_user_idx in enumerate(indices[0]):
-            if similar_user_idx == user_idx:  # Skip the user themselves
-                continue
-            
-            similar_user_interactions = self.user_item_matrix[similar_user_idx]
-            weight = 1.0 / (distances[0][i] + 1e-6)  # Inverse distance as weight
-            
-            # Add weighted interactions from similar users
-            for item_idx, interaction_value in enumerate(similar_user_interactions):
-                if interaction_value > 0 and user_interactions[item_idx] == 0:  # Item not interacted by user
-                    item_id = self.item_ids[item_idx]
-                    if item_id not in recommendations:
-                        recommendations[item_id] = 0
-                    recommendations[item_id] += interaction_value * weight
+        # Weighted interactions from similar users on items the user has not interacted with
+        neighbor_interactions = self.user_item_matrix[neighbors]
+        contributions = np.where(neighbor_interactions > 0, neighbor_interactions * weights[:, None], 0.0)
+        contributions[:, user_interactions != 0] = 0.0
+        scores = contributions.sum(axis=0)
         
         # Sort by score and return top recommendations
-        sorted_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
-        return sorted_recommendations[:n_recommendations]
+        candidate_indices = np.flatnonzero(scores > 0)
+        top_indices = candidate_indices[np.argsort(-scores[candidate_indices], kind='stable')][:n_recommendations]
+        
+        if not explain:
+            return [(self.item_ids[idx], scores[idx]) for idx in top_indices]
+        
+        top_neighbors = neighbors[np.argmax(contributions[:, top_indices], axis=0)]
+        return [
+            (self.item_ids[idx], scores[idx], {'type': 'similar_users', 'user_id': self.user_ids[neighbor]})
+            for idx, neighbor in zip(top_indices, top_neighbors)
+        ]
     
-    def get_item_recommendations(self, book_id: str, n_recommendations: int = 10) -> List[Tuple[str, float]]:
+    def get_item_recommendations(self, book_id: str, n_recommendations: int = 10, explain: bool = False) -> List[Tuple]:
         """Get item-based collaborative filtering recommendations."""
         if self.user_item_matrix is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        try:
-            item_idx = self.item_ids.index(book_id)
-        except ValueError:
+        item_idx = self.item_index.get(book_id)
+        if item_idx is None:
             raise ValueError(f"Book ID {book_id} not found in training data")
         
-        # Calculate item-item similarity using cosine similarity
+        # Cosine similarity of the item column against every other column at once
         item_vector = self.user_item_matrix[:, item_idx]
-        
-        similarities = []
-        for other_item_idx, other_item_id in enumerate(self.item_ids):
-            if other_item_idx == item_idx:
-                continue
-            
-            other_item_vector = self.user_item_matrix[:, other_item_idx]
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(item_vector, other_item_vector)
-            norm_a = np.linalg.norm(item_vector)
-            norm_b = np.linalg.norm(other_item_vector)
-            
-            if norm_a == 0 or norm_b == 0:
-                similarity = 0
-            else:
-                similarity = dot_product / (norm_a * norm_b)
-            
-            similarities.append((other_item_id, similarity))
+        dot_products = item_vector @ self.user_item_matrix
+        norms = np.linalg.norm(self.user_item_matrix, axis=0) * np.linalg.norm(item_vector)
+        similarities = np.divide(dot_products, norms, out=np.zeros_like(dot_products, dtype=float), where=norms != 0)
         
         # Sort by similarity and return top recommendations
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:n_recommendations]
+        other_indices = np.delete(np.arange(len(self.item_ids)), item_idx)
+        top_indices = other_indices[np.argsort(-similarities[other_indices], kind='stable')][:n_recommendations]
+        
+        reason = {'type': 'similar_to', 'book_id': book_id}
+        if explain:
+            return [(self.item_ids[idx], similarities[idx], reason) for idx in top_indices]
+        return [(self.item_ids[idx], similarities[idx]) for idx in top_indices]
     
-    def get_cold_start_recommendations(self, n_recommendations: int = 10) -> List[Tuple[str, float]]:
+    def get_cold_start_recommendations(self, n_recommendations: int = 10, explain: bool = False) -> List[Tuple]:
         """Get recommendations for cold start users (most popular items)."""
         if self.user_item_matrix is None:
             raise ValueError("Model not trained. Call train() first.")
@@ -158,27 +163,39 @@ class CollaborativeFilteringRecommender:
         for idx in popular_indices[:n_recommendations]:
             item_id = self.item_ids[idx]
             popularity_score = item_popularity[idx]
-            recommendations.append((item_id, popularity_score))
+            if explain:
+                recommendations.append((item_id, popularity_score, {'type': 'popular'}))
+            else:
+                recommendations.append((item_id, popularity_score))
         
         return recommendations
     
     def save_model(self) -> None:
-        """Save the trained model."""
+        """Save the trained model.
+        
+        The user-item matrix goes to its own .npy file so workers can
+        memory-map it; the pickle holds the ids and fitted estimators.
+        """
         os.makedirs(self.model_path, exist_ok=True)
         
         model_data = {
-            'user_item_matrix': self.user_item_matrix,
             'user_ids': self.user_ids,
             'item_ids': self.item_ids,
             'svd_model': self.svd_model,
             'knn_model': self.knn_model
         }
         
-        with open(os.path.join(self.model_path, 'collaborative_model.pkl'), 'wb') as f:
-            pickle.dump(model_data, f)
+        with model_store_lock(self.model_path):
+            save_array(self.model_path, USER_ITEM_ARRAY, self.user_item_matrix)
+            with open(os.path.join(self.model_path, 'collaborative_model.pkl'), 'wb') as f:
+                pickle.dump(model_data, f)
     
-    def load_model(self) -> bool:
-        """Load the trained model."""
+    def load_model(self, mmap: bool = False) -> bool:
+        """Load the trained model.
+        
+        With mmap=True the user-item matrix is attached as a read-only memory
+        map shared by every process on the host.
+        """
         model_file = os.path.join(self.model_path, 'collaborative_model.pkl')
         
         if not os.path.exists(model_file):
@@ -188,13 +205,25 @@ class CollaborativeFilteringRecommender:
             with open(model_file, 'rb') as f:
                 model_data = pickle.load(f)
             
-            self.user_item_matrix = model_data['user_item_matrix']
             self.user_ids = model_data['user_ids']
             self.item_ids = model_data['item_ids']
             self.svd_model = model_data['svd_model']
             self.knn_model = model_data['knn_model']
+            self._build_indexes()
+            
+            legacy_matrix = model_data.get('user_item_matrix')
+            if legacy_matrix is not None:
+                # Older model files embed the matrix in the pickle: export it once
+                with model_store_lock(self.model_path):
+                    if load_array(self.model_path, USER_ITEM_ARRAY) is None:
+                        save_array(self.model_path, USER_ITEM_ARRAY, legacy_matrix)
+                if not mmap:
+                    self.user_item_matrix = legacy_matrix
+                    return True
+            
+            self.user_item_matrix = load_array(self.model_path, USER_ITEM_ARRAY, mmap=mmap)
             
-            return True
+            return self.user_item_matrix is not None
         except Exception as e:
             print(f"Error loading collaborative filtering model: {e}")
             return False
@@ -2,17 +2,31 @@ import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import pickle
 import os
+from .model_store import model_store_lock, save_array, load_array
+
+SIMILARITY_ARRAY = 'content_similarity_matrix'
+NEIGHBOR_INDEX_ARRAY = 'content_neighbor_indices'
+NEIGHBOR_SCORE_ARRAY = 'content_neighbor_scores'
+
+# Author/category code of books without one: never counted against diversity caps
+MISSING_CODE = -1
 
 class ContentBasedRecommender:
-    def __init__(self, model_path: str = "/app/ml/models"):
+    def __init__(self, model_path: str = "/app/ml/models", n_neighbors: int = 50):
         self.model_path = model_path
+        self.n_neighbors = n_neighbors
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
         self.book_features = None
         self.similarity_matrix = None
         self.book_ids = None
+        self.book_index = {}
+        self.author_codes = None
+        self.category_codes = None
+        self.neighbor_indices = None
+        self.neighbor_scores = None
         
     def prepare_features(self, books_data: List[Dict[str, Any]]) -> np.ndarray:
         """Prepare features for content-based filtering."""
@@ -64,23 +78,69 @@ class ContentBasedRecommender:
         
         # Calculate cosine similarity
         self.similarity_matrix = cosine_similarity(tfidf_matrix)
+        self._build_neighbor_index()
         
         # Store book IDs
         self.book_ids = [book['id'] for book in books_data]
+        self.book_index = {book_id: idx for idx, book_id in enumerate(self.book_ids)}
+        
+        # Integer-encode author and category so diversity re-ranking can compare them vectorized
+        self.author_codes = self._encode([book.get('author') for book in books_data])
+        self.category_codes = self._encode([book.get('category_name') for book in books_data])
         
         # Save model
         self.save_model()
         
         print(f"Content-based model trained with {len(books_data)} books")
     
-    def get_recommendations(self, book_id: str, n_recommendations: int = 10) -> List[Tuple[str, float]]:
-        """Get content-based recommendations for a book."""
+    def _build_neighbor_index(self, block_size: int = 1024) -> None:
+        """Precompute each book's top-K most similar books (excluding itself).
+        
+        Rows are processed in blocks so a memory-mapped similarity matrix is
+        never copied whole.
+        """
+        n_books = self.similarity_matrix.shape[0]
+        k = min(self.n_neighbors, n_books - 1)
+        self.neighbor_indices = np.zeros((n_books, max(k, 0)), dtype=np.int64)
+        self.neighbor_scores = np.zeros((n_books, max(k, 0)))
+        if k <= 0:
+            return
+        
+        for start in range(0, n_books, block_size):
+            stop = min(start + block_size, n_books)
+            block = np.array(self.similarity_matrix[start:stop], dtype=float)
+            block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            self.neighbor_indices[start:stop] = np.take_along_axis(top, order, axis=1)
+            self.neighbor_scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    
+    @staticmethod
+    def _encode(values: List[Optional[str]]) -> np.ndarray:
+        """Map each distinct (case-insensitive) value to an integer code.
+
+        Missing or blank values get MISSING_CODE instead of sharing the code of
+        the empty string, so books without an author are not capped together.
+        """
+        normalized = np.array([(value or '').strip().lower() for value in values], dtype=object)
+        present = normalized != ''
+        codes = np.full(len(normalized), MISSING_CODE, dtype=np.int64)
+        if present.any():
+            _, codes[present] = np.unique(normalized[present].astype(str), return_inverse=True)
+        return codes
+    
+    def get_recommendations(self, book_id: str, n_recommendations: int = 10, explain: bool = False) -> List[Tuple]:
+        """Get content-based recommendations for a book.
+        
+        With explain=True each result is (book_id, score, reason), the reason
+        pointing at the seed book.
+        """
         if self.similarity_matrix is None or self.book_ids is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        try:
-            book_index = self.book_ids.index(book_id)
-        except ValueError:
+        book_index = self.book_index.get(book_id)
+        if book_index is None:
             raise ValueError(f"Book ID {book_id} not found in training data")
         
         # Get similarity scores for the book
@@ -89,16 +149,29 @@ class ContentBasedRecommender:
         # Get top similar books (excluding the book itself)
         similar_indices = np.argsort(similarity_scores)[::-1][1:n_recommendations+1]
         
+        reason = {'type': 'similar_to', 'book_id': book_id}
         recommendations = []
         for idx in similar_indices:
-            book_id = self.book_ids[idx]
             score = similarity_scores[idx]
-            recommendations.append((book_id, score))
+            if explain:
+                recommendations.append((self.book_ids[idx], score, reason))
+            else:
+                recommendations.append((self.book_ids[idx], score))
         
         return recommendations
     
-    def get_user_recommendations(self, user_interactions: List[Dict[str, Any]], n_recommendations: int = 10) -> List[Tuple[str, float]]:
-        """Get content-based recommendations for a user based on their interactions."""
+    def get_user_recommendations(
+        self,
+        user_interactions: List[Dict[str, Any]],
+        n_recommendations: int = 10,
+        explain: bool = False
+    ) -> List[Tuple]:
+        """Get content-based recommendations for a user based on their interactions.
+        
+        Scores are aggregated from per-seed contributions, so with explain=True
+        the seed book that contributed most to each result comes out of the same
+        pass and is returned as (book_id, score, reason).
+        """
         if self.similarity_matrix is None or self.book_ids is None:
             raise ValueError("Model not trained. Call train() first.")
         
@@ -109,45 +182,64 @@ class ContentBasedRecommender:
             book_id = interaction['book_id']
             interaction_value = interaction.get('interaction_value', 1.0)
             
-            try:
-                book_index = self.book_ids.index(book_id)
+            book_index = self.book_index.get(book_id)
+            if book_index is not None:
                 user_profile[book_index] += interaction_value
-            except ValueError:
-                continue
         
         # Normalize user profile
         if np.sum(user_profile) > 0:
             user_profile = user_profile / np.sum(user_profile)
         
-        # Calculate similarity between user profile and all books
-        user_similarity = np.dot(self.similarity_matrix, user_profile)
+        # Only seed columns carry weight: (n_books, n_seeds) contribution matrix
+        seed_indices = np.flatnonzero(user_profile)
+        contributions = self.similarity_matrix[:, seed_indices] * user_profile[seed_indices]
+        user_similarity = contributions.sum(axis=1)
         
         # Get top recommendations
         top_indices = np.argsort(user_similarity)[::-1][:n_recommendations]
         
+        if not explain:
+            return [(self.book_ids[idx], user_similarity[idx]) for idx in top_indices]
+        
+        top_seeds = seed_indices[np.argmax(contributions[top_indices], axis=1)] if seed_indices.size else None
+        
         recommendations = []
-        for idx in top_indices:
-            book_id = self.book_ids[idx]
-            score = user_similarity[idx]
-            recommendations.append((book_id, score))
+        for position, idx in enumerate(top_indices):
+            reason = None
+            if top_seeds is not None:
+                reason = {'type': 'similar_to', 'book_id': self.book_ids[top_seeds[position]]}
+            recommendations.append((self.book_ids[idx], user_similarity[idx], reason))
         
         return recommendations
     
     def save_model(self) -> None:
-        """Save the trained model."""
+        """Save the trained model.
+        
+        The similarity matrix goes to its own .npy file so workers can memory-map
+        it; the pickle only holds the small metadata.
+        """
         os.makedirs(self.model_path, exist_ok=True)
         
         model_data = {
             'vectorizer': self.vectorizer,
-            'similarity_matrix': self.similarity_matrix,
-            'book_ids': self.book_ids
+            'book_ids': self.book_ids,
+            'author_codes': self.author_codes,
+            'category_codes': self.category_codes
         }
         
-        with open(os.path.join(self.model_path, 'content_based_model.pkl'), 'wb') as f:
-            pickle.dump(model_data, f)
+        with model_store_lock(self.model_path):
+            save_array(self.model_path, SIMILARITY_ARRAY, self.similarity_matrix)
+            save_array(self.model_path, NEIGHBOR_INDEX_ARRAY, self.neighbor_indices)
+            save_array(self.model_path, NEIGHBOR_SCORE_ARRAY, self.neighbor_scores)
+            with open(os.path.join(self.model_path, 'content_based_model.pkl'), 'wb') as f:
+                pickle.dump(model_data, f)
     
-    def load_model(self) -> bool:
-        """Load the trained model."""
+    def load_model(self, mmap: bool = False) -> bool:
+        """Load the trained model.
+        
+        With mmap=True the similarity matrix is attached as a read-only memory
+        map shared by every process on the host.
+        """
         model_file = os.path.join(self.model_path, 'content_based_model.pkl')
         
         if not os.path.exists(model_file):
@@ -158,8 +250,32 @@ class ContentBasedRecommender:
                 model_data = pickle.load(f)
             
             self.vectorizer = model_data['vectorizer']
-            self.similarity_matrix = model_data['similarity_matrix']
             self.book_ids = model_data['book_ids']
+            self.book_index = {book_id: idx for idx, book_id in enumerate(self.book_ids)}
+            # Older model files predate the author/category codes
+            self.author_codes = model_data.get('author_codes')
+            self.category_codes = model_data.get('category_codes')
+            
+            legacy_matrix = model_data.get('similarity_matrix')
+            if legacy_matrix is not None:
+                # Older model files embed the matrix in the pickle: export it once
+                with model_store_lock(self.model_path):
+                    if load_array(self.model_path, SIMILARITY_ARRAY) is None:
+                        save_array(self.model_path, SIMILARITY_ARRAY, legacy_matrix)
+            
+            if legacy_matrix is not None and not mmap:
+                self.similarity_matrix = legacy_matrix
+            else:
+                self.similarity_matrix = load_array(self.model_path, SIMILARITY_ARRAY, mmap=mmap)
+            
+            if self.similarity_matrix is None:
+                return False
+            
+            self.neighbor_indices = load_array(self.model_path, NEIGHBOR_INDEX_ARRAY, mmap=mmap)
+            self.neighbor_scores = load_array(self.model_path, NEIGHBOR_SCORE_ARRAY, mmap=mmap)
+            if self.neighbor_indices is None or self.neighbor_scores is None:
+                # Models trained before the neighbor index existed
+                self._build_neighbor_index()
             
             return True
         except Exception as e:
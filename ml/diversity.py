@@ -0,0 +1,89 @@
+import numpy as np
+from typing import List, Tuple, Optional, Any
+from .content_based import ContentBasedRecommender, MISSING_CODE
+
+class DiversityReranker:
+    """Re-rank scored candidates with maximal marginal relevance and per-author/category caps.
+
+    Pairwise similarities come straight from the content model's precomputed
+    similarity matrix through a single fancy-indexed sub-matrix lookup, so the
+    greedy selection only runs vectorized NumPy operations over the candidate pool.
+    """
+
+    def __init__(
+        self,
+        content_recommender: ContentBasedRecommender,
+        lambda_param: float = 0.7,
+        max_per_author: Optional[int] = 2,
+        max_per_category: Optional[int] = None
+    ):
+        self.content_recommender = content_recommender
+        self.lambda_param = lambda_param
+        self.max_per_author = max_per_author
+        self.max_per_category = max_per_category
+
+    def rerank(self, candidates: List[Tuple[Any, ...]], n_recommendations: int) -> List[Tuple[Any, ...]]:
+        """Select n diverse items from a score-sorted candidate list.
+
+        Candidates are tuples whose first two fields are (book_id, score); any
+        extra fields are carried through untouched.
+        """
+        n_candidates = len(candidates)
+        if n_candidates == 0 or n_recommendations <= 0:
+            return []
+
+        content = self.content_recommender
+        book_index = content.book_index or {}
+        rows = np.fromiter(
+            (book_index.get(candidate[0], -1) for candidate in candidates),
+            dtype=np.int64,
+            count=n_candidates
+        )
+        known = rows >= 0
+
+        # Relevance scaled to [0, 1] so it is comparable with cosine similarity
+        relevance = np.fromiter((candidate[1] for candidate in candidates), dtype=float, count=n_candidates)
+        spread = relevance.max() - relevance.min()
+        relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(n_candidates)
+
+        # Candidate x candidate similarity in one lookup; unknown books are treated as dissimilar
+        similarity = np.zeros((n_candidates, n_candidates))
+        if content.similarity_matrix is not None and known.any():
+            known_rows = rows[known]
+            similarity[np.ix_(known, known)] = content.similarity_matrix[np.ix_(known_rows, known_rows)]
+
+        caps = []
+        for codes, limit in ((content.author_codes, self.max_per_author), (content.category_codes, self.max_per_category)):
+            if codes is not None and limit is not None:
+                candidate_codes = np.where(known, codes[np.where(known, rows, 0)], MISSING_CODE)
+                caps.append((candidate_codes, limit, {}))
+
+        selected = []
+        remaining = np.ones(n_candidates, dtype=bool)
+        allowed = np.ones(n_candidates, dtype=bool)
+        max_similarity = np.zeros(n_candidates)
+        n_select = min(n_recommendations, n_candidates)
+
+        while len(selected) < n_select:
+            eligible = remaining & allowed
+            if not eligible.any():
+                # Caps exhausted the pool: fill the rest on relevance/MMR alone
+                eligible = remaining
+
+            mmr = self.lambda_param * relevance - (1 - self.lambda_param) * max_similarity
+            chosen = int(np.argmax(np.where(eligible, mmr, -np.inf)))
+
+            selected.append(chosen)
+            remaining[chosen] = False
+            max_similarity = np.maximum(max_similarity, similarity[chosen])
+
+            for candidate_codes, limit, counts in caps:
+                code = candidate_codes[chosen]
+                if code == MISSING_CODE:
+                    # Unknown book or no author/category: not capped
+                    continue
+                counts[code] = counts.get(code, 0) + 1
+                if counts[code] >= limit:
+                    allowed &= candidate_codes != code
+
+        return [candidates[idx] for idx in selected]
@@ -1,20 +1,37 @@
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Iterable
 from .content_based import ContentBasedRecommender
 from .collaborative_filtering import CollaborativeFilteringRecommender
+from .co_purchase import CoPurchaseRecommender
+from .diversity import DiversityReranker
+from .session_recommender import SessionRecommender
 
 class HybridRecommender:
-    def __init__(self, model_path: str = "/app/ml/models"):
+    def __init__(self, model_path: str = "/app/ml/models", session_store: Optional[Any] = None):
         self.model_path = model_path
         self.content_recommender = ContentBasedRecommender(model_path)
         self.collaborative_recommender = CollaborativeFilteringRecommender(model_path)
+        self.co_purchase_recommender = CoPurchaseRecommender(model_path)
         
         # Hybrid weights
         self.content_weight = 0.6
         self.collaborative_weight = 0.4
         
-    def train(self, books_data: List[Dict[str, Any]], interactions_data: List[Dict[str, Any]]) -> None:
-        """Train both content-based and collaborative filtering models."""
+        # Short-term session signal blended into user recommendations
+        self.session_recommender = SessionRecommender(self.content_recommender, store=session_store)
+        self.session_weight = 0.5
+        
+        # Diversity re-ranking (opt-in per request)
+        self.diversity_reranker = DiversityReranker(self.content_recommender)
+        self.diversity_pool_factor = 3
+        
+    def train(
+        self,
+        books_data: List[Dict[str, Any]],
+        interactions_data: List[Dict[str, Any]],
+        order_items: Optional[Iterable[Tuple[Any, Any]]] = None
+    ) -> None:
+        """Train content-based, collaborative filtering and (optionally) co-purchase models."""
         print("Training hybrid recommender...")
         
         # Train content-based model
@@ -23,6 +40,10 @@ class HybridRecommender:
         # Train collaborative filtering model
         self.collaborative_recommender.train(interactions_data)
         
+        # Train co-purchase model from streamed (order_id, book_id) rows
+        if order_items is not None:
+            self.co_purchase_recommender.train(order_items)
+        
         print("Hybrid recommender training completed")
     
     def get_user_recommendations(
@@ -30,40 +51,80 @@ class HybridRecommender:
         user_id: str, 
         user_interactions: List[Dict[str, Any]], 
         n_recommendations: int = 10,
-        algorithm: str = "hybrid"
-    ) -> List[Tuple[str, float]]:
-        """Get hybrid recommendations for a user."""
+        algorithm: str = "hybrid",
+        diversify: bool = False,
+        explain: bool = False
+    ) -> List[Tuple]:
+        """Get hybrid recommendations for a user.
         
-        if algorithm == "content":
-            return self._get_content_recommendations(user_interactions, n_recommendations)
+        With explain=True each result is (book_id, score, reason), where reason
+        names the seed book or neighbor that contributed most to the score.
+        """
+        n_candidates = n_recommendations * self.diversity_pool_factor if diversify else n_recommendations
+        
+        if algorithm == "session":
+            recommendations = self.session_recommender.get_recommendations(user_id, n_candidates)
+        elif algorithm == "content":
+            recommendations = self._get_content_recommendations(user_interactions, n_candidates)
         elif algorithm == "collaborative":
-            return self._get_collaborative_recommendations(user_id, n_recommendations)
-        else:  # hybrid
-            return self._get_hybrid_recommendations(user_id, user_interactions, n_recommendations)
+            recommendations = self._get_collaborative_recommendations(user_id, n_candidates)
+        else:  # hybrid: the only mode that mixes in the session signal
+            recommendations = self._get_hybrid_recommendations(user_id, user_interactions, n_candidates)
+            session_recs = self.session_recommender.get_recommendations(user_id, n_candidates)
+            if session_recs:
+                recommendations = self._blend_session(recommendations, session_recs)
+        
+        return self._finalize(recommendations, n_recommendations, diversify, explain)
+    
+    def record_session_interaction(self, user_id: str, book_id: str, interaction_value: float = 1.0) -> None:
+        """Feed a fresh interaction into the user's session."""
+        self.session_recommender.record_interaction(user_id, book_id, interaction_value)
     
     def get_item_recommendations(
         self, 
         book_id: str, 
         n_recommendations: int = 10,
-        algorithm: str = "hybrid"
-    ) -> List[Tuple[str, float]]:
+        algorithm: str = "hybrid",
+        diversify: bool = False,
+        explain: bool = False
+    ) -> List[Tuple]:
         """Get hybrid recommendations for a book."""
+        n_candidates = n_recommendations * self.diversity_pool_factor if diversify else n_recommendations
         
         if algorithm == "content":
-            return self.content_recommender.get_recommendations(book_id, n_recommendations)
+            recommendations = self.content_recommender.get_recommendations(book_id, n_candidates, explain=True)
         elif algorithm == "collaborative":
-            return self.collaborative_recommender.get_item_recommendations(book_id, n_recommendations)
+            recommendations = self.collaborative_recommender.get_item_recommendations(book_id, n_candidates, explain=True)
         else:  # hybrid
-            return self._get_hybrid_item_recommendations(book_id, n_recommendations)
+            recommendations = self._get_hybrid_item_recommendations(book_id, n_candidates)
+        
+        return self._finalize(recommendations, n_recommendations, diversify, explain)
+    
+    def _finalize(
+        self,
+        recommendations: List[Tuple],
+        n_recommendations: int,
+        diversify: bool,
+        explain: bool
+    ) -> List[Tuple]:
+        """Trim the candidate list, optionally re-ranking it for diversity."""
+        if diversify:
+            recommendations = self.diversity_reranker.rerank(recommendations, n_recommendations)
+        else:
+            recommendations = recommendations[:n_recommendations]
+        
+        if explain:
+            return recommendations
+        return [(book_id, score) for book_id, score, _ in recommendations]
     
     def _get_content_recommendations(
         self, 
         user_interactions: List[Dict[str, Any]], 
         n_recommendations: int
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple]:
         """Get content-based recommendations."""
         try:
-            return self.content_recommender.get_user_recommendations(user_interactions, n_recommendations)
+            return self.content_recommender.get_user_recommendations(user_interactions, n_recommendations, explain=True)
         except Exception as e:
             print(f"Error in content-based recommendations: {e}")
             return []
@@ -72,10 +133,10 @@ class HybridRecommender:
         self, 
         user_id: str, 
         n_recommendations: int
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple]:
         """Get collaborative filtering recommendations."""
         try:
-            return self.collaborative_recommender.get_user_recommendations(user_id, n_recommendations)
+            return self.collaborative_recommender.get_user_recommendations(user_id, n_recommendations, explain=True)
         except Exception as e:
             print(f"Error in collaborative recommendations: {e}")
             return []
@@ -85,7 +146,7 @@ class HybridRecommender:
         user_id: str, 
         user_interactions: List[Dict[str, Any]], 
         n_recommendations: int
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple]:
         """Get hybrid recommendations combining both approaches."""
         
         # Get content-based recommendations
@@ -94,77 +155,98 @@ class HybridRecommender:
         # Get collaborative filtering recommendations
         collab_recs = self._get_collaborative_recommendations(user_id, n_recommendations * 2)
         
-        # Combine recommendations
-        combined_scores = {}
-        
-        # Add content-based scores
-        for book_id, score in content_recs:
-            combined_scores[book_id] = score * self.content_weight
-        
-        # Add collaborative filtering scores
-        for book_id, score in collab_recs:
-            if book_id in combined_scores:
-                combined_scores[book_id] += score * self.collaborative_weight
-            else:
-                combined_scores[book_id] = score * self.collaborative_weight
-        
-        # Sort by combined score
-        sorted_recommendations = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
-        
-        return sorted_recommendations[:n_recommendations]
+        return self._combine(content_recs, collab_recs)[:n_recommendations]
     
     def _get_hybrid_item_recommendations(
         self, 
         book_id: str, 
         n_recommendations: int
-    ) -> List[Tuple[str, float]]:
+    ) -> List[Tuple]:
         """Get hybrid item recommendations."""
         
         # Get content-based recommendations
         try:
-            content_recs = self.content_recommender.get_recommendations(book_id, n_recommendations * 2)
+            content_recs = self.content_recommender.get_recommendations(book_id, n_recommendations * 2, explain=True)
         except Exception as e:
             print(f"Error in content-based item recommendations: {e}")
             content_recs = []
         
         # Get collaborative filtering recommendations
         try:
-            collab_recs = self.collaborative_recommender.get_item_recommendations(book_id, n_recommendations * 2)
+            collab_recs = self.collaborative_recommender.get_item_recommendations(book_id, n_recommendations * 2, explain=True)
         except Exception as e:
             print(f"Error in collaborative item recommendations: {e}")
             collab_recs = []
         
-        # Combine recommendations
-        combined_scores = {}
+        return self._combine(content_recs, collab_recs)[:n_recommendations]
+    
+    def _blend_session(self, long_term_recs: List[Tuple], session_recs: List[Tuple]) -> List[Tuple]:
+        """Mix long-term and session recommendations after scaling each list to [0, 1]."""
+        blended_scores = {}
+        best_contribution = {}
         
-        # Add content-based scores
-        for book_id, score in content_recs:
-            combined_scores[book_id] = score * self.content_weight
+        for recs, weight in ((long_term_recs, 1 - self.session_weight), (session_recs, self.session_weight)):
+            top_score = max((score for _, score, _ in recs), default=0)
+            if top_score <= 0:
+                continue
+            for book_id, score, reason in recs:
+                contribution = weight * score / top_score
+                blended_scores[book_id] = blended_scores.get(book_id, 0) + contribution
+                if book_id not in best_contribution or contribution > best_contribution[book_id][0]:
+                    best_contribution[book_id] = (contribution, reason)
+        
+        sorted_recommendations = sorted(blended_scores.items(), key=lambda x: x[1], reverse=True)
+        
+        return [(book_id, score, best_contribution[book_id][1]) for book_id, score in sorted_recommendations]
+    
+    def _combine(self, content_recs: List[Tuple], collab_recs: List[Tuple]) -> List[Tuple]:
+        """Blend weighted scores; each item keeps the reason of its largest contribution."""
+        combined_scores = {}
+        best_contribution = {}
         
-        # Add collaborative filtering scores
-        for book_id, score in collab_recs:
-            if book_id in combined_scores:
-                combined_scores[book_id] += score * self.collaborative_weight
-            else:
-                combined_scores[book_id] = score * self.collaborative_weight
+        for recs, weight in ((content_recs, self.content_weight), (collab_recs, self.collaborative_weight)):
+            for book_id, score, reason in recs:
+                contribution = score * weight
+                combined_scores[book_id] = combined_scores.get(book_id, 0) + contribution
+                if book_id not in best_contribution or contribution > best_contribution[book_id][0]:
+                    best_contribution[book_id] = (contribution, reason)
         
         # Sort by combined score
         sorted_recommendations = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
         
-        return sorted_recommendations[:n_recommendations]
+        return [(book_id, score, best_contribution[book_id][1]) for book_id, score in sorted_recommendations]
     
-    def get_cold_start_recommendations(self, n_recommendations: int = 10) -> List[Tuple[str, float]]:
+    def get_bought_together(
+        self,
+        book_ids: List[str],
+        n_recommendations: int = 10,
+        explain: bool = False
+    ) -> List[Tuple]:
+        """Get books frequently bought together with the given books."""
+        try:
+            return self.co_purchase_recommender.get_recommendations(book_ids, n_recommendations, explain=explain)
+        except Exception as e:
+            print(f"Error in co-purchase recommendations: {e}")
+            return []
+    
+    def get_cold_start_recommendations(self, n_recommendations: int = 10, explain: bool = False) -> List[Tuple]:
         """Get recommendations for cold start users."""
         try:
-            return self.collaborative_recommender.get_cold_start_recommendations(n_recommendations)
+            return self.collaborative_recommender.get_cold_start_recommendations(n_recommendations, explain=explain)
         except Exception as e:
             print(f"Error in cold start recommendations: {e}")
             return []
     
-    def load_models(self) -> bool:
-        """Load both trained models."""
-        content_loaded = self.content_recommender.load_model()
-        collaborative_loaded = self.collaborative_recommender.load_model()
+    def load_models(self, mmap: bool = False) -> bool:
+        """Load both trained models.
+        
+        With mmap=True the large arrays are read-only memory maps, so every
+        worker process on a host shares one copy of them in RAM.
+        """
+        content_loaded = self.content_recommender.load_model(mmap=mmap)
+        collaborative_loaded = self.collaborative_recommender.load_model(mmap=mmap)
+        # Optional: only present once there are orders to learn from
+        self.co_purchase_recommender.load_model()
         
         return content_loaded and collaborative_loaded
     
@@ -180,3 +262,17 @@ class HybridRecommender:
         
         self.content_weight = content_weight
         self.collaborative_weight = collaborative_weight
+    
+    def update_diversity(
+        self,
+        lambda_param: float,
+        max_per_author: Optional[int] = None,
+        max_per_category: Optional[int] = None
+    ) -> None:
+        """Update the diversity re-ranking trade-off and per-author/category caps."""
+        if not 0.0 <= lambda_param <= 1.0:
+            raise ValueError("lambda_param must be between 0.0 and 1.0")
+        
+        self.diversity_reranker.lambda_param = lambda_param
+        self.diversity_reranker.max_per_author = max_per_author
+        self.diversity_reranker.max_per_category = max_per_category
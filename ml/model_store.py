@@ -0,0 +1,54 @@
+import numpy as np
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+
+LOCK_FILE = '.model_store.lock'
+
+@contextmanager
+def model_store_lock(model_path: str):
+    """Host-wide exclusive lock on the model directory.
+
+    Serializes writers (training, legacy pickle migration) so that several
+    worker processes starting at once export each array only once.
+    """
+    os.makedirs(model_path, exist_ok=True)
+    with open(os.path.join(model_path, LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def save_array(model_path: str, name: str, array: Optional[np.ndarray]) -> None:
+    """Atomically write a model array as .npy next to the pickles.
+
+    The file is written to a temporary name and renamed into place, so workers
+    that still map the previous version keep a consistent view of it.
+    """
+    if array is None:
+        return
+
+    os.makedirs(model_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=model_path, suffix='.npy.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp_path, os.path.join(model_path, f'{name}.npy'))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_array(model_path: str, name: str, mmap: bool = True) -> Optional[np.ndarray]:
+    """Load a model array written by save_array.
+
+    With mmap=True the array is a read-only memory map: every worker on the
+    host shares the same page-cache pages instead of holding a private copy.
+    """
+    array_file = os.path.join(model_path, f'{name}.npy')
+    if not os.path.exists(array_file):
+        return None
+    return np.load(array_file, mmap_mode='r' if mmap else None)
@@ -1,10 +1,11 @@
 import os
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 from sqlalchemy.orm import Session, selectinload
 from core.database import SessionLocal
 from models.book import Book, Category, BookTag
 from models.recommendation import UserInteraction
+from models.order import Order, OrderItem, OrderStatus
 from models.user import User
 from .hybrid_recommender import HybridRecommender
 from core.config import settings
@@ -58,6 +59,20 @@ class ModelTrainer:
         print(f"Prepared {len(interactions_data)} interactions for training")
         return interactions_data
     
+    def stream_order_items(self, batch_size: int = 10000) -> Iterator[Tuple[Any, Any]]:
+        """Stream (order_id, book_id) rows grouped by order, skipping cancelled orders."""
+        print("Streaming order items...")
+        
+        rows = (
+            self.db.query(OrderItem.order_id, OrderItem.book_id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(Order.status != OrderStatus.CANCELLED)
+            .order_by(OrderItem.order_id)
+            .yield_per(batch_size)
+        )
+        for order_id, book_id in rows:
+            yield order_id, book_id
+    
     def train_models(self) -> None:
         """Train the recommendation models."""
         print("Starting model training...")
@@ -71,7 +86,7 @@ class ModelTrainer:
             return
         
         # Train hybrid recommender
-        self.recommender.train(books_data, interactions_data)
+        self.recommender.train(books_data, interactions_data, self.stream_order_items())
         
         print("Model training completed successfully!")
     
@@ -0,0 +1,83 @@
+import numpy as np
+from typing import List, Tuple, Optional, Any
+from core.session_store import InMemorySessionStore
+from .content_based import ContentBasedRecommender
+
+class SessionRecommender:
+    """Real-time recommendations from a user's most recent interactions.
+
+    Each active user has a buffer of their last `session_length` interactions
+    as (book_id, weight). Scoring gathers the precomputed top-K neighbors of
+    every buffered item, weighted by recency, so a request costs O(N*K)
+    regardless of catalog size.
+
+    Buffers live in a session store (core.session_store): a Redis list per
+    user shared by every worker and by the outbox worker that records
+    purchases, or, by default, a bounded in-process LRU with an idle TTL.
+    """
+
+    def __init__(
+        self,
+        content_recommender: ContentBasedRecommender,
+        store: Optional[Any] = None,
+        session_length: int = 20,
+        max_sessions: int = 10000,
+        session_ttl: float = 1800.0,
+        recency_decay: float = 0.8
+    ):
+        self.content_recommender = content_recommender
+        self.store = store or InMemorySessionStore(session_length, session_ttl, max_sessions)
+        self.recency_decay = recency_decay
+
+    def record_interaction(self, user_id: str, book_id: str, interaction_value: float = 1.0) -> None:
+        """Append an interaction to the user's session buffer."""
+        if book_id not in self.content_recommender.book_index:
+            return
+        self.store.record(user_id, [(book_id, interaction_value)])
+
+    def get_session(self, user_id: str) -> List[Tuple[int, float]]:
+        """Return the user's live session (oldest first) as model rows; unknown books are skipped."""
+        book_index = self.content_recommender.book_index
+        return [
+            (book_index[book_id], value)
+            for book_id, value in self.store.get(user_id)
+            if book_id in book_index
+        ]
+
+    def clear_session(self, user_id: str) -> None:
+        """Forget the user's session."""
+        self.store.clear(user_id)
+
+    def get_recommendations(self, user_id: str, n_recommendations: int = 10) -> List[Tuple]:
+        """Score neighbors of the session items; returns (book_id, score, reason)."""
+        content = self.content_recommender
+        session = self.get_session(user_id)
+        if not session or content.neighbor_indices is None:
+            return []
+
+        rows = np.fromiter((book_index for book_index, _ in session), dtype=np.int64, count=len(session))
+        values = np.fromiter((value for _, value in session), dtype=float, count=len(session))
+        # Most recent interaction weighs 1, older ones decay geometrically
+        weights = values * self.recency_decay ** np.arange(len(session) - 1, -1, -1)
+
+        neighbors = content.neighbor_indices[rows]
+        contributions = content.neighbor_scores[rows] * weights[:, None]
+
+        # Sum contributions per candidate; drop items already in the session
+        candidates, inverse = np.unique(neighbors.ravel(), return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions.ravel(), minlength=candidates.size)
+        scores[np.isin(candidates, rows)] = -np.inf
+
+        # The session item with the largest contribution explains each candidate
+        seeds = np.repeat(rows, neighbors.shape[1])
+        order = np.lexsort((-contributions.ravel(), inverse))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = inverse[order][1:] != inverse[order][:-1]
+        best_seed = seeds[order[first]]
+
+        top = np.argsort(-scores, kind='stable')[:n_recommendations]
+        return [
+            (content.book_ids[candidates[idx]], scores[idx], {'type': 'similar_to', 'book_id': content.book_ids[best_seed[idx]]})
+            for idx in top
+            if np.isfinite(scores[idx]) and scores[idx] > 0
+        ]
@@ -9,8 +9,11 @@ from .book import Book, Category, BookTag
 from .user import User
 from .review import Review
 from .cart import Cart, CartItem
-from .order import Order, OrderItem
-from .recommendation import UserInteraction, InteractionType
+from .order import Order, OrderItem, UserOrderSummary
+from .recommendation import UserInteraction, InteractionType, INTERACTION_WEIGHTS
+from .inventory import InventoryReservation, ReservationStatus
+from .idempotency import IdempotencyKey
+from .outbox import OutboxEvent
 
 __all__ = [
 	"Book",
@@ -22,6 +25,12 @@ __all__ = [
 	"CartItem",
 	"Order",
 	"OrderItem",
+	"UserOrderSummary",
 	"UserInteraction",
 	"InteractionType",
+	"INTERACTION_WEIGHTS",
+	"InventoryReservation",
+	"ReservationStatus",
+	"IdempotencyKey",
+	"OutboxEvent",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, Numeric, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, Numeric, Float, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -46,6 +46,16 @@ class Book(Base):
     cart_items = relationship("CartItem", back_populates="book")
     tags = relationship("BookTag", back_populates="book")
     interactions = relationship("UserInteraction", back_populates="book")
+    
+    # Índices das tuplas de ordenação das listagens (ver core/pagination.py)
+    __table_args__ = (
+        Index("ix_books_category_rating", "category_id", "average_rating", "total_reviews", "id"),
+        Index("ix_books_rating", "average_rating", "total_reviews", "id"),
+        Index("ix_books_rating_id", "average_rating", "id"),
+        Index("ix_books_price", "price", "id"),
+        Index("ix_books_created_at", "created_at", "id"),
+        Index("ix_books_updated_at", "updated_at"),
+    )
 
 class BookTag(Base):
     __tablename__ = "book_tags"
@@ -57,3 +67,7 @@ class BookTag(Base):
     
     # Relationships
     book = relationship("Book", back_populates="tags")
+    
+    __table_args__ = (
+        Index("ix_book_tags_book_id", "book_id"),
+    )
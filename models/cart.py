@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -12,6 +12,8 @@ class Cart(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Avança quando o carrinho é consumido (esvaziado/checkout); ver core.cart_store
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     user = relationship("User", back_populates="cart")
@@ -30,3 +32,8 @@ class CartItem(Base):
     # Relationships
     cart = relationship("Cart", back_populates="items")
     book = relationship("Book", back_populates="cart_items")
+    
+    __table_args__ = (
+        # Único: um item por livro no carrinho (alvo do INSERT ... ON CONFLICT das operações em lote)
+        Index("ix_cart_items_cart_id_book_id", "cart_id", "book_id", unique=True, postgresql_include=["quantity"]),
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSON
+from core.database import Base
+from datetime import datetime
+
+class IdempotencyKey(Base):
+    """Resposta guardada de uma requisição com header Idempotency-Key.
+
+    Enquanto a primeira requisição processa, a linha fica travada (e sem
+    resposta); repetições esperam e recebem a resposta guardada.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True)  # ex.: "orders:{user_id}", "payments:{order_id}"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Enum, Index
+from sqlalchemy.dialects.postgresql import UUID, JSON
+from core.database import Base
+import uuid
+from datetime import datetime
+import enum
+
+class ReservationStatus(str, enum.Enum):
+    PENDING = "pending"
+    COMMITTED = "committed"
+    RELEASED = "released"
+
+class InventoryReservation(Base):
+    """Estoque separado para um pedido: já descontado de books.stock_quantity
+    enquanto PENDING, devolvido ao ser liberado (RELEASED) ou expirar."""
+    __tablename__ = "inventory_reservations"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    order_id = Column(UUID(as_uuid=True), nullable=True)
+    status = Column(Enum(ReservationStatus), nullable=False, default=ReservationStatus.PENDING)
+    items = Column(JSON, nullable=False)  # [{"book_id": "...", "quantity": n}]
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Varredura das reservas pendentes expiradas
+        Index("ix_inventory_reservations_status_expires_at", "status", "expires_at"),
+        # Liberação das reservas de um pedido cancelado
+        Index("ix_inventory_reservations_order_id", "order_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -36,6 +36,13 @@ class Order(Base):
     # Relationships
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order")
+    
+    __table_args__ = (
+        Index("ix_orders_user_id_status", "user_id", "status"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        # Exportação por período (core.order_export) lê nesta ordem, sem sort
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -51,3 +58,18 @@ class OrderItem(Base):
     # Relationships
     order = relationship("Order", back_populates="items")
     book = relationship("Book", back_populates="order_items")
+    
+    __table_args__ = (
+        Index("ix_order_items_order_id", "order_id", postgresql_include=["book_id"]),
+    )
+
+class UserOrderSummary(Base):
+    """Totais de pedidos por usuário, mantidos a cada criação/cancelamento de pedido."""
+    __tablename__ = "user_order_summaries"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Numeric(12, 2), nullable=False, default=0)  # pedidos não cancelados
+    last_order_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
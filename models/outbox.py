@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID, JSON
+from core.database import Base
+import uuid
+from datetime import datetime
+
+class OutboxEvent(Base):
+    """Evento gravado na mesma transação da escrita que o gerou e processado
+    depois do commit (core.outbox)."""
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String, nullable=False)  # ex.: "order.created"
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Fila: só os eventos ainda não processados, em ordem de criação
+        Index("ix_outbox_events_pending", "created_at", postgresql_where=processed_at.is_(None)),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -13,6 +13,15 @@ class InteractionType(str, enum.Enum):
     REVIEW = "review"
     WISHLIST = "wishlist"
 
+# Default weight of each interaction type in the user profile
+INTERACTION_WEIGHTS = {
+    InteractionType.VIEW: 1.0,
+    InteractionType.WISHLIST: 2.0,
+    InteractionType.ADD_TO_CART: 3.0,
+    InteractionType.REVIEW: 3.0,
+    InteractionType.PURCHASE: 5.0,
+}
+
 class UserInteraction(Base):
     __tablename__ = "user_interactions"
     
@@ -26,3 +35,8 @@ class UserInteraction(Base):
     # Relationships
     user = relationship("User", back_populates="interactions")
     book = relationship("Book", back_populates="interactions")
+    
+    # Perfil do usuário para recomendação sai do índice (index-only scan)
+    __table_args__ = (
+        Index("ix_user_interactions_user_id", "user_id", postgresql_include=["book_id", "interaction_value"]),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -20,3 +20,7 @@ class Review(Base):
     # Relationships
     user = relationship("User", back_populates="reviews")
     book = relationship("Book", back_populates="reviews")
+    
+    __table_args__ = (
+        Index("ix_reviews_book_id", "book_id", "created_at"),
+    )
@@ -1,9 +1,11 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, desc, asc
 from decimal import Decimal
 from models.book import Book, Category, BookTag
 from repositories.base import BaseRepository
+from core.search import get_search_backend
+from core.pagination import BookKeyset, SEARCH_RANK_FIELD
 
 class BookRepository(BaseRepository[Book]):
     def __init__(self, db: Session):
@@ -33,19 +35,21 @@ class BookRepository(BaseRepository[Book]):
             )
 
     def search_books(self, search_params: Dict[str, Any]) -> List[Book]:
+        return self.search_books_page(search_params)[0]
+
+    def search_books_page(self, search_params: Dict[str, Any]) -> Tuple[List[Book], Optional[str], Optional[str]]:
+        """Search books with keyset pagination.
+
+        With search_params["cursor"] the page continues from the sort tuple in
+        the cursor instead of OFFSET. Returns (books, next_cursor, prev_cursor);
+        raises ValueError for an invalid cursor.
+        """
         query = self.db.query(Book).options(joinedload(Book.category), joinedload(Book.tags))
         
-        # Text search - busca em título, autor, ISBN e editora
+        # Text search - título, autor, ISBN e editora via backend de busca (ranqueada, sem acentos)
+        search_rank = None
         if search_params.get("query"):
-            search_term = f"%{search_params['query']}%"
-            query = query.filter(
-                or_(
-                    Book.title.ilike(search_term),
-                    Book.author.ilike(search_term),
-                    Book.isbn.ilike(search_term),
-                    Book.publisher.ilike(search_term)
-                )
-            )
+            query, search_rank = get_search_backend().apply(self.db, query, search_params["query"])
         
         # Category filter
         if search_params.get("category_id"):
@@ -84,27 +88,27 @@ class BookRepository(BaseRepository[Book]):
         if search_params.get("published_year"):
             query = query.filter(Book.published_year == search_params["published_year"])
         
-        # Sorting
-        sort_by = search_params.get("sort_by", "relevance")
-        if sort_by == "price_asc":
-            query = query.order_by(asc(Book.price))
-        elif sort_by == "price_desc":
-            query = query.order_by(desc(Book.price))
-        elif sort_by == "rating":
-            query = query.order_by(desc(Book.average_rating))
-        elif sort_by == "newest":
-            query = query.order_by(desc(Book.created_at))
-        elif sort_by == "oldest":
-            query = query.order_by(asc(Book.created_at))
-        else:  # relevance
-            query = query.order_by(desc(Book.average_rating), desc(Book.total_reviews))
+        # Sorting - tupla de ordenação com id como desempate (relevância da busca primeiro)
+        keyset = BookKeyset(search_params.get("sort_by", "relevance"), search_rank)
+        cursor = search_params.get("cursor")
+        query = keyset.apply(query, cursor)
+        
+        ranked = SEARCH_RANK_FIELD in keyset.fields
+        if ranked:
+            query = query.add_columns(search_rank)
         
-        # Pagination
-        page = search_params.get("page", 1)
+        # Pagination - cursor (keyset) ou página (offset)
         limit = search_params.get("limit", 20)
-        skip = (page - 1) * limit
+        skip = 0
+        if not cursor:
+            skip = (search_params.get("page", 1) - 1) * limit
+            query = query.offset(skip)
         
-        return query.offset(skip).limit(limit).all()
+        rows = query.limit(limit + 1).all()
+        if ranked:
+            rows, next_cursor, prev_cursor = keyset.page(rows, limit, lambda row: keyset.values(row[0], row[1]), skip)
+            return [book for book, _ in rows], next_cursor, prev_cursor
+        return keyset.page(rows, limit, keyset.values, skip)
 
     def get_books_by_category(self, category_id: str, skip: int = 0, limit: int = 20) -> List[Book]:
         """Get books by category, converting category_id to UUID if needed"""
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -77,6 +77,65 @@ class Book(BookBase):
     category: Optional[Category] = None
     tags: Optional[List[BookTag]] = []
 
+class BookSummary(BaseModel):
+    """Representação enxuta usada nas listagens (fields=summary)"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    title: str
+    author: str
+    price: Decimal
+    cover_image_url: Optional[str] = None
+    average_rating: float
+
+# Campos de coluna que podem ser pedidos com fields= nas listagens
+BOOK_COLUMN_FIELDS = (
+    "id", "isbn", "title", "author", "publisher", "published_year", "description", "price",
+    "stock_quantity", "cover_image_url", "category_id", "average_rating", "total_reviews",
+    "created_at", "updated_at",
+)
+BOOK_SUMMARY_FIELDS = tuple(BookSummary.model_fields)
+
+# Limite de ids por chamada de POST /books:batch
+BOOK_BATCH_MAX_IDS = 500
+
+class BookBatchRequest(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=BOOK_BATCH_MAX_IDS)
+
+class BookBatchResponse(BaseModel):
+    books: List[Book]  # na ordem dos ids pedidos, sem repetições
+    missing: List[UUID]
+
+class CategoryFacet(BaseModel):
+    id: UUID
+    slug: str
+    name: str
+    count: int
+
+class PriceFacet(BaseModel):
+    min: float
+    max: Optional[float] = None  # None na última faixa (sem limite superior)
+    count: int
+
+class RatingFacet(BaseModel):
+    min_rating: int
+    count: int
+
+class YearFacet(BaseModel):
+    year: int
+    count: int
+
+class BookFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    price: List[PriceFacet]
+    rating: List[RatingFacet]
+    published_year: List[YearFacet]
+
+class BookSearchResults(BaseModel):
+    books: List[Book]
+    facets: BookFacets
+
 class BookSearch(BaseModel):
     query: Optional[str] = None
     category_id: Optional[UUID] = None
@@ -89,3 +148,4 @@ class BookSearch(BaseModel):
     sort_by: Optional[str] = "relevance"  # relevance, price_asc, price_desc, rating, newest
     page: int = 1
     limit: int = 20
+    cursor: Optional[str] = None  # keyset cursor (X-Next-Cursor / X-Prev-Cursor); takes precedence over page
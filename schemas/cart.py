@@ -1,8 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
+from enum import Enum
+
+# Máximo de operações por chamada em lote (POST /cart/items:bulk e /cart/merge)
+CART_BULK_MAX_OPERATIONS = 200
 
 class CartItemBase(BaseModel):
     book_id: UUID
@@ -38,3 +42,20 @@ class Cart(BaseModel):
     
     class Config:
         from_attributes = True
+
+class CartOperationType(str, Enum):
+    ADD = "add"  # soma à quantidade atual (cria o item se preciso)
+    SET = "set"  # define a quantidade (cria o item se preciso)
+    REMOVE = "remove"
+
+class CartOperation(BaseModel):
+    op: CartOperationType
+    book_id: UUID
+    quantity: int = Field(1, gt=0)  # ignorada em remove
+
+class CartBulkRequest(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1, max_length=CART_BULK_MAX_OPERATIONS)
+
+class CartMergeRequest(BaseModel):
+    """Itens do carrinho de visitante, somados ao carrinho do usuário no login"""
+    items: List[CartItemCreate] = Field(..., max_length=CART_BULK_MAX_OPERATIONS)
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
+from datetime import datetime
+from uuid import UUID
+from models.inventory import ReservationStatus
+from schemas.book import BOOK_BATCH_MAX_IDS
+
+class ReservationItem(BaseModel):
+    book_id: UUID
+    quantity: int = Field(..., gt=0)
+
+class ReservationCreate(BaseModel):
+    order_id: Optional[UUID] = None
+    items: List[ReservationItem] = Field(..., min_length=1, max_length=BOOK_BATCH_MAX_IDS)
+
+class Reservation(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    order_id: Optional[UUID] = None
+    status: ReservationStatus
+    items: List[ReservationItem]
+    expires_at: datetime
+    created_at: datetime
@@ -1,10 +1,14 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
+import enum
 from models.order import OrderStatus, PaymentStatus
 
+# Máximo de pedidos por chamada de POST /admin/orders/status
+ORDER_BULK_MAX_UPDATES = 5000
+
 # Schema simples de Book sem relacionamentos circulares
 class BookSimple(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -70,3 +74,34 @@ class OrderSummary(BaseModel):
     total_amount: Decimal
     created_at: datetime
     items_count: int
+
+class UserOrderStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    orders_count: int = 0
+    cancelled_count: int = 0
+    total_spent: Decimal = Decimal("0")
+    last_order_at: Optional[datetime] = None
+
+class OrderStatusChange(BaseModel):
+    order_id: UUID
+    status: OrderStatus
+    tracking_code: Optional[str] = None  # mantém o código atual se omitido
+
+class OrderBulkStatusRequest(BaseModel):
+    changes: List[OrderStatusChange] = Field(..., min_length=1, max_length=ORDER_BULK_MAX_UPDATES)
+
+class OrderStatusResult(str, enum.Enum):
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"  # o pedido já estava no status pedido
+    INVALID_TRANSITION = "invalid_transition"
+    NOT_FOUND = "not_found"
+
+class OrderStatusChangeResult(BaseModel):
+    order_id: UUID
+    result: OrderStatusResult
+    status: Optional[OrderStatus] = None  # status do pedido após a operação
+
+class OrderBulkStatusResponse(BaseModel):
+    updated: int
+    results: List[OrderStatusChangeResult]
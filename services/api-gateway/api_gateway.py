@@ -2,9 +2,11 @@
 API Gateway - Orquestração de Microsserviços
 Gateway simples e funcional para rotear requisições aos serviços
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
 import os
 import time
@@ -35,6 +37,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "Idempotent-Replayed", "ETag"],
 )
 
 # Static files
@@ -57,6 +60,9 @@ SERVICE_URLS = {
     "recommendation": settings.RECOMMENDATION_SERVICE_URL,
 }
 
+# Headers dos serviços repassados ao cliente (cursores de paginação, repetição idempotente, validação de cache)
+FORWARDED_HEADERS = ("X-Next-Cursor", "X-Prev-Cursor", "Idempotent-Replayed", "ETag", "Cache-Control")
+
 # Middleware de logging
 @app.middleware("http")
 async def log_requests_middleware(request: Request, call_next):
@@ -79,8 +85,13 @@ async def log_requests_middleware(request: Request, call_next):
         raise
 
 # Helper: fazer chamada a serviço
-async def call_service(service_name: str, method: str, endpoint: str, **kwargs):
-    """Fazer chamada a um serviço"""
+async def call_service(service_name: str, method: str, endpoint: str, forward_to: Response = None, if_none_match: str = None, **kwargs):
+    """Fazer chamada a um serviço
+    
+    Se `forward_to` for informado, os FORWARDED_HEADERS da resposta do serviço
+    são copiados para ele. `if_none_match` (header do cliente) é repassado ao
+    serviço; se ele responder 304, o retorno é um 304 sem corpo com o ETag.
+    """
     if service_name not in SERVICE_URLS:
         raise HTTPException(status_code=500, detail=f"Serviço desconhecido: {service_name}")
     
@@ -92,6 +103,9 @@ async def call_service(service_name: str, method: str, endpoint: str, **kwargs):
     url = f"{service_url}{endpoint}"
     logger.debug(f"Chamando serviço | service={service_name} | url={url} | method={method} | endpoint={endpoint}")
     
+    if if_none_match:
+        kwargs["headers"] = {**kwargs.get("headers", {}), "If-None-Match": if_none_match}
+    
     try:
         response = await http_client.request(method, url, timeout=30.0, **kwargs)
         log_service_call(logger, service_name, endpoint, method, response.status_code)
@@ -109,6 +123,16 @@ async def call_service(service_name: str, method: str, endpoint: str, **kwargs):
             logger.error(f"Erro do serviço | service={service_name} | status={response.status_code} | detail={error_detail}")
             raise HTTPException(status_code=response.status_code, detail=error_detail)
         
+        if response.status_code == 304:
+            return Response(status_code=304, headers={
+                header: response.headers[header] for header in FORWARDED_HEADERS if header in response.headers
+            })
+        
+        if forward_to is not None:
+            for header in FORWARDED_HEADERS:
+                if header in response.headers:
+                    forward_to.headers[header] = response.headers[header]
+        
         return response.json()
     except HTTPException:
         raise
@@ -123,6 +147,40 @@ async def call_service(service_name: str, method: str, endpoint: str, **kwargs):
         log_error(logger, e, f"{service_name}{endpoint}")
         raise HTTPException(status_code=500, detail=f"Erro: {str(e)}")
 
+# Headers repassados em respostas em streaming
+STREAMED_HEADERS = ("Content-Type", "Content-Disposition", "Content-Encoding")
+
+async def stream_service(service_name: str, endpoint: str, **kwargs) -> StreamingResponse:
+    """GET em um serviço repassando o corpo em streaming, sem carregar a resposta na memória"""
+    service_url = SERVICE_URLS.get(service_name)
+    if not service_url:
+        raise HTTPException(status_code=500, detail=f"Serviço {service_name} não configurado")
+    
+    url = f"{service_url}{endpoint}"
+    try:
+        request = http_client.build_request("GET", url, timeout=httpx.Timeout(30.0, read=None), **kwargs)
+        response = await http_client.send(request, stream=True)
+    except httpx.RequestError as e:
+        log_error(logger, e, f"{service_name}{endpoint}")
+        raise HTTPException(status_code=503, detail=f"Serviço {service_name} indisponível: {str(e)}")
+    log_service_call(logger, service_name, endpoint, "GET", response.status_code)
+    
+    if response.status_code >= 400:
+        await response.aread()
+        await response.aclose()
+        try:
+            error_detail = response.json().get("detail", response.text)
+        except Exception:
+            error_detail = response.text or "Erro desconhecido"
+        raise HTTPException(status_code=response.status_code, detail=error_detail)
+    
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers={header: response.headers[header] for header in STREAMED_HEADERS if header in response.headers},
+        background=BackgroundTask(response.aclose)
+    )
+
 # Endpoints básicos
 @app.get("/")
 async def root():
@@ -139,6 +197,7 @@ async def health_check():
 # ========== CATALOG SERVICE ROUTES ==========
 @app.get("/api/v1/books")
 async def get_books(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category_id: str = None,
@@ -146,9 +205,11 @@ async def get_books(
     min_price: float = None,
     max_price: float = None,
     min_rating: float = None,
-    sort_by: str = None
+    sort_by: str = None,
+    cursor: str = None,
+    fields: str = None
 ):
-    """Listar livros com filtros opcionais"""
+    """Listar livros com filtros opcionais (cursores em X-Next-Cursor / X-Prev-Cursor)"""
     params = {"skip": skip, "limit": limit}
     if category_id:
         params["category_id"] = category_id
@@ -162,22 +223,44 @@ async def get_books(
         params["min_rating"] = min_rating
     if sort_by:
         params["sort_by"] = sort_by
-    return await call_service("catalog", "GET", "/books", params=params)
+    if cursor:
+        params["cursor"] = cursor
+    if fields:
+        params["fields"] = fields
+    return await call_service("catalog", "GET", "/books", forward_to=response, params=params)
+
+@app.get("/api/v1/books/search")
+async def search_books(
+    request: Request,
+    response: Response
+):
+    """Buscar livros com contagens por faceta (mesmos parâmetros de /api/v1/books)"""
+    return await call_service("catalog", "GET", "/books/search", forward_to=response, params=dict(request.query_params))
+
+@app.get("/api/v1/books/autocomplete")
+async def autocomplete_books(q: str, limit: int = 8):
+    """Sugestões de livros e autores para o texto digitado"""
+    return await call_service("catalog", "GET", "/books/autocomplete", params={"q": q, "limit": limit})
 
 @app.get("/api/v1/books/popular")
-async def get_popular_books(limit: int = 10):
+async def get_popular_books(request: Request, response: Response, limit: int = 10):
     """Obter livros populares"""
-    return await call_service("catalog", "GET", "/books/popular", params={"limit": limit})
+    return await call_service("catalog", "GET", "/books/popular", forward_to=response, if_none_match=request.headers.get("if-none-match"), params={"limit": limit})
 
 @app.get("/api/v1/books/recent")
-async def get_recent_books(limit: int = 10):
+async def get_recent_books(request: Request, response: Response, limit: int = 10):
     """Obter livros recentes"""
-    return await call_service("catalog", "GET", "/books/recent", params={"limit": limit})
+    return await call_service("catalog", "GET", "/books/recent", forward_to=response, if_none_match=request.headers.get("if-none-match"), params={"limit": limit})
+
+@app.post("/api/v1/books:batch")
+async def get_books_batch(batch_data: dict):
+    """Obter vários livros por id em uma chamada"""
+    return await call_service("catalog", "POST", "/books:batch", json=batch_data)
 
 @app.get("/api/v1/books/{book_id}")
-async def get_book(book_id: str):
+async def get_book(request: Request, response: Response, book_id: str):
     """Obter livro específico"""
-    return await call_service("catalog", "GET", f"/books/{book_id}")
+    return await call_service("catalog", "GET", f"/books/{book_id}", forward_to=response, if_none_match=request.headers.get("if-none-match"))
 
 @app.post("/api/v1/books")
 async def create_book(book_data: dict):
@@ -195,14 +278,19 @@ async def delete_book(book_id: str):
     return await call_service("catalog", "DELETE", f"/books/{book_id}")
 
 @app.get("/api/v1/categories")
-async def get_categories():
+async def get_categories(request: Request, response: Response):
     """Listar categorias"""
-    return await call_service("catalog", "GET", "/categories")
+    return await call_service("catalog", "GET", "/categories", forward_to=response, if_none_match=request.headers.get("if-none-match"))
 
 @app.get("/api/v1/categories/{category_id}/books")
-async def get_books_by_category(category_id: str, skip: int = 0, limit: int = 20):
+async def get_books_by_category(response: Response, category_id: str, skip: int = 0, limit: int = 20, cursor: str = None, fields: str = None):
     """Obter livros por categoria"""
-    return await call_service("catalog", "GET", f"/categories/{category_id}/books", params={"skip": skip, "limit": limit})
+    params = {"skip": skip, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if fields:
+        params["fields"] = fields
+    return await call_service("catalog", "GET", f"/categories/{category_id}/books", forward_to=response, params=params)
 
 # ========== AUTH SERVICE ROUTES ==========
 @app.post("/api/v1/auth/register")
@@ -343,6 +431,24 @@ async def add_to_cart(item_data: dict, request: Request):
     headers = {"Authorization": authorization}
     return await call_service("cart", "POST", "/cart/items", json=item_data, headers=headers)
 
+@app.post("/api/v1/cart/items:bulk")
+async def bulk_cart_operations(operations_data: dict, request: Request):
+    """Aplicar várias operações no carrinho de uma vez"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    return await call_service("cart", "POST", "/cart/items:bulk", json=operations_data, headers=headers)
+
+@app.post("/api/v1/cart/merge")
+async def merge_cart(merge_data: dict, request: Request):
+    """Mesclar carrinho de visitante no login"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    return await call_service("cart", "POST", "/cart/merge", json=merge_data, headers=headers)
+
 @app.put("/api/v1/cart/items/{book_id}")
 async def update_cart_item(book_id: str, item_data: dict, request: Request):
     """Atualizar item do carrinho"""
@@ -381,13 +487,15 @@ async def get_cart_summary(request: Request):
 
 # ========== ORDERS SERVICE ROUTES ==========
 @app.post("/api/v1/orders")
-async def create_order(order_data: dict, request: Request):
+async def create_order(order_data: dict, request: Request, response: Response):
     """Criar pedido"""
     authorization = request.headers.get("Authorization")
     if not authorization:
         raise HTTPException(status_code=401, detail="Token necessário")
     headers = {"Authorization": authorization}
-    return await call_service("orders", "POST", "/orders", json=order_data, headers=headers)
+    if request.headers.get("Idempotency-Key"):
+        headers["Idempotency-Key"] = request.headers["Idempotency-Key"]
+    return await call_service("orders", "POST", "/orders", forward_to=response, json=order_data, headers=headers)
 
 @app.get("/api/v1/orders")
 async def get_orders(request: Request, skip: int = 0, limit: int = 100, status_filter: str = None):
@@ -401,6 +509,47 @@ async def get_orders(request: Request, skip: int = 0, limit: int = 100, status_f
         params["status_filter"] = status_filter
     return await call_service("orders", "GET", "/orders", params=params, headers=headers)
 
+@app.get("/api/v1/orders/history")
+async def get_order_history(request: Request, response: Response, limit: int = 20, cursor: str = None, status_filter: str = None):
+    """Histórico de pedidos (resumos paginados por cursor)"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if status_filter:
+        params["status_filter"] = status_filter
+    return await call_service("orders", "GET", "/orders/history", forward_to=response, params=params, headers=headers)
+
+@app.get("/api/v1/orders/summary")
+async def get_order_stats(request: Request):
+    """Totais de pedidos do usuário"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    return await call_service("orders", "GET", "/orders/summary", headers=headers)
+
+@app.post("/api/v1/admin/orders/status")
+async def bulk_update_order_status(body: dict, request: Request):
+    """Mudar o status de pedidos em lote (admin)"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    return await call_service("orders", "POST", "/admin/orders/status", json=body, headers=headers)
+
+@app.get("/api/v1/admin/orders/export")
+async def export_orders(request: Request):
+    """Exportar pedidos em streaming, NDJSON ou CSV (admin)"""
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token necessário")
+    headers = {"Authorization": authorization}
+    return await stream_service("orders", "/admin/orders/export", params=dict(request.query_params), headers=headers)
+
 @app.get("/api/v1/orders/{order_id}")
 async def get_order(order_id: str, request: Request):
     """Obter pedido específico"""
@@ -421,9 +570,12 @@ async def cancel_order(order_id: str, request: Request):
 
 # ========== PAYMENT SERVICE ROUTES ==========
 @app.post("/api/v1/payments")
-async def process_payment(payment_data: dict):
+async def process_payment(payment_data: dict, request: Request, response: Response):
     """Processar pagamento"""
-    return await call_service("payment", "POST", "/payments", json=payment_data)
+    headers = {}
+    if request.headers.get("Idempotency-Key"):
+        headers["Idempotency-Key"] = request.headers["Idempotency-Key"]
+    return await call_service("payment", "POST", "/payments", forward_to=response, json=payment_data, headers=headers)
 
 @app.get("/api/v1/payment-methods")
 async def get_payment_methods():
@@ -1,10 +1,11 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from sqlalchemy.orm import Session
 from decimal import Decimal
 from uuid import UUID
 from repositories.book_repository import BookRepository
 from schemas.book import BookCreate, BookUpdate, BookSearch
 from models.book import Book
+from core.search import get_search_backend
 
 class BookService:
     def __init__(self, db: Session):
@@ -13,6 +14,14 @@ class BookService:
 
     async def get_books(self, search_params: BookSearch) -> List[Book]:
         """Get books with search and filters."""
+        return self.repository.search_books(self._search_dict(search_params))
+
+    async def get_books_page(self, search_params: BookSearch) -> Tuple[List[Book], Optional[str], Optional[str]]:
+        """Get books with search and filters plus keyset cursors (next, prev)."""
+        return self.repository.search_books_page(self._search_dict(search_params))
+
+    @staticmethod
+    def _search_dict(search_params: BookSearch) -> dict:
         # Converte BookSearch para dict para usar no repository
         search_dict = {}
         
@@ -48,10 +57,13 @@ class BookService:
         if search_params.sort_by:
             search_dict["sort_by"] = search_params.sort_by
         
+        if search_params.cursor:
+            search_dict["cursor"] = search_params.cursor
+        
         search_dict["page"] = search_params.page
         search_dict["limit"] = search_params.limit
         
-        return self.repository.search_books(search_dict)
+        return search_dict
 
     async def get_book_by_id(self, book_id: str) -> Optional[Book]:
         """Get a book by ID."""
@@ -89,6 +101,7 @@ class BookService:
         self.db.add(book)
         self.db.commit()
         self.db.refresh(book)
+        get_search_backend().index_book(book)
         return book
 
     async def update_book(self, book_id: str, book_data: BookUpdate) -> Optional[Book]:
@@ -104,6 +117,7 @@ class BookService:
         
         self.db.commit()
         self.db.refresh(book)
+        get_search_backend().index_book(book)
         return book
 
     async def delete_book(self, book_id: str) -> bool:
@@ -114,6 +128,7 @@ class BookService:
         
         self.db.delete(book)
         self.db.commit()
+        get_search_backend().remove_book(book.id)
         return True
 
     # ===== CATEGORY METHODS =====
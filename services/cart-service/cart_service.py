@@ -7,18 +7,24 @@ from jose import JWTError, jwt
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Dict, Tuple, Any, Iterable
+import asyncio
 import httpx
 import time
+from datetime import datetime
 
 from core.config import settings
-from core.database import get_db, engine, Base
+from core.database import get_db, engine, Base, SessionLocal
+from core.book_cache import get_book_cache
+from core.catalog_events import subscribe_book_changes
+from core.cart_store import get_cart_store, load_cart_items, cart_item_id, reset_cart, flush_dirty, ADD, PUT, REMOVE
 from core.logging import setup_logging, log_request, log_response, log_error, log_database_operation, log_service_call
 from models.cart import Cart, CartItem
 from models.user import User
 from models.book import Book  # Importar Book para garantir que a tabela seja criada
 from schemas import cart as cart_schema
 from schemas.cart import CartItemCreate, CartItemUpdate, CartItem as CartItemSchema
+from schemas.cart import CartOperation, CartOperationType, CartBulkRequest, CartMergeRequest
 
 logger = setup_logging("cart-service")
 
@@ -138,6 +144,45 @@ async def get_user_id(token: str = Depends(oauth2_scheme), db: Session = Depends
     logger.debug(f"Usuário autenticado no cart service | user_id={user.id} | email={email}")
     return user.id  # Retorna UUID diretamente
 
+# Flush periódico dos carrinhos alterados no cart store (CART_STORE_WRITE_MODE=async)
+async def flush_cart_store_loop():
+    store = get_cart_store()
+    while True:
+        await asyncio.sleep(settings.CART_FLUSH_INTERVAL_SECONDS)
+        db = SessionLocal()
+        try:
+            flushed = await asyncio.to_thread(flush_dirty, db, store)
+            if flushed:
+                logger.info(f"Carrinhos gravados no banco | carts={flushed}")
+        except Exception as e:
+            db.rollback()
+            log_error(logger, e, "flush_cart_store")
+        finally:
+            db.close()
+
+@app.on_event("startup")
+async def start_cart_store_flush():
+    if get_cart_store() is not None and settings.CART_STORE_WRITE_MODE == "async":
+        asyncio.create_task(flush_cart_store_loop())
+
+# Cache local de livros: alterações no catálogo descartam as entradas
+@app.on_event("startup")
+async def warm_book_cache():
+    """Assina os eventos do catálogo e pré-carrega, em lote, os livros que já estão em carrinhos"""
+    book_cache = get_book_cache()
+    subscribe_book_changes(book_cache.invalidate)
+    
+    db = SessionLocal()
+    try:
+        book_ids = [book_id for (book_id,) in db.query(CartItem.book_id).distinct().all()]
+    finally:
+        db.close()
+    try:
+        fetched = await book_cache.warm(book_ids)
+        logger.info(f"Cache de livros aquecido | books={fetched}")
+    except HTTPException as e:
+        logger.warning(f"Catálogo indisponível ao aquecer cache de livros | status={e.status_code}")
+
 # Endpoints básicos
 @app.get("/")
 async def root():
@@ -147,16 +192,109 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# Carrinho
+# Read model do carrinho
+def _iso(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def _item_view(cart_id, item_id, book_id, quantity, created_at, updated_at, row) -> Dict[str, Any]:
+    price = float(row.price)
+    return {
+        "id": str(item_id),
+        "cart_id": str(cart_id),
+        "book_id": str(book_id),
+        "quantity": quantity,
+        "created_at": _iso(created_at),
+        "updated_at": _iso(updated_at),
+        "book": {
+            "id": str(book_id),
+            "title": row.title,
+            "author": row.author,
+            "price": price,
+            "cover_image_url": row.cover_image_url or ""
+        },
+        "unit_price": price,
+        "subtotal": price * quantity
+    }
+
+def _cart_view(cart, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "id": str(cart.id),
+        "user_id": str(cart.user_id),
+        "items": items,
+        "total_items": sum(item["quantity"] for item in items),
+        "total_amount": float(sum(item["subtotal"] for item in items)),
+        "created_at": _iso(cart.created_at),
+        "updated_at": _iso(cart.updated_at)
+    }
+
+def load_store_cart_view(db: Session, store, user_id) -> Dict[str, Any]:
+    """Carrinho com itens vindos do cart store e livros/carrinho em uma consulta
+    
+    Cria a linha em carts se o usuário ainda não tem (itens ficam no store).
+    """
+    from uuid import UUID
+    
+    quantities = load_cart_items(store, db, user_id)
+    query = db.query(
+        Cart.id, Cart.user_id, Cart.created_at, Cart.updated_at,
+        Book.id.label("found_book_id"), Book.title, Book.author, Book.price, Book.cover_image_url
+    ).outerjoin(Book, Book.id.in_([UUID(book_id) for book_id in quantities]))\
+        .filter(Cart.user_id == user_id)
+    rows = query.all()
+    if not rows:
+        cart = Cart(user_id=user_id)
+        db.add(cart)
+        db.commit()
+        log_database_operation(logger, "CREATE", "carts", cart.id, user_id=user_id)
+        rows = query.all()
+    
+    cart = rows[0]
+    books = {str(row.found_book_id): row for row in rows if row.found_book_id is not None}
+    items = [
+        _item_view(cart.id, cart_item_id(user_id, book_id), book_id, quantity, cart.updated_at, cart.updated_at, books[book_id])
+        for book_id, quantity in quantities.items() if book_id in books
+    ]
+    return _cart_view(cart, items)
+
+def load_cart_view(db: Session, user_id) -> Optional[Dict[str, Any]]:
+    """Carrinho, itens e dados dos livros em uma única consulta (LEFT JOINs)
+    
+    Retorna None se o usuário não tem carrinho. Itens cujo livro não existe
+    mais ficam de fora dos itens e dos totais.
+    """
+    store = get_cart_store()
+    if store is not None:
+        return load_store_cart_view(db, store, user_id)
+    
+    rows = db.query(
+        Cart.id, Cart.user_id, Cart.created_at, Cart.updated_at,
+        CartItem.id.label("item_id"), CartItem.book_id, CartItem.quantity,
+        CartItem.created_at.label("item_created_at"), CartItem.updated_at.label("item_updated_at"),
+        Book.id.label("found_book_id"), Book.title, Book.author, Book.price, Book.cover_image_url
+    ).outerjoin(CartItem, CartItem.cart_id == Cart.id)\
+        .outerjoin(Book, Book.id == CartItem.book_id)\
+        .filter(Cart.user_id == user_id)\
+        .order_by(CartItem.created_at)\
+        .all()
+    if not rows:
+        return None
+    
+    cart = rows[0]
+    items = [
+        _item_view(cart.id, row.item_id, row.book_id, row.quantity, row.item_created_at, row.item_updated_at, row)
+        for row in rows if row.item_id is not None and row.found_book_id is not None
+    ]
+    return _cart_view(cart, items)
+
 # Carrinho
 @app.get("/cart")
 async def get_cart(user_id = Depends(get_user_id), db: Session = Depends(get_db)):
     """Obter carrinho do usuário atual"""
-    from sqlalchemy.orm import joinedload
-    
     logger.info(f"Obtendo carrinho | user_id={user_id}")
     
-    cart = db.query(Cart).options(joinedload(Cart.items)).filter(Cart.user_id == user_id).first()
-    if not cart:
+    cart_view = load_cart_view(db, user_id)
+    if cart_view is None:
         # Criar carrinho vazio se não existir
         cart = Cart(user_id=user_id)
         db.add(cart)
@@ -170,51 +308,12 @@ async def get_cart(user_id = Depends(get_user_id), db: Session = Depends(get_db)
             "items": [],
             "total_items": 0,
             "total_amount": 0.0,
-            "created_at": cart.created_at.isoformat() if hasattr(cart.created_at, 'isoformat') else str(cart.created_at),
-            "updated_at": cart.updated_at.isoformat() if hasattr(cart.updated_at, 'isoformat') else str(cart.updated_at)
+            "created_at": _iso(cart.created_at),
+            "updated_at": _iso(cart.updated_at)
         }
     
-    # Carregar informações dos livros para cada item
-    items_with_book = []
-    total_items = 0
-    total_amount = 0.0
-    
-    for item in cart.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if book:
-            subtotal = float(book.price) * item.quantity
-            total_items += item.quantity
-            total_amount += subtotal
-            
-            items_with_book.append({
-                "id": str(item.id),
-                "cart_id": str(item.cart_id),
-                "book_id": str(item.book_id),
-                "quantity": item.quantity,
-                "created_at": item.created_at.isoformat() if hasattr(item.created_at, 'isoformat') else str(item.created_at),
-                "updated_at": item.updated_at.isoformat() if hasattr(item.updated_at, 'isoformat') else str(item.updated_at),
-                "book": {
-                    "id": str(book.id),
-                    "title": book.title,
-                    "author": book.author,
-                    "price": float(book.price),
-                    "cover_image_url": book.cover_image_url or ""
-                },
-                "unit_price": float(book.price),
-                "subtotal": subtotal
-            })
-    
-    logger.info(f"Carrinho retornado | items={len(items_with_book)} | total={total_amount}")
-    
-    return {
-        "id": str(cart.id),
-        "user_id": str(cart.user_id),
-        "items": items_with_book,
-        "total_items": total_items,
-        "total_amount": float(total_amount),
-        "created_at": cart.created_at.isoformat() if hasattr(cart.created_at, 'isoformat') else str(cart.created_at),
-        "updated_at": cart.updated_at.isoformat() if hasattr(cart.updated_at, 'isoformat') else str(cart.updated_at)
-    }
+    logger.info(f"Carrinho retornado | items={len(cart_view['items'])} | total={cart_view['total_amount']}")
+    return cart_view
 
 @app.post("/cart/items", response_model=CartItemSchema, status_code=status.HTTP_201_CREATED)
 async def add_to_cart(
@@ -225,17 +324,28 @@ async def add_to_cart(
     """Adicionar item ao carrinho"""
     logger.info(f"Adicionando item ao carrinho | user_id={user_id} | book_id={item.book_id}")
     
-    # Verificar se livro existe
+    # Verificar se livro existe (cache local; o catálogo só é chamado em cache miss)
     try:
-        book_id_str = str(item.book_id)
-        response = await http_client.get(f"{settings.CATALOG_SERVICE_URL}/books/{book_id_str}")
-        if response.status_code != 200:
-            raise HTTPException(status_code=404, detail="Livro não encontrado")
-        book_data = response.json()
-        log_service_call(logger, "catalog", f"/books/{book_id_str}", "GET", 200)
-    except httpx.RequestError as e:
+        prices, missing = await get_book_cache().prices([item.book_id])
+    except HTTPException as e:
         log_error(logger, e, f"verify_book | book_id={item.book_id}")
         raise HTTPException(status_code=503, detail="Serviço de catálogo indisponível")
+    if missing:
+        raise HTTPException(status_code=404, detail="Livro não encontrado")
+    
+    store = get_cart_store()
+    if store is not None:
+        load_cart_items(store, db, user_id)
+        quantity = store.add(user_id, item.book_id, item.quantity)
+        now = datetime.utcnow()
+        logger.info(f"Item adicionado no cart store | user_id={user_id} | book_id={item.book_id} | quantity={quantity}")
+        return {
+            "id": cart_item_id(user_id, item.book_id),
+            "book_id": item.book_id,
+            "quantity": quantity,
+            "created_at": now,
+            "updated_at": now
+        }
     
     # Obter ou criar carrinho
     cart = db.query(Cart).filter(Cart.user_id == user_id).first()
@@ -297,6 +407,22 @@ async def update_cart_item(
         logger.error(f"Quantidade inválida | quantity={item_update.quantity}")
         raise HTTPException(status_code=400, detail="Quantidade deve ser maior que zero")
     
+    store = get_cart_store()
+    if store is not None:
+        load_cart_items(store, db, user_id)
+        if not store.set(user_id, book_uuid, item_update.quantity):
+            logger.warning(f"Item não encontrado no carrinho | user_id={user_id} | book_id={book_id}")
+            raise HTTPException(status_code=404, detail="Item não encontrado no carrinho")
+        now = datetime.utcnow()
+        logger.info(f"Item atualizado no cart store | user_id={user_id} | book_id={book_id} | new_quantity={item_update.quantity}")
+        return {
+            "id": cart_item_id(user_id, book_uuid),
+            "book_id": book_uuid,
+            "quantity": item_update.quantity,
+            "created_at": now,
+            "updated_at": now
+        }
+    
     cart = db.query(Cart).filter(Cart.user_id == user_id).first()
     if not cart:
         logger.warning(f"Carrinho não encontrado | user_id={user_id}")
@@ -340,6 +466,15 @@ async def remove_from_cart(
         logger.error(f"ID de livro inválido | book_id={book_id} | error={str(e)}")
         raise HTTPException(status_code=400, detail="ID de livro inválido")
     
+    store = get_cart_store()
+    if store is not None:
+        load_cart_items(store, db, user_id)
+        if not store.remove(user_id, book_uuid):
+            logger.warning(f"Item não encontrado no carrinho | user_id={user_id} | book_id={book_id}")
+            raise HTTPException(status_code=404, detail="Item não encontrado no carrinho")
+        logger.info(f"Item removido do cart store | book_id={book_id} | user_id={user_id}")
+        return {"message": "Item removido com sucesso"}
+    
     cart = db.query(Cart).filter(Cart.user_id == user_id).first()
     if not cart:
         logger.warning(f"Carrinho não encontrado | user_id={user_id}")
@@ -374,6 +509,16 @@ async def clear_cart(user_id = Depends(get_user_id), db: Session = Depends(get_d
     """Limpar carrinho"""
     logger.info(f"Limpando carrinho | user_id={user_id}")
     
+    store = get_cart_store()
+    if store is not None:
+        # Nova versão no banco: um flush concorrente da cópia antiga não regrava os itens
+        version = reset_cart(db, user_id)
+        db.commit()
+        store.clear(user_id)
+        store.discard(user_id, version)
+        logger.info(f"Carrinho limpo no cart store | user_id={user_id}")
+        return {"message": "Carrinho limpo com sucesso"}
+    
     cart = db.query(Cart).filter(Cart.user_id == user_id).first()
     if cart:
         db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
@@ -382,47 +527,150 @@ async def clear_cart(user_id = Depends(get_user_id), db: Session = Depends(get_d
     
     return {"message": "Carrinho limpo com sucesso"}
 
+# Operações em lote
+def collapse_operations(operations: Iterable[CartOperation]) -> Dict[str, Tuple[CartOperationType, int]]:
+    """Efeito final de cada livro aplicando as operações na ordem
+    
+    ADD soma à quantidade atual do carrinho, SET define a quantidade e REMOVE
+    remove o item; um ADD depois de SET/REMOVE vira SET.
+    """
+    effects: Dict[str, Tuple[CartOperationType, int]] = {}
+    for operation in operations:
+        book_id = str(operation.book_id)
+        kind, quantity = effects.get(book_id, (CartOperationType.ADD, 0))
+        if operation.op == CartOperationType.ADD:
+            effects[book_id] = (CartOperationType.SET if kind == CartOperationType.REMOVE else kind, quantity + operation.quantity)
+        else:
+            effects[book_id] = (operation.op, operation.quantity if operation.op == CartOperationType.SET else 0)
+    return effects
+
+def apply_cart_operations(db: Session, user_id, effects: Dict[str, Tuple[CartOperationType, int]]) -> None:
+    """Aplica os efeitos no banco sem commit: um DELETE e um INSERT ... ON CONFLICT por tipo"""
+    from uuid import UUID, uuid4
+    from sqlalchemy.dialects.postgresql import insert
+    
+    now = datetime.utcnow()
+    # Obtém ou cria o carrinho em um único comando
+    cart_statement = insert(Cart).values(id=uuid4(), user_id=user_id, created_at=now, updated_at=now)
+    cart_id = db.execute(
+        cart_statement.on_conflict_do_update(index_elements=[Cart.user_id], set_={"updated_at": now}).returning(Cart.id)
+    ).scalar_one()
+    
+    # Ordem fixa de book_id: transações concorrentes travam as linhas na mesma ordem
+    ordered = sorted(effects.items())
+    removed = [UUID(book_id) for book_id, (kind, _) in ordered if kind == CartOperationType.REMOVE]
+    if removed:
+        db.query(CartItem).filter(CartItem.cart_id == cart_id, CartItem.book_id.in_(removed))\
+            .delete(synchronize_session=False)
+    
+    for kind in (CartOperationType.ADD, CartOperationType.SET):
+        rows = [
+            {"id": uuid4(), "cart_id": cart_id, "book_id": UUID(book_id), "quantity": quantity, "created_at": now, "updated_at": now}
+            for book_id, (effect, quantity) in ordered if effect == kind
+        ]
+        if not rows:
+            continue
+        statement = insert(CartItem).values(rows)
+        quantity = CartItem.quantity + statement.excluded.quantity if kind == CartOperationType.ADD else statement.excluded.quantity
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.book_id],
+            set_={"quantity": quantity, "updated_at": now}
+        ))
+
+# Operação do schema -> operação do cart store (SET cria o item, como PUT)
+STORE_OPERATIONS = {
+    CartOperationType.ADD: ADD,
+    CartOperationType.SET: PUT,
+    CartOperationType.REMOVE: REMOVE,
+}
+
+def apply_store_operations(store, db: Session, user_id, effects: Dict[str, Tuple[CartOperationType, int]]) -> None:
+    """Aplica o lote no cart store em uma única operação atômica (um script no Redis)."""
+    load_cart_items(store, db, user_id)
+    store.apply(user_id, {book_id: (STORE_OPERATIONS[kind], quantity) for book_id, (kind, quantity) in effects.items()})
+
+async def apply_operations(operations: List[CartOperation], user_id, db: Session) -> Dict[str, Any]:
+    """Valida os livros (um lote no cache), aplica tudo em uma transação e devolve o carrinho recalculado"""
+    effects = collapse_operations(operations)
+    
+    book_ids = [book_id for book_id, (kind, _) in effects.items() if kind != CartOperationType.REMOVE]
+    try:
+        prices, missing = await get_book_cache().prices(book_ids)
+    except HTTPException as e:
+        log_error(logger, e, f"verify_books | count={len(book_ids)}")
+        raise HTTPException(status_code=503, detail="Serviço de catálogo indisponível")
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Livros não encontrados", "book_ids": missing})
+    
+    store = get_cart_store()
+    if store is not None:
+        apply_store_operations(store, db, user_id, effects)
+    else:
+        try:
+            apply_cart_operations(db, user_id, effects)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao aplicar operações no carrinho | user_id={user_id} | error={str(e)}")
+            raise HTTPException(status_code=500, detail="Erro ao atualizar carrinho")
+    
+    logger.info(f"Operações aplicadas no carrinho | user_id={user_id} | operations={len(operations)} | books={len(effects)}")
+    return load_cart_view(db, user_id)
+
+@app.post("/cart/items:bulk")
+async def bulk_cart_operations(
+    request: CartBulkRequest,
+    user_id = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """Aplicar várias operações (add/set/remove) de uma vez e retornar o carrinho"""
+    logger.info(f"Operações em lote no carrinho | user_id={user_id} | operations={len(request.operations)}")
+    return await apply_operations(request.operations, user_id, db)
+
+@app.post("/cart/merge")
+async def merge_cart(
+    request: CartMergeRequest,
+    user_id = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """Somar o carrinho de visitante ao carrinho do usuário (login) em uma chamada"""
+    logger.info(f"Mesclando carrinho de visitante | user_id={user_id} | items={len(request.items)}")
+    if not request.items:
+        return await get_cart(user_id, db)
+    if any(item.quantity <= 0 for item in request.items):
+        raise HTTPException(status_code=400, detail="Quantidade deve ser maior que zero")
+    
+    operations = [
+        CartOperation(op=CartOperationType.ADD, book_id=item.book_id, quantity=item.quantity)
+        for item in request.items
+    ]
+    return await apply_operations(operations, user_id, db)
+
 @app.get("/cart/summary")
 async def get_cart_summary(user_id = Depends(get_user_id), db: Session = Depends(get_db)):
     """Obter resumo do carrinho"""
     logger.info(f"Obtendo resumo do carrinho | user_id={user_id}")
     
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart or not cart.items:
+    cart_view = load_cart_view(db, user_id)
+    if cart_view is None:
         return {
             "total_items": 0,
             "total_price": 0.0,
             "items": []
         }
     
-    # Carregar informações do livro para obter o preço
-    from sqlalchemy.orm import joinedload
-    
-    total_items = sum(item.quantity for item in cart.items)
-    
-    # Calcular total buscando preços dos livros
-    total_price = 0.0
-    for item in cart.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if book:
-            total_price += float(book.price) * item.quantity
-    
-    # Preparar itens com informações dos livros
-    items_data = []
-    for item in cart.items:
-        book = db.query(Book).filter(Book.id == item.book_id).first()
-        if book:
-            items_data.append({
-                "book_id": str(item.book_id),
-                "quantity": item.quantity,
-                "price": float(book.price),
-                "subtotal": float(book.price) * item.quantity
-            })
-    
     return {
-        "total_items": total_items,
-        "total_price": total_price,
-        "items": items_data
+        "total_items": cart_view["total_items"],
+        "total_price": cart_view["total_amount"],
+        "items": [
+            {
+                "book_id": item["book_id"],
+                "quantity": item["quantity"],
+                "price": item["unit_price"],
+                "subtotal": item["subtotal"]
+            }
+            for item in cart_view["items"]
+        ]
     }
 
 if __name__ == "__main__":
@@ -2,23 +2,88 @@
 Catalog Service - Catálogo de Livros
 Serviço simples e funcional para gerenciar catálogo e inventário
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Callable, Any, Dict, Iterable, Tuple
+from urllib.parse import urlencode
 import time
 
 from core.config import settings
 from core.database import get_db, engine, Base
 from core.logging import setup_logging, log_request, log_response, log_error, log_database_operation
+from core.search import get_search_backend, RankedSearchBackend
+from core.pagination import BookKeyset, SEARCH_RANK_FIELD, cursor_headers
+from core.cache import ResponseCache, json_bytes
+from core.catalog_events import publish_book_changes, subscribe_book_changes
+from core.facets import format_facets, sql_facet_counts
+from core.autocomplete import AutocompleteIndex
+from core.projection import parse_fields, serialize_rows
+from core import inventory
 from models.book import Book, Category
-from schemas.book import BookCreate, BookUpdate, Book as BookSchema, CategoryCreate, Category as CategorySchema
+from schemas.book import (
+    BookCreate, BookUpdate, Book as BookSchema, CategoryCreate, Category as CategorySchema,
+    BookBatchRequest, BookBatchResponse, BookSearchResults
+)
+from schemas.inventory import ReservationCreate, Reservation as ReservationSchema
+from models.inventory import InventoryReservation
+from catalog_snapshot import CatalogSnapshot
 
 logger = setup_logging("catalog-service")
 
 # Criar tabelas do banco
 Base.metadata.create_all(bind=engine)
 
+# Snapshot em memória usado pelas leituras do catálogo
+catalog_snapshot = CatalogSnapshot(refresh_interval=settings.CATALOG_SNAPSHOT_REFRESH_SECONDS)
+
+# Autocomplete de títulos e autores, atualizado junto com o snapshot
+autocomplete_index = AutocompleteIndex()
+catalog_snapshot.attach_index(autocomplete_index)
+
+# Respostas serializadas das leituras mais quentes; escritas descartam só as rotas afetadas
+# e o LRU local é limpo a cada mudança no snapshot
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    redis_url=settings.REDIS_URL if settings.RESPONSE_CACHE_REDIS else None,
+    namespace="catalog"
+)
+catalog_snapshot.add_listener(response_cache.clear_local)
+
+def cached_json(request: Request, build: Callable[[], Any], path: Optional[str] = None) -> Optional[Response]:
+    """Resposta JSON em cache por rota + parâmetros, com ETag e 304 para If-None-Match.
+
+    `build` só é chamado em cache miss; se devolver None nada é cacheado e a
+    função devolve None. `path` substitui a rota da requisição na chave (forma
+    canônica usada na invalidação, ex.: /books/{uuid}).
+    """
+    def build_body() -> Optional[bytes]:
+        content = build()
+        return None if content is None else json_bytes(content)
+
+    key = f"{path or request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+    cached = response_cache.get_or_set(key, build_body)
+    if cached is None:
+        return None
+    return cached.to_response(request.headers.get("if-none-match"))
+
+# Rotas em cache que listam livros (qualquer mudança em um livro pode alterá-las)
+BOOK_LIST_PATHS = ("/books/popular", "/books/recent")
+
+def invalidate_books(book_ids: Iterable[Any]) -> None:
+    """Descarta só as respostas em cache que podem conter esses livros."""
+    response_cache.invalidate_paths([f"/books/{book_id}" for book_id in book_ids] + list(BOOK_LIST_PATHS))
+
+def books_changed_elsewhere(book_ids: Optional[List[str]]) -> None:
+    """Evento de outro worker/serviço (ex.: estoque baixado no checkout)."""
+    catalog_snapshot.invalidate()
+    if book_ids is None:
+        response_cache.invalidate()
+    else:
+        invalidate_books(book_ids)
+
 app = FastAPI(
     title="Catalog Service",
     description="Serviço de catálogo e inventário de livros",
@@ -57,6 +122,12 @@ async def log_requests_middleware(request: Request, call_next):
         log_response(logger, method, path, 500, duration_ms, error=str(e))
         raise
 
+# Alterações vindas de outros serviços (ex.: estoque baixado no checkout) forçam a
+# verificação da marca d'água na próxima leitura
+@app.on_event("startup")
+async def subscribe_catalog_events():
+    subscribe_book_changes(books_changed_elsewhere)
+
 # Endpoints básicos
 @app.get("/")
 async def root():
@@ -70,58 +141,79 @@ async def health_check():
 # IMPORTANTE: Rotas específicas devem vir ANTES da rota genérica /books/{book_id}
 @app.get("/books/popular", response_model=List[BookSchema])
 async def get_popular_books(
+    request: Request,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Obter livros populares (ordenados por rating e reviews)"""
-    from sqlalchemy.orm import joinedload
-    
     logger.info(f"Obtendo livros populares | limit={limit}")
     
-    books = db.query(Book).options(joinedload(Book.category))\
-        .order_by(Book.average_rating.desc(), Book.total_reviews.desc())\
-        .limit(limit).all()
-    
-    logger.info(f"Retornados {len(books)} livros populares")
-    return books
+    catalog_snapshot.ensure_fresh(db)
+    return cached_json(request, lambda: catalog_snapshot.query(sort_by="relevance", limit=limit))
 
 @app.get("/books/recent", response_model=List[BookSchema])
 async def get_recent_books(
+    request: Request,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Obter livros recentes (ordenados por data de criação)"""
-    from sqlalchemy.orm import joinedload
-    
     logger.info(f"Obtendo livros recentes | limit={limit}")
     
-    books = db.query(Book).options(joinedload(Book.category))\
-        .order_by(Book.created_at.desc())\
-        .limit(limit).all()
-    
-    logger.info(f"Retornados {len(books)} livros recentes")
-    return books
+    catalog_snapshot.ensure_fresh(db)
+    return cached_json(request, lambda: catalog_snapshot.query(sort_by="newest", limit=limit))
 
-@app.get("/books", response_model=List[BookSchema])
-async def get_books(
-    skip: int = 0,
-    limit: int = 100,
-    category_id: Optional[str] = None,
-    search: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    min_rating: Optional[float] = None,
-    sort_by: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    """Listar livros com filtros opcionais"""
+def _list_books(
+    db: Session,
+    skip: int,
+    limit: int,
+    category_id: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    sort_by: Optional[str],
+    cursor: Optional[str],
+    with_facets: bool = False,
+    fields: Optional[Tuple[str, ...]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str], Optional[Dict[str, Any]]]:
+    """Filtra, ordena e pagina os livros (em memória ou no banco)
+    
+    Retorna (livros serializados, cursor da próxima página, cursor da anterior,
+    contagens das facetas sobre o conjunto filtrado se with_facets). Com fields,
+    cada livro traz só esses campos e o banco só lê essas colunas.
+    """
     from uuid import UUID
     from sqlalchemy.orm import joinedload
-    from sqlalchemy import and_, or_, desc, asc
     from decimal import Decimal
     
-    logger.info(f"Listando livros | skip={skip} | limit={limit} | category_id={category_id} | search={search}")
+    # Sem busca, ou com backend de busca que devolve ids ranqueados: tudo em memória
+    search_backend = get_search_backend()
+    if not search or isinstance(search_backend, RankedSearchBackend):
+        catalog_snapshot.ensure_fresh(db)
+        filters = dict(
+            category=catalog_snapshot.resolve_category(category_id) if category_id else None,
+            min_price=min_price,
+            max_price=max_price,
+            min_rating=min_rating,
+            # Todos os livros que casam: paginação e total das facetas não param em SEARCH_MAX_RESULTS
+            search_scores=dict(search_backend.search(db, search, None)) if search else None
+        )
+        try:
+            books, next_cursor, prev_cursor = catalog_snapshot.query_page(
+                sort_by=sort_by,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                projection=fields,
+                **filters
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        facets = format_facets(catalog_snapshot.facets(**filters), catalog_snapshot.categories) if with_facets else None
+        return books, next_cursor, prev_cursor, facets
     
+    # Busca no banco (backend postgres)
     query = db.query(Book).options(joinedload(Book.category))
     
     # Filtro por categoria
@@ -136,17 +228,10 @@ async def get_books(
             if category:
                 query = query.filter(Book.category_id == category.id)
     
-    # Filtro de busca por texto
+    # Filtro de busca por texto (ranqueada, sem acentos)
+    search_rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Book.title.ilike(search_term),
-                Book.author.ilike(search_term),
-                Book.isbn.ilike(search_term),
-                Book.publisher.ilike(search_term)
-            )
-        )
+        query, search_rank = search_backend.apply(db, query, search)
     
     # Filtro de preço
     if min_price is not None:
@@ -159,24 +244,156 @@ async def get_books(
     if min_rating is not None:
         query = query.filter(Book.average_rating >= min_rating)
     
-    # Ordenação
-    if sort_by == "price_asc":
-        query = query.order_by(asc(Book.price))
-    elif sort_by == "price_desc":
-        query = query.order_by(desc(Book.price))
-    elif sort_by == "rating":
-        query = query.order_by(desc(Book.average_rating))
-    elif sort_by == "newest":
-        query = query.order_by(desc(Book.created_at))
-    else:  # relevance ou padrão
-        query = query.order_by(desc(Book.average_rating), desc(Book.total_reviews))
-    
-    books = query.offset(skip).limit(limit).all()
+    # Facetas do conjunto filtrado em uma única consulta agrupada
+    facets = None
+    if with_facets:
+        catalog_snapshot.ensure_fresh(db)
+        facets = format_facets(sql_facet_counts(db, query), catalog_snapshot.categories)
+    
+    # Ordenação e paginação keyset pela tupla de ordenação (relevância da busca primeiro)
+    keyset = BookKeyset(sort_by, search_rank)
+    
+    # Só as colunas pedidas (mais as da tupla de ordenação, usadas nos cursores)
+    if fields:
+        columns = dict.fromkeys(fields + tuple(field for field in keyset.fields if field != SEARCH_RANK_FIELD))
+        query = query.with_entities(*[getattr(Book, column) for column in columns])
+    
+    try:
+        query = keyset.apply(query, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    ranked = SEARCH_RANK_FIELD in keyset.fields
+    if ranked:
+        query = query.add_columns(search_rank)
+    if not cursor:
+        query = query.offset(skip)
+    
+    rows = query.limit(limit + 1).all()
+    if fields:
+        values = (lambda row: keyset.values(row, row[-1])) if ranked else keyset.values
+        rows, next_cursor, prev_cursor = keyset.page(rows, limit, values, skip)
+        return serialize_rows(rows, fields), next_cursor, prev_cursor, facets
+    
+    if ranked:
+        rows, next_cursor, prev_cursor = keyset.page(rows, limit, lambda row: keyset.values(row[0], row[1]), skip)
+        books = [book for book, _ in rows]
+    else:
+        books, next_cursor, prev_cursor = keyset.page(rows, limit, keyset.values, skip)
+    
+    books = [BookSchema.model_validate(book).model_dump(mode="json") for book in books]
+    return books, next_cursor, prev_cursor, facets
+
+@app.get("/books", response_model=List[BookSchema])
+async def get_books(
+    skip: int = 0,
+    limit: int = 100,
+    category_id: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    sort_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Listar livros com filtros opcionais
+    
+    Paginação por skip/limit ou por cursor (keyset): os cursores da próxima
+    página e da anterior voltam nos headers X-Next-Cursor e X-Prev-Cursor.
+    fields=summary (id, título, autor, preço, capa e avaliação) ou uma lista de
+    colunas separadas por vírgula devolve só esses campos.
+    """
+    logger.info(f"Listando livros | skip={skip} | limit={limit} | category_id={category_id} | search={search} | cursor={cursor} | fields={fields}")
+    
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    books, next_cursor, prev_cursor, _ = _list_books(
+        db, skip, limit, category_id, search, min_price, max_price, min_rating, sort_by, cursor, fields=selected
+    )
+    
     logger.info(f"Retornados {len(books)} livros")
-    return books
+    return JSONResponse(content=books, headers=cursor_headers(next_cursor, prev_cursor))
+
+@app.get("/books/search", response_model=BookSearchResults)
+async def search_books(
+    skip: int = 0,
+    limit: int = 20,
+    category_id: Optional[str] = None,
+    search: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    sort_by: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Buscar livros com as contagens por faceta do conjunto filtrado
+    
+    Mesmos filtros e paginação de /books; o corpo traz os livros da página e as
+    facetas (categoria, faixa de preço, avaliação e ano de publicação).
+    """
+    logger.info(f"Buscando livros com facetas | skip={skip} | limit={limit} | category_id={category_id} | search={search} | cursor={cursor} | fields={fields}")
+    
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    books, next_cursor, prev_cursor, facets = _list_books(
+        db, skip, limit, category_id, search, min_price, max_price, min_rating, sort_by, cursor,
+        with_facets=True, fields=selected
+    )
+    
+    logger.info(f"Retornados {len(books)} livros | total={facets['total']}")
+    return JSONResponse(content={"books": books, "facets": facets}, headers=cursor_headers(next_cursor, prev_cursor))
+
+@app.get("/books/autocomplete")
+async def autocomplete_books(
+    q: str,
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_db)
+):
+    """Sugestões de livros e autores para o texto digitado (prefixo de qualquer palavra)"""
+    catalog_snapshot.ensure_fresh(db)
+    return JSONResponse(content=autocomplete_index.suggest(q, limit))
+
+@app.post("/books:batch", response_model=BookBatchResponse)
+async def get_books_batch(batch: BookBatchRequest, db: Session = Depends(get_db)):
+    """Obter vários livros de uma vez, na ordem pedida, informando os ids inexistentes"""
+    from sqlalchemy import any_, bindparam
+    from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+    from sqlalchemy.orm import joinedload, selectinload
+    
+    book_ids = list(dict.fromkeys(batch.ids))
+    logger.info(f"Obtendo livros em lote | count={len(book_ids)}")
+    
+    catalog_snapshot.ensure_fresh(db)
+    found = {book_id: catalog_snapshot.get_book(book_id) for book_id in book_ids}
+    
+    # Livros criados por outro worker depois do último refresh: uma única consulta
+    pending = [book_id for book_id, book in found.items() if book is None]
+    if pending:
+        ids = bindparam("ids", pending, type_=ARRAY(PG_UUID(as_uuid=True)))
+        books = db.query(Book).options(joinedload(Book.category), selectinload(Book.tags))\
+            .filter(Book.id == any_(ids)).all()
+        for book in books:
+            found[book.id] = BookSchema.model_validate(book).model_dump(mode="json")
+    
+    missing = [str(book_id) for book_id, book in found.items() if book is None]
+    logger.info(f"Livros em lote retornados | found={len(book_ids) - len(missing)} | missing={len(missing)}")
+    return JSONResponse(content={
+        "books": [book for book in found.values() if book is not None],
+        "missing": missing
+    })
 
 @app.get("/books/{book_id}", response_model=BookSchema)
-async def get_book(book_id: str, db: Session = Depends(get_db)):
+async def get_book(book_id: str, request: Request, db: Session = Depends(get_db)):
     """Obter livro específico"""
     from uuid import UUID
     from sqlalchemy.orm import joinedload
@@ -188,6 +405,12 @@ async def get_book(book_id: str, db: Session = Depends(get_db)):
     except ValueError:
         raise HTTPException(status_code=400, detail="ID de livro inválido")
     
+    catalog_snapshot.ensure_fresh(db)
+    cached = cached_json(request, lambda: catalog_snapshot.get_book(book_uuid), path=f"/books/{book_uuid}")
+    if cached is not None:
+        return cached
+    
+    # Livro criado por outro worker depois do último refresh
     book = db.query(Book).options(joinedload(Book.category))\
         .filter(Book.id == book_uuid).first()
     if not book:
@@ -205,6 +428,10 @@ async def create_book(book: BookCreate, db: Session = Depends(get_db)):
     db.add(db_book)
     db.commit()
     db.refresh(db_book)
+    get_search_backend().index_book(db_book)
+    catalog_snapshot.invalidate()
+    invalidate_books([db_book.id])
+    publish_book_changes([db_book.id])
     log_database_operation(logger, "CREATE", "books", db_book.id, title=book.title)
     
     return db_book
@@ -230,6 +457,10 @@ async def update_book(book_id: str, book: BookUpdate, db: Session = Depends(get_
     
     db.commit()
     db.refresh(db_book)
+    get_search_backend().index_book(db_book)
+    catalog_snapshot.invalidate()
+    invalidate_books([db_book.id])
+    publish_book_changes([db_book.id])
     log_database_operation(logger, "UPDATE", "books", book_uuid)
     return db_book
 
@@ -251,6 +482,10 @@ async def delete_book(book_id: str, db: Session = Depends(get_db)):
     
     db.delete(db_book)
     db.commit()
+    get_search_backend().remove_book(book_uuid)
+    catalog_snapshot.remove_book(book_uuid)
+    invalidate_books([book_uuid])
+    publish_book_changes([book_uuid])
     log_database_operation(logger, "DELETE", "books", book_uuid)
     return {"message": "Livro deletado com sucesso"}
 
@@ -290,72 +525,129 @@ async def update_inventory(
     except ValueError:
         raise HTTPException(status_code=400, detail="ID de livro inválido")
     
-    book = db.query(Book).filter(Book.id == book_uuid).first()
-    if not book:
+    # Incremento atômico no banco (sem ler-alterar-gravar concorrente)
+    new_quantity = inventory.adjust_stock(db, book_uuid, quantity_change)
+    if new_quantity is None:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Livro não encontrado")
     
-    old_quantity = book.stock_quantity
-    book.stock_quantity += quantity_change
-    if book.stock_quantity < 0:
-        book.stock_quantity = 0
-    
     db.commit()
+    _stock_changed([book_uuid])
     log_database_operation(logger, "UPDATE", "books", book_uuid, 
-                         old_quantity=old_quantity, new_quantity=book.stock_quantity)
+                         change=quantity_change, new_quantity=new_quantity)
     return {"message": "Inventário atualizado com sucesso"}
 
+# Reservas de estoque (usadas pelo checkout)
+def _stock_changed(book_ids: Iterable[Any]) -> None:
+    catalog_snapshot.invalidate()
+    invalidate_books(book_ids)
+
+@app.post("/inventory/reservations", response_model=ReservationSchema, status_code=status.HTTP_201_CREATED)
+async def create_reservation(reservation: ReservationCreate, db: Session = Depends(get_db)):
+    """Reservar estoque de todos os itens de um pedido (tudo ou nada)
+    
+    O estoque é descontado na hora; a reserva deve ser confirmada (commit) ou
+    liberada (release), senão é liberada ao expirar.
+    """
+    logger.info(f"Reservando estoque | order_id={reservation.order_id} | items={len(reservation.items)}")
+    
+    expired_book_ids = inventory.release_expired(db)
+    if expired_book_ids:
+        db.commit()
+    
+    try:
+        db_reservation = inventory.reserve(db, reservation.items, order_id=reservation.order_id)
+        db.commit()
+    except inventory.InsufficientStock as e:
+        db.rollback()
+        logger.warning(f"Estoque insuficiente | order_id={reservation.order_id} | book_ids={e.book_ids}")
+        raise HTTPException(status_code=409, detail={
+            "message": "Estoque insuficiente",
+            "book_ids": [str(book_id) for book_id in e.book_ids]
+        })
+    
+    _stock_changed(expired_book_ids + [item["book_id"] for item in db_reservation.items])
+    log_database_operation(logger, "CREATE", "inventory_reservations", db_reservation.id, order_id=reservation.order_id)
+    return db_reservation
+
+def _finish_reservation(reservation_id: str, action: str, db: Session) -> InventoryReservation:
+    from uuid import UUID
+    
+    try:
+        reservation_uuid = UUID(reservation_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ID de reserva inválido")
+    
+    try:
+        if action == "commit":
+            inventory.commit_reservation(db, reservation_uuid)
+        else:
+            inventory.release_reservation(db, reservation_uuid)
+        db.commit()
+    except inventory.ReservationStateError:
+        db.rollback()
+        reservation = db.query(InventoryReservation).filter(InventoryReservation.id == reservation_uuid).first()
+        if not reservation:
+            raise HTTPException(status_code=404, detail="Reserva não encontrada")
+        raise HTTPException(status_code=409, detail=f"Reserva não está pendente (status={reservation.status.value})")
+    
+    reservation = db.query(InventoryReservation).filter(InventoryReservation.id == reservation_uuid).first()
+    if action == "release":
+        _stock_changed([item["book_id"] for item in reservation.items])
+    log_database_operation(logger, "UPDATE", "inventory_reservations", reservation_uuid, action=action)
+    return reservation
+
+@app.post("/inventory/reservations/{reservation_id}/commit", response_model=ReservationSchema)
+async def commit_reservation(reservation_id: str, db: Session = Depends(get_db)):
+    """Confirmar reserva (pedido concluído): o desconto de estoque fica definitivo"""
+    logger.info(f"Confirmando reserva | reservation_id={reservation_id}")
+    return _finish_reservation(reservation_id, "commit", db)
+
+@app.post("/inventory/reservations/{reservation_id}/release", response_model=ReservationSchema)
+async def release_reservation(reservation_id: str, db: Session = Depends(get_db)):
+    """Liberar reserva (pedido cancelado/falhou): o estoque volta para os livros"""
+    logger.info(f"Liberando reserva | reservation_id={reservation_id}")
+    return _finish_reservation(reservation_id, "release", db)
+
 # Categorias
 @app.get("/categories", response_model=List[CategorySchema])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: Session = Depends(get_db)):
     """Listar todas as categorias"""
-    categories = db.query(Category).all()
-    return categories
+    catalog_snapshot.ensure_fresh(db)
+    return cached_json(request, lambda: catalog_snapshot.categories)
 
 @app.get("/categories/{category_id}/books", response_model=List[BookSchema])
 async def get_books_by_category(
     category_id: str,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Obter livros de uma categoria específica"""
-    from uuid import UUID
-    from sqlalchemy.orm import joinedload
+    """Obter livros de uma categoria específica (skip/limit ou cursor e fields, como em /books)"""
+    logger.info(f"Obtendo livros por categoria | category_id={category_id} | skip={skip} | limit={limit} | cursor={cursor} | fields={fields}")
     
-    logger.info(f"Obtendo livros por categoria | category_id={category_id} | skip={skip} | limit={limit}")
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    catalog_snapshot.ensure_fresh(db)
+    category = catalog_snapshot.resolve_category(category_id)
+    if category is None:
+        logger.warning(f"Categoria não encontrada | category_id={category_id}")
+        raise HTTPException(status_code=404, detail="Categoria não encontrada")
     
-    # Tentar converter para UUID
     try:
-        if isinstance(category_id, str):
-            category_uuid = UUID(category_id)
-        else:
-            category_uuid = category_id
-        
-        books = db.query(Book).options(joinedload(Book.category))\
-            .filter(Book.category_id == category_uuid)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-        
-        logger.info(f"Retornados {len(books)} livros da categoria")
-        return books
-    except ValueError:
-        # Se não conseguir converter, tenta como slug
-        logger.info(f"Categoria ID não é UUID válido, tentando buscar por slug")
-        category = db.query(Category).filter(Category.slug == category_id).first()
-        
-        if not category:
-            logger.warning(f"Categoria não encontrada | category_id={category_id}")
-            raise HTTPException(status_code=404, detail="Categoria não encontrada")
-        
-        books = db.query(Book).options(joinedload(Book.category))\
-            .filter(Book.category_id == category.id)\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
-        
-        logger.info(f"Retornados {len(books)} livros da categoria {category.name}")
-        return books
+        books, next_cursor, prev_cursor = catalog_snapshot.query_page(
+            category=category, skip=skip, limit=limit, cursor=cursor, projection=selected
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Retornados {len(books)} livros da categoria")
+    return JSONResponse(content=books, headers=cursor_headers(next_cursor, prev_cursor))
 
 @app.post("/categories", response_model=CategorySchema, status_code=status.HTTP_201_CREATED)
 async def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
@@ -366,6 +658,8 @@ async def create_category(category: CategoryCreate, db: Session = Depends(get_db
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    catalog_snapshot.invalidate()
+    response_cache.invalidate_paths(["/categories"])
     log_database_operation(logger, "CREATE", "categories", db_category.id, name=category.name)
     
     return db_category
@@ -0,0 +1,427 @@
+"""
+Snapshot em memória do catálogo
+
+O catálogo é pequeno e quase só lido: os livros ficam em arrays NumPy
+colunares (preço, rating, reviews, data de criação, categoria) com o JSON de
+resposta de cada livro já serializado. Filtros, ordenação e paginação são
+feitos em memória. A representação resumida (fields=summary) também é
+montada uma vez por livro, junto com o JSON completo; outros conjuntos de
+campos recortam só os livros da página.
+
+Frescor:
+- a cada `refresh_interval` segundos uma consulta barata (count + max(updated_at))
+  busca só os livros alterados desde a última marca d'água de updated_at;
+- os endpoints de escrita deste worker invalidam o snapshot explicitamente;
+- remoções feitas por outros workers aparecem como diferença de contagem e
+  disparam uma recarga completa;
+- ouvintes registrados com `add_listener` são chamados a cada mudança aplicada
+  (ex.: para descartar respostas em cache).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple, Any, Iterable, Callable
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from core.pagination import sort_fields, encode_cursor, decode_cursor, SEARCH_RANK_FIELD
+from core.facets import PRICE_EDGES, RATING_THRESHOLDS, empty_counts
+from core.projection import payload_projector
+from models.book import Book, Category
+from schemas.book import Book as BookSchema, Category as CategorySchema, BOOK_SUMMARY_FIELDS
+
+# Colunas numéricas usadas em filtros e ordenação
+COLUMNS = (
+    ("price", np.float64),
+    ("average_rating", np.float64),
+    ("total_reviews", np.int64),
+    ("created_at", np.float64),  # epoch em segundos; -inf quando nulo
+    ("category", np.int64),
+    ("published_year", np.int64),
+)
+
+# Valores do cursor (como aparecem no JSON) para o tipo das colunas em memória
+CURSOR_CONVERTERS = {
+    "price": float,
+    "average_rating": float,
+    "total_reviews": int,
+    "created_at": lambda value: datetime.fromisoformat(value).timestamp(),
+    "id": str,
+    SEARCH_RANK_FIELD: float,
+}
+
+class CatalogSnapshot:
+    def __init__(self, refresh_interval: float = 5.0, max_tombstone_ratio: float = 0.2):
+        self.refresh_interval = refresh_interval
+        self.max_tombstone_ratio = max_tombstone_ratio
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self._high_water: Optional[datetime] = None
+
+        self.book_ids: List[UUID] = []
+        self.row_index: Dict[UUID, int] = {}
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.summaries: List[Optional[Dict[str, Any]]] = []  # payloads em BOOK_SUMMARY_FIELDS
+        self.alive = np.zeros(0, dtype=bool)
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS}
+        self.id_keys = np.zeros(0, dtype="U36")  # ids como texto: desempate e comparação do cursor
+        self._id_rank: Optional[np.ndarray] = None
+
+        self.categories: List[Dict[str, Any]] = []
+        self.category_codes: Dict[UUID, int] = {}
+        self.category_slugs: Dict[str, int] = {}
+
+        self._orders: Dict[str, np.ndarray] = {}
+        self._unfiltered_facets: Optional[Dict[str, Any]] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._indexes: List[Any] = []
+
+    def attach_index(self, index: Any) -> None:
+        """Mantém um índice derivado (ex.: AutocompleteIndex) em dia com o snapshot.
+
+        O índice recebe clear() antes de cada recarga completa, index_books(payloads)
+        a cada lote aplicado e remove_book(book_id) nas remoções.
+        """
+        self._indexes.append(index)
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Registra uma função chamada sempre que o conteúdo do snapshot muda."""
+        self._listeners.append(listener)
+
+    def _changed(self) -> None:
+        self._unfiltered_facets = None
+        for listener in self._listeners:
+            listener()
+
+    # Frescor
+    def ensure_fresh(self, db: Session) -> None:
+        """Carrega o snapshot na primeira leitura e o atualiza se o intervalo expirou."""
+        with self._lock:
+            if not self._loaded:
+                self.load(db)
+            elif time.monotonic() - self._checked_at >= self.refresh_interval:
+                self.refresh(db)
+
+    def invalidate(self) -> None:
+        """Força a verificação da marca d'água na próxima leitura."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def remove_book(self, book_id: UUID) -> None:
+        """Remove o livro imediatamente (delete neste worker)."""
+        with self._lock:
+            row = self.row_index.pop(book_id, None)
+            if row is not None:
+                self.alive[row] = False
+                self.payloads[row] = None
+                self.summaries[row] = None
+                for index in self._indexes:
+                    index.remove_book(book_id)
+                self._changed()
+            self._checked_at = 0.0
+
+    def load(self, db: Session) -> None:
+        """Recarrega categorias e livros do zero."""
+        self._load_categories(db)
+
+        self.book_ids = []
+        self.row_index = {}
+        self.payloads = []
+        self.summaries = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS}
+        self.id_keys = np.zeros(0, dtype="U36")
+        self._high_water = None
+        for index in self._indexes:
+            index.clear()
+
+        self._upsert(self._books_query(db).all())
+        self._loaded = True
+        self._checked_at = time.monotonic()
+
+    def refresh(self, db: Session) -> None:
+        """Aplica as alterações desde a marca d'água de updated_at."""
+        book_count, high_water = db.query(func.count(Book.id), func.max(Book.updated_at)).one()
+        category_count = db.query(func.count(Category.id)).scalar()
+
+        if category_count != len(self.categories):
+            self._load_categories(db)
+
+        if high_water is not None and (self._high_water is None or high_water > self._high_water):
+            query = self._books_query(db)
+            if self._high_water is not None:
+                # >= para não perder escritas com o mesmo timestamp da marca d'água
+                query = query.filter(Book.updated_at >= self._high_water)
+            self._upsert(query.all())
+
+        # Remoções em outro worker (ou updated_at fora de ordem): recarga completa
+        dead = len(self.alive) - int(self.alive.sum())
+        if book_count != len(self.row_index) or dead > self.max_tombstone_ratio * max(len(self.alive), 1):
+            self.load(db)
+
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _books_query(db: Session):
+        return db.query(Book).options(joinedload(Book.category), selectinload(Book.tags))
+
+    def _load_categories(self, db: Session) -> None:
+        categories = db.query(Category).order_by(Category.created_at).all()
+        self.categories = [CategorySchema.model_validate(category).model_dump(mode="json") for category in categories]
+        for category in categories:
+            code = self.category_codes.setdefault(category.id, len(self.category_codes))
+            self.category_slugs[category.slug] = code
+        self._changed()
+
+    def _upsert(self, books: Iterable[Book]) -> None:
+        new_rows: Dict[str, List[Any]] = {name: [] for name, _ in COLUMNS}
+        new_ids: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        summarize = payload_projector(BOOK_SUMMARY_FIELDS)
+        for book in books:
+            values = self._row_values(book)
+            payload = BookSchema.model_validate(book).model_dump(mode="json")
+            payloads.append(payload)
+
+            row = self.row_index.get(book.id)
+            if row is None:
+                self.row_index[book.id] = len(self.book_ids)
+                self.book_ids.append(book.id)
+                self.payloads.append(payload)
+                self.summaries.append(summarize(payload))
+                new_ids.append(str(book.id))
+                for name, _ in COLUMNS:
+                    new_rows[name].append(values[name])
+            elif row < len(self.alive):
+                self.payloads[row] = payload
+                self.summaries[row] = summarize(payload)
+                for name, _ in COLUMNS:
+                    self.columns[name][row] = values[name]
+            else:
+                # Livro repetido no mesmo lote, ainda não materializado nas colunas
+                self.payloads[row] = payload
+                self.summaries[row] = summarize(payload)
+                for name, _ in COLUMNS:
+                    new_rows[name][row - len(self.alive)] = values[name]
+
+            if book.updated_at is not None and (self._high_water is None or book.updated_at > self._high_water):
+                self._high_water = book.updated_at
+
+        added = len(new_rows["price"])
+        if added:
+            for name, dtype in COLUMNS:
+                self.columns[name] = np.concatenate([self.columns[name], np.array(new_rows[name], dtype=dtype)])
+            self.alive = np.concatenate([self.alive, np.ones(added, dtype=bool)])
+            self.id_keys = np.concatenate([self.id_keys, np.array(new_ids, dtype="U36")])
+            self._id_rank = None
+        self._orders = {}
+        for index in self._indexes:
+            index.index_books(payloads)
+        self._changed()
+
+    def _row_values(self, book: Book) -> Dict[str, Any]:
+        code = self.category_codes.get(book.category_id)
+        if code is None:
+            code = self.category_codes[book.category_id] = len(self.category_codes)
+        return {
+            "price": float(book.price),
+            "average_rating": book.average_rating or 0.0,
+            "total_reviews": book.total_reviews or 0,
+            "created_at": book.created_at.timestamp() if book.created_at else -np.inf,
+            "category": code,
+            "published_year": book.published_year or 0,
+        }
+
+    # Leituras
+    def resolve_category(self, category_id: str) -> Optional[int]:
+        """Código da categoria por UUID ou slug.
+
+        UUID desconhecido devolve -1 (nenhum livro); slug desconhecido devolve None.
+        """
+        try:
+            return self.category_codes.get(UUID(category_id), -1)
+        except ValueError:
+            return self.category_slugs.get(category_id)
+
+    def _sort_column(self, field: str, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """Coluna numérica usada pelo lexsort para um campo da tupla de ordenação."""
+        if field == SEARCH_RANK_FIELD:
+            return scores
+        if field == "id":
+            if self._id_rank is None:
+                self._id_rank = np.argsort(np.argsort(self.id_keys, kind="stable"), kind="stable")
+            return self._id_rank
+        return self.columns[field]
+
+    def _lexsort(self, rows: np.ndarray, fields: Tuple[str, ...], descending: bool, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        sign = -1 if descending else 1
+        # np.lexsort usa a última chave como principal
+        keys = tuple(sign * self._sort_column(field, scores)[rows] for field in reversed(fields))
+        return rows[np.lexsort(keys)]
+
+    def _order(self, fields: Tuple[str, ...], descending: bool) -> np.ndarray:
+        """Ordem completa das linhas para a tupla, calculada uma vez por versão do snapshot."""
+        order = self._orders.get((fields, descending))
+        if order is None:
+            order = self._lexsort(np.arange(len(self.alive)), fields, descending)
+            self._orders[(fields, descending)] = order
+        return order
+
+    def _beyond(self, fields: Tuple[str, ...], values: List[Any], less: bool, scores: Optional[np.ndarray]) -> np.ndarray:
+        """Máscara das linhas estritamente além da tupla do cursor (comparação lexicográfica)."""
+        beyond = np.zeros(len(self.alive), dtype=bool)
+        equal = np.ones(len(self.alive), dtype=bool)
+        for field, value in zip(fields, values):
+            column = self.id_keys if field == "id" else self._sort_column(field, scores)
+            bound = CURSOR_CONVERTERS[field](value)
+            beyond |= equal & (column < bound if less else column > bound)
+            equal &= column == bound
+        return beyond
+
+    def _cursor_values(self, fields: Tuple[str, ...], row: int, scores: Optional[np.ndarray]) -> List[Any]:
+        return [float(scores[row]) if field == SEARCH_RANK_FIELD else self.payloads[row][field] for field in fields]
+
+    def _filter(
+        self,
+        category: Optional[int],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        min_rating: Optional[float],
+        search_scores: Optional[Dict[UUID, float]]
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Máscara das linhas que passam nos filtros e, com busca, a relevância por linha."""
+        columns = self.columns
+        mask = self.alive.copy()
+        if category is not None:
+            mask &= columns["category"] == category
+        if min_price is not None:
+            mask &= columns["price"] >= min_price
+        if max_price is not None:
+            mask &= columns["price"] <= max_price
+        if min_rating is not None:
+            mask &= columns["average_rating"] >= min_rating
+
+        scores = None
+        if search_scores is not None:
+            scores = np.zeros(len(mask))
+            matched = np.zeros(len(mask), dtype=bool)
+            for book_id, score in search_scores.items():
+                row = self.row_index.get(book_id)
+                if row is not None:
+                    scores[row] = score
+                    matched[row] = True
+            mask &= matched
+        return mask, scores
+
+    def query_page(
+        self,
+        category: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        sort_by: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        search_scores: Optional[Dict[UUID, float]] = None,
+        cursor: Optional[str] = None,
+        projection: Optional[Tuple[str, ...]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """Filtra, ordena e pagina em memória.
+
+        Com cursor, a página continua a partir da tupla de ordenação codificada
+        nele (skip é ignorado). Retorna (livros já serializados, cursor da
+        próxima página, cursor da anterior); ValueError se o cursor for inválido.
+        `projection` (campos de fields=) devolve os livros só com esses campos.
+        """
+        with self._lock:
+            mask, scores = self._filter(category, min_price, max_price, min_rating, search_scores)
+            fields, descending = sort_fields(sort_by, searching=search_scores is not None)
+
+            if scores is not None and SEARCH_RANK_FIELD in fields:
+                order = self._lexsort(np.flatnonzero(mask), fields, descending, scores)
+            else:
+                order = self._order(fields, descending)
+                order = order[mask[order]]
+
+            backward = False
+            if cursor:
+                values, backward = decode_cursor(cursor, fields)
+                order = order[self._beyond(fields, values, descending != backward, scores)[order]]
+                has_more = len(order) > limit
+                page = order[max(len(order) - limit, 0):] if backward else order[:limit]
+            else:
+                has_more = len(order) > skip + limit
+                page = order[skip:skip + limit]
+
+            next_cursor = prev_cursor = None
+            if len(page):
+                if has_more or backward:
+                    next_cursor = encode_cursor(fields, self._cursor_values(fields, page[-1], scores))
+                if (has_more and backward) or (not backward and (cursor or skip > 0)):
+                    prev_cursor = encode_cursor(fields, self._cursor_values(fields, page[0], scores), backward=True)
+
+            if projection == BOOK_SUMMARY_FIELDS:
+                books = [self.summaries[row] for row in page]
+            elif projection:
+                projector = payload_projector(projection)
+                books = [projector(self.payloads[row]) for row in page]
+            else:
+                books = [self.payloads[row] for row in page]
+            return books, next_cursor, prev_cursor
+
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """Como query_page, devolvendo só os livros."""
+        return self.query_page(**filters)[0]
+
+    def facets(
+        self,
+        category: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        search_scores: Optional[Dict[UUID, float]] = None
+    ) -> Dict[str, Any]:
+        """Contagens brutas das facetas sobre os livros filtrados (ver core.facets).
+
+        Sem filtros o resultado fica em cache até a próxima mudança no snapshot.
+        """
+        with self._lock:
+            unfiltered = category is None and min_price is None and max_price is None \
+                and min_rating is None and search_scores is None
+            if unfiltered and self._unfiltered_facets is not None:
+                return self._unfiltered_facets
+
+            mask, _ = self._filter(category, min_price, max_price, min_rating, search_scores)
+            columns = {name: column[mask] for name, column in self.columns.items()}
+
+            counts = empty_counts()
+            counts["total"] = int(mask.sum())
+
+            ids_by_code = {code: str(category_id) for category_id, code in self.category_codes.items()}
+            category_counts = np.bincount(columns["category"], minlength=len(ids_by_code))
+            counts["categories"] = {
+                ids_by_code[code]: int(count) for code, count in enumerate(category_counts)
+                if count and code in ids_by_code
+            }
+
+            bands = np.searchsorted(np.array(PRICE_EDGES, dtype=np.float64), columns["price"], side="right")
+            counts["price"] = [int(count) for count in np.bincount(bands, minlength=len(PRICE_EDGES) + 1)]
+
+            ratings = columns["average_rating"]
+            counts["rating"] = {threshold: int((ratings >= threshold).sum()) for threshold in RATING_THRESHOLDS}
+
+            years, year_counts = np.unique(columns["published_year"], return_counts=True)
+            counts["published_year"] = {int(year): int(count) for year, count in zip(years, year_counts) if year}
+
+            if unfiltered:
+                self._unfiltered_facets = counts
+            return counts
+
+    def get_book(self, book_id: UUID) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.row_index.get(book_id)
+            return self.payloads[row] if row is not None else None
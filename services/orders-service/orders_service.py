@@ -2,21 +2,34 @@
 Orders Service - Gerenciamento de Pedidos
 Serviço simples e funcional para gerenciar pedidos
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import asyncio
+from datetime import datetime
 import httpx
 import time
 from jose import JWTError, jwt
 
 from core.config import settings
-from core.database import get_db, engine, Base
+from core.database import get_db, engine, Base, SessionLocal
 from core.logging import setup_logging, log_request, log_response, log_error, log_database_operation, log_service_call
-from models.order import Order, OrderItem
+from core import inventory
+from core.checkout import place_order, EmptyCart
+from core import outbox
+from core.cart_store import get_cart_store
+from core.idempotency import run_idempotent
+from core.order_history import order_history
+from core.order_status import bulk_transition, cancel_order as cancel_order_status
+from core.order_export import export_rows, ndjson_chunks, csv_chunks, EXPORT_FORMATS
+from core.pagination import cursor_headers
+from models.order import Order, OrderItem, OrderStatus, UserOrderSummary
 from models.user import User
 from schemas.order import OrderCreate, OrderUpdate, Order as OrderSchema, OrderItem as OrderItemSchema
+from schemas.order import OrderSummary, UserOrderStats, OrderBulkStatusRequest, OrderBulkStatusResponse, OrderStatusResult
 
 logger = setup_logging("orders-service")
 
@@ -46,6 +59,17 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # HTTP client
 http_client = httpx.AsyncClient()
 
+# Efeitos pós-checkout (outbox): processados aqui com OUTBOX_WORKER=local, ou pelo Celery
+@app.on_event("startup")
+async def start_outbox_worker():
+    if settings.OUTBOX_WORKER == "local":
+        asyncio.create_task(outbox.run_local_worker(SessionLocal))
+
+# Configuração inválida do cart store falha na subida, não no primeiro checkout
+@app.on_event("startup")
+async def check_cart_store():
+    get_cart_store()
+
 # Middleware de logging
 @app.middleware("http")
 async def log_requests_middleware(request: Request, call_next):
@@ -139,6 +163,14 @@ async def get_user_id(token: str = Depends(oauth2_scheme), db: Session = Depends
     logger.debug(f"Usuário autenticado | user_id={user.id} | email={email}")
     return user.id  # Retorna UUID diretamente
 
+# Dependency: exigir usuário admin
+async def get_admin_user_id(user_id = Depends(get_user_id), db: Session = Depends(get_db)):
+    is_admin = db.query(User.is_admin).filter(User.id == user_id).scalar()
+    if not is_admin:
+        logger.warning(f"Acesso admin negado | user_id={user_id}")
+        raise HTTPException(status_code=403, detail="Permissão negada")
+    return user_id
+
 # Endpoints básicos
 @app.get("/")
 async def root():
@@ -153,177 +185,41 @@ async def health_check():
 async def create_order(
     order_data: OrderCreate,
     user_id = Depends(get_user_id),
-    token: str = Depends(oauth2_scheme),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db)
 ):
-    """Criar novo pedido do carrinho"""
-    logger.info(f"Criando pedido | user_id={user_id} | token_present={bool(token)}")
-    
-    # Obter resumo do carrinho passando o token de autenticação
-    try:
-        if not token:
-            logger.error("Token não disponível para chamar cart service")
-            raise HTTPException(status_code=401, detail="Token de autenticação necessário")
-            
-        headers = {"Authorization": f"Bearer {token}"}
-        logger.debug(f"Chamando cart service | url={settings.CART_SERVICE_URL}/cart/summary")
-        
-        response = await http_client.get(
-            f"{settings.CART_SERVICE_URL}/cart/summary",
-            headers=headers
-        )
-        
-        logger.debug(f"Resposta do cart service | status_code={response.status_code}")
-        
-        if response.status_code == 401:
-            logger.error("Cart service retornou 401 - token inválido")
-            raise HTTPException(status_code=401, detail="Token inválido para acesso ao carrinho")
-        elif response.status_code != 200:
-            logger.error(f"Erro ao obter carrinho | status_code={response.status_code} | response={response.text[:200]}")
-            raise HTTPException(status_code=400, detail="Não foi possível obter carrinho")
-            
-        try:
-            cart_data = response.json()
-            logger.debug(f"Dados do carrinho recebidos | items_count={len(cart_data.get('items', []))} | total_price={cart_data.get('total_price')}")
-        except Exception as json_error:
-            logger.error(f"Erro ao parsear JSON do carrinho | response_text={response.text[:500]} | error={str(json_error)}")
-            raise HTTPException(status_code=500, detail=f"Erro ao processar resposta do carrinho: {str(json_error)}")
-        
-        log_service_call(logger, "cart", "/cart/summary", "GET", 200)
-    except httpx.RequestError as e:
-        log_error(logger, e, "get_cart_summary")
-        raise HTTPException(status_code=503, detail="Serviço de carrinho indisponível")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erro inesperado ao obter carrinho | error={str(e)} | type={type(e).__name__}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Erro ao obter carrinho: {str(e)}")
+    """Criar novo pedido do carrinho (checkout transacional, sem chamadas ao cart service)
     
-    if not cart_data.get("items"):
-        logger.warning(f"Carrinho vazio | cart_data={cart_data}")
-        raise HTTPException(status_code=400, detail="Carrinho vazio")
-    
-    # Preparar itens do pedido
-    from uuid import UUID as UUIDType
+    Com o header Idempotency-Key, repetições da mesma requisição devolvem o
+    pedido já criado em vez de criar outro.
+    """
+    logger.info(f"Criando pedido | user_id={user_id} | idempotency_key={idempotency_key}")
     
-    order_items_data = []
-    for item in cart_data["items"]:
+    async def checkout():
         try:
-            # Converter book_id para UUID se for string
-            book_id = item["book_id"]
-            if isinstance(book_id, str):
-                book_id = UUIDType(book_id)
-            
-            order_items_data.append({
-                "book_id": book_id,
-                "quantity": item["quantity"],
-                "unit_price": item["price"]
+            order = place_order(db, user_id, order_data.shipping_address, order_data.payment_method or "credit_card")
+        except EmptyCart:
+            logger.warning(f"Carrinho vazio | user_id={user_id}")
+            raise HTTPException(status_code=400, detail="Carrinho vazio")
+        except inventory.InsufficientStock as e:
+            logger.warning(f"Estoque insuficiente | user_id={user_id} | book_ids={e.book_ids}")
+            raise HTTPException(status_code=409, detail={
+                "message": "Estoque insuficiente",
+                "book_ids": [str(book_id) for book_id in e.book_ids]
             })
-        except (ValueError, TypeError) as e:
-            logger.error(f"Erro ao processar item do carrinho | item={item} | error={str(e)}")
-            raise HTTPException(status_code=400, detail=f"ID de livro inválido: {item.get('book_id')}")
-    
-    # Criar pedido
-    try:
-        shipping_address = {}
-        payment_method = "credit_card"
-        
-        if hasattr(order_data, 'shipping_address') and order_data.shipping_address:
-            shipping_address = order_data.shipping_address
-        elif isinstance(order_data, dict) and 'shipping_address' in order_data:
-            shipping_address = order_data['shipping_address']
-        
-        if hasattr(order_data, 'payment_method') and order_data.payment_method:
-            payment_method = order_data.payment_method
-        elif isinstance(order_data, dict) and 'payment_method' in order_data:
-            payment_method = order_data['payment_method']
-        
-        logger.debug(f"Criando pedido no banco | user_id={user_id} | total_amount={cart_data.get('total_price', 0)}")
-        
-        order = Order(
-            user_id=user_id,
-            status="pending",
-            total_amount=cart_data.get("total_price", 0),
-            shipping_address=shipping_address,
-            payment_method=payment_method
-        )
-        db.add(order)
-        db.commit()
-        db.refresh(order)
-        log_database_operation(logger, "CREATE", "orders", order.id, user_id=user_id)
-        logger.info(f"Pedido criado no banco | order_id={order.id}")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Erro ao criar pedido no banco | error={str(e)} | type={type(e).__name__}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Erro ao criar pedido: {str(e)}")
-    
-    # Criar itens do pedido
-    try:
-        logger.debug(f"Criando {len(order_items_data)} itens do pedido")
-        for item_data in order_items_data:
-            subtotal = item_data["quantity"] * item_data["unit_price"]
-            order_item = OrderItem(
-                order_id=order.id,
-                book_id=item_data["book_id"],
-                quantity=item_data["quantity"],
-                unit_price=item_data["unit_price"],
-                subtotal=subtotal
-            )
-            db.add(order_item)
-        db.commit()
-        logger.info(f"Itens do pedido criados | order_id={order.id} | items_count={len(order_items_data)}")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Erro ao criar itens do pedido | order_id={order.id} | error={str(e)} | type={type(e).__name__}", exc_info=True)
-        # Tentar deletar o pedido criado
-        try:
-            db.delete(order)
-            db.commit()
-        except:
-            pass
-        raise HTTPException(status_code=500, detail=f"Erro ao criar itens do pedido: {str(e)}")
-    
-    # Limpar carrinho passando o token de autenticação
-    try:
-        headers = {"Authorization": f"Bearer {token}"}
-        await http_client.delete(
-            f"{settings.CART_SERVICE_URL}/cart",
-            headers=headers
-        )
-        log_service_call(logger, "cart", "/cart", "DELETE", 200)
-    except Exception as e:
-        # Não falhar o pedido se não conseguir limpar o carrinho
-        logger.warning(f"Erro ao limpar carrinho após criar pedido | error={str(e)}")
-        pass
-    
-    logger.info(f"Pedido criado com sucesso | order_id={order.id} | user_id={user_id}")
-    
-    # Recarregar o pedido com os itens e books relacionados para retornar resposta completa
-    try:
-        from sqlalchemy.orm import joinedload
-        
-        # Recarregar o pedido com relacionamentos usando eager loading
-        order_with_items = db.query(Order).options(
-            joinedload(Order.items).joinedload(OrderItem.book)
-        ).filter(Order.id == order.id).first()
+        except Exception as e:
+            logger.error(f"Erro ao criar pedido no banco | error={str(e)} | type={type(e).__name__}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Erro ao criar pedido: {str(e)}")
         
-        if not order_with_items:
-            logger.warning(f"Pedido não encontrado após recarregamento | order_id={order.id}")
-            # Recarregar o pedido básico
-            db.refresh(order)
-            return order
-        
-        logger.debug(f"Retornando pedido com itens | order_id={order_with_items.id} | items_count={len(order_with_items.items)}")
-        
-        # O schema OrderItemWithBook agora aceita objetos ORM diretamente
-        # graças ao from_attributes=True e ao uso de BookSchema
-        return order_with_items
-        
-    except Exception as e:
-        logger.error(f"Erro ao recarregar pedido | order_id={order.id} | error={str(e)}", exc_info=True)
-        # Retornar pedido básico em caso de erro
-        db.refresh(order)
-        return order
+        outbox.wake()
+        log_database_operation(logger, "CREATE", "orders", order["id"], user_id=user_id, items_count=len(order["items"]))
+        logger.info(f"Pedido criado com sucesso | order_id={order['id']} | user_id={user_id} | total={order['total_amount']}")
+        return OrderSchema.model_validate(order).model_dump(mode="json")
+    
+    return await run_idempotent(
+        idempotency_key, f"orders:{user_id}", order_data.model_dump(mode="json"), checkout,
+        status_code=status.HTTP_201_CREATED
+    )
 
 @app.get("/orders", response_model=List[OrderSchema])
 async def get_user_orders(
@@ -349,6 +245,34 @@ async def get_user_orders(
     logger.debug(f"Retornados {len(orders)} pedidos para user_id={user_id}")
     return orders
 
+@app.get("/orders/history", response_model=List[OrderSummary])
+async def get_order_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status_filter: Optional[OrderStatus] = None,
+    user_id = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """Histórico de pedidos do usuário: resumos paginados por cursor (X-Next-Cursor)
+    
+    Os itens de cada pedido são obtidos sob demanda em GET /orders/{order_id}.
+    """
+    logger.info(f"Obtendo histórico de pedidos | user_id={user_id} | limit={limit} | cursor={cursor}")
+    
+    try:
+        summaries, next_cursor = order_history(db, user_id, limit=limit, cursor=cursor, status=status_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    content = [OrderSummary.model_validate(summary).model_dump(mode="json") for summary in summaries]
+    return JSONResponse(content=content, headers=cursor_headers(next_cursor, None))
+
+@app.get("/orders/summary", response_model=UserOrderStats)
+async def get_order_stats(user_id = Depends(get_user_id), db: Session = Depends(get_db)):
+    """Totais de pedidos do usuário (tabela user_order_summaries)"""
+    stats = db.query(UserOrderSummary).filter(UserOrderSummary.user_id == user_id).first()
+    return stats or UserOrderStats()
+
 @app.get("/orders/{order_id}", response_model=OrderSchema)
 async def get_order(
     order_id: str,
@@ -413,7 +337,11 @@ async def update_order(
     if order_update.status and order_update.status != "cancelled":
         raise HTTPException(status_code=400, detail="Status inválido")
     
-    for key, value in order_update.dict(exclude_unset=True).items():
+    changes = order_update.dict(exclude_unset=True)
+    if changes.pop("status", None) == OrderStatus.CANCELLED:
+        # UPDATE condicional: só quem efetivamente cancela devolve o estoque e atualiza os totais
+        cancel_order_status(db, order.id, [status for status in OrderStatus if status != OrderStatus.CANCELLED])
+    for key, value in changes.items():
         setattr(order, key, value)
     
     db.commit()
@@ -444,14 +372,76 @@ async def cancel_order(
     if order.user_id != user_id:
         raise HTTPException(status_code=403, detail="Permissão negada")
     
-    if order.status not in ["pending", "confirmed"]:
+    # UPDATE condicional no status: cancelamentos concorrentes não contam o pedido duas vezes
+    if not cancel_order_status(db, order.id, [OrderStatus.PENDING]):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Pedido não pode ser cancelado")
-    
-    order.status = "cancelled"
     db.commit()
     log_database_operation(logger, "UPDATE", "orders", order_id, status="cancelled")
     return {"message": "Pedido cancelado com sucesso"}
 
+# Admin
+@app.post("/admin/orders/status", response_model=OrderBulkStatusResponse)
+async def bulk_update_order_status(
+    request: OrderBulkStatusRequest,
+    admin_id = Depends(get_admin_user_id),
+    db: Session = Depends(get_db)
+):
+    """Mudar o status de vários pedidos de uma vez (admin apenas)
+    
+    As transições são validadas e aplicadas no SQL, em um único UPDATE; a
+    resposta traz o resultado de cada pedido (updated, unchanged,
+    invalid_transition ou not_found). Pedidos cancelados devolvem o estoque.
+    """
+    logger.info(f"Atualizando status de pedidos em lote | admin_id={admin_id} | changes={len(request.changes)}")
+    
+    try:
+        results = bulk_transition(db, request.changes)
+    except Exception as e:
+        log_error(logger, e, "bulk_update_order_status")
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar pedidos: {str(e)}")
+    
+    updated = sum(1 for result in results if result["result"] == OrderStatusResult.UPDATED)
+    log_database_operation(logger, "UPDATE", "orders", None, admin_id=admin_id, updated=updated, requested=len(results))
+    return {"updated": updated, "results": results}
+
+@app.get("/admin/orders/export")
+async def export_orders(
+    export_format: str = Query("ndjson", alias="format"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status_filter: Optional[OrderStatus] = None,
+    admin_id = Depends(get_admin_user_id)
+):
+    """Exportar pedidos e itens em streaming, como NDJSON ou CSV (admin apenas)
+    
+    Filtra por created_at em [created_from, created_to) e por status. As
+    linhas vêm de um cursor no servidor, então a memória usada não depende
+    do tamanho da exportação.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(EXPORT_FORMATS)}")
+    
+    logger.info(f"Exportando pedidos | admin_id={admin_id} | format={export_format} | created_from={created_from} | created_to={created_to} | status={status_filter}")
+    chunks = csv_chunks if export_format == "csv" else ndjson_chunks
+    
+    def stream():
+        # Sessão própria: a do Depends(get_db) é fechada antes do fim do streaming
+        db = SessionLocal()
+        try:
+            yield from chunks(export_rows(db, created_from, created_to, status_filter))
+        except Exception as e:
+            log_error(logger, e, "export_orders")
+            raise
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{export_format}"'}
+    )
+
 @app.get("/orders/{order_id}/items", response_model=List[OrderItemSchema])
 async def get_order_items(
     order_id: str,
@@ -2,7 +2,7 @@
 Payment Service - Processamento de Pagamentos
 Serviço simples e funcional para processar pagamentos
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
@@ -10,10 +10,15 @@ import uuid
 import time
 
 from core.config import settings
+from core.database import engine, Base
+from core.idempotency import run_idempotent
 from core.logging import setup_logging, log_request, log_response, log_error
 
 logger = setup_logging("payment-service")
 
+# Criar tabelas do banco (idempotency_keys)
+Base.metadata.create_all(bind=engine)
+
 app = FastAPI(
     title="Payment Service",
     description="Serviço de processamento de pagamentos",
@@ -66,24 +71,31 @@ async def health_check():
 
 # Pagamentos
 @app.post("/payments")
-async def process_payment(payment_data: dict):
-    """Processar pagamento"""
+async def process_payment(payment_data: dict, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Processar pagamento
+    
+    Com o header Idempotency-Key, uma repetição devolve o mesmo pagamento em vez de cobrar de novo
+    (as chaves valem por pedido: a mesma chave em outro order_id é outro pagamento).
+    """
     order_id = payment_data.get("order_id")
     amount = payment_data.get("amount", 0)
     
-    logger.info(f"Processando pagamento | order_id={order_id} | amount={amount}")
+    logger.info(f"Processando pagamento | order_id={order_id} | amount={amount} | idempotency_key={idempotency_key}")
     
-    # Simulação de processamento
-    payment_id = str(uuid.uuid4())
+    async def charge():
+        # Simulação de processamento
+        payment_id = str(uuid.uuid4())
+        
+        logger.info(f"Pagamento processado | payment_id={payment_id} | order_id={order_id}")
+        return {
+            "payment_id": payment_id,
+            "status": "completed",
+            "amount": amount,
+            "order_id": order_id,
+            "message": "Pagamento processado com sucesso"
+        }
     
-    logger.info(f"Pagamento processado | payment_id={payment_id} | order_id={order_id}")
-    return {
-        "payment_id": payment_id,
-        "status": "completed",
-        "amount": amount,
-        "order_id": order_id,
-        "message": "Pagamento processado com sucesso"
-    }
+    return await run_idempotent(idempotency_key, f"payments:{order_id}", payment_data, charge)
 
 @app.get("/payment-methods")
 async def get_payment_methods():
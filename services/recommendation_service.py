@@ -0,0 +1,151 @@
+from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import Session
+from uuid import UUID
+from core.config import settings
+from core.session_store import get_session_store
+from ml.hybrid_recommender import HybridRecommender
+from models.book import Book
+from models.recommendation import UserInteraction, InteractionType, INTERACTION_WEIGHTS
+
+_recommender: Optional[HybridRecommender] = None
+
+def get_recommender() -> HybridRecommender:
+    """Return the process-wide recommender, loading the trained models once.
+
+    Model arrays are memory-mapped (MODEL_MMAP), so uvicorn/gunicorn workers
+    on the same host share them instead of each holding a copy. With
+    SESSION_STORE=redis the session buffers are shared as well.
+    """
+    global _recommender
+    if _recommender is None:
+        recommender = HybridRecommender(settings.MODEL_PATH, session_store=get_session_store())
+        recommender.load_models(mmap=settings.MODEL_MMAP)
+        _recommender = recommender
+    return _recommender
+
+class RecommendationService:
+    def __init__(self, recommender: Optional[HybridRecommender] = None):
+        self.recommender = recommender or get_recommender()
+
+    def record_interaction(self, user_id: str, book_id: str, interaction_type: str, db: Session) -> bool:
+        """Persist a user interaction (VIEW, ADD_TO_CART, PURCHASE, ...)."""
+        try:
+            kind = InteractionType[interaction_type]
+            db.add(UserInteraction(
+                user_id=UUID(str(user_id)),
+                book_id=UUID(str(book_id)),
+                interaction_type=kind,
+                interaction_value=INTERACTION_WEIGHTS.get(kind, 1.0)
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error recording interaction: {e}")
+            return False
+
+        # Make the interaction visible to "for you" within the same session
+        self.recommender.record_session_interaction(str(user_id), str(book_id), INTERACTION_WEIGHTS.get(kind, 1.0))
+        return True
+
+    def get_user_recommendations(
+        self,
+        user_id: str,
+        db: Session,
+        limit: int = 10,
+        algorithm: str = "hybrid",
+        diversify: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get personalized recommendations, falling back to popular books for cold start."""
+        rows = (
+            db.query(UserInteraction.book_id, UserInteraction.interaction_value)
+            .filter(UserInteraction.user_id == UUID(str(user_id)))
+            .all()
+        )
+        user_interactions = [
+            {'book_id': str(book_id), 'interaction_value': value or 1.0}
+            for book_id, value in rows
+        ]
+
+        recs = self.recommender.get_user_recommendations(
+            str(user_id), user_interactions, limit, algorithm, diversify=diversify, explain=True
+        )
+        if not recs:
+            recs = self.recommender.get_cold_start_recommendations(limit, explain=True)
+
+        return self._build_results(recs, db, seed_prefix="Porque você se interessou por")
+
+    def get_item_recommendations(
+        self,
+        book_id: str,
+        db: Session,
+        limit: int = 10,
+        algorithm: str = "hybrid",
+        diversify: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get books similar to the given book."""
+        try:
+            recs = self.recommender.get_item_recommendations(
+                str(book_id), limit, algorithm, diversify=diversify, explain=True
+            )
+        except ValueError as e:
+            print(f"Error in item recommendations: {e}")
+            recs = []
+
+        return self._build_results(recs, db, seed_prefix="Semelhante a")
+
+    def get_bought_together(
+        self,
+        book_ids: List[str],
+        db: Session,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Get books frequently bought together with the given books (cart, order)."""
+        recs = self.recommender.get_bought_together([str(book_id) for book_id in book_ids], limit, explain=True)
+        return self._build_results(recs, db, seed_prefix="Frequentemente comprado com")
+
+    def _build_results(self, recs: List[tuple], db: Session, seed_prefix: str) -> List[Dict[str, Any]]:
+        """Attach book details and a readable reason to each recommendation.
+
+        Result books and the seed books named in the reasons are fetched with a
+        single IN query.
+        """
+        if not recs:
+            return []
+
+        wanted = {book_id for book_id, _, _ in recs}
+        wanted.update(
+            reason['book_id'] for _, _, reason in recs
+            if reason and 'book_id' in reason
+        )
+        books = db.query(Book).filter(Book.id.in_([UUID(book_id) for book_id in wanted])).all()
+        books_by_id = {str(book.id): book for book in books}
+
+        results = []
+        for book_id, score, reason in recs:
+            book = books_by_id.get(book_id)
+            if book is None:
+                continue
+            results.append({
+                'book_id': book_id,
+                'score': float(score),
+                'reason': self._describe_reason(reason, books_by_id, seed_prefix),
+                'title': book.title,
+                'author': book.author,
+                'price': float(book.price),
+                'cover_image_url': book.cover_image_url
+            })
+        return results
+
+    @staticmethod
+    def _describe_reason(reason: Optional[Dict[str, Any]], books_by_id: Dict[str, Book], seed_prefix: str) -> Optional[str]:
+        """Turn a model reason into a user-facing sentence."""
+        if not reason:
+            return None
+        if reason['type'] in ('similar_to', 'bought_together'):
+            seed = books_by_id.get(reason['book_id'])
+            return f'{seed_prefix} "{seed.title}"' if seed else None
+        if reason['type'] == 'similar_users':
+            return "Leitores com gostos parecidos com os seus também gostaram"
+        if reason['type'] == 'popular':
+            return "Popular entre os leitores"
+        return None
@@ -6,7 +6,7 @@ celery_app = Celery(
     "bookstore",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["tasks.recommendation_tasks"]
+    include=["tasks.recommendation_tasks", "tasks.outbox_tasks"]
 )
 
 # Configure Celery
@@ -33,4 +33,8 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.recommendation_tasks.update_recommendation_cache',
         'schedule': 3600.0,  # Run hourly
     },
+    'process-outbox': {
+        'task': 'tasks.outbox_tasks.process_outbox',
+        'schedule': settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    },
 }
@@ -0,0 +1,26 @@
+from tasks.celery_app import celery_app
+from core.config import settings
+from core.database import SessionLocal
+from core.outbox import dispatch_pending
+import core.order_events  # registra os handlers de "order.created"
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task
+def process_outbox(limit: int = 100) -> int:
+    """Process pending outbox events (OUTBOX_WORKER=celery)."""
+    if settings.OUTBOX_WORKER != "celery":
+        return 0
+    db = SessionLocal()
+    try:
+        processed = dispatch_pending(db, limit=limit)
+        if processed:
+            logger.info(f"Processed outbox events | events={processed}")
+        return processed
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error processing outbox: {e}")
+        raise
+    finally:
+        db.close()
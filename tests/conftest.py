@@ -0,0 +1,92 @@
+"""
+Configuração comum dos testes
+
+Os testes rodam contra um SQLite temporário: DATABASE_URL precisa estar
+definida antes de core.database ser importado. Os serviços ficam em
+diretórios com hífen (services/cart-service), então são carregados pelo
+caminho do arquivo.
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ.setdefault("CART_STORE", "sql")
+sys.path.insert(0, ROOT)
+
+import pytest
+from sqlalchemy import event, literal
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Values
+
+# Colunas UUID do PostgreSQL viram texto no SQLite
+@compiles(UUID, "sqlite")
+def _compile_uuid(type_, compiler, **kw):
+    return "CHAR(32)"
+
+# O SQLite não aceita (VALUES ...) AS nome (colunas): vira um SELECT ... UNION ALL
+@compiles(Values, "sqlite")
+def _compile_values(element, compiler, asfrom=False, **kw):
+    rows = [row for chunk in element._data for row in chunk]
+    selects = " UNION ALL ".join(
+        "SELECT " + ", ".join(
+            f"{compiler.process(literal(value, column.type), **kw)} AS {column.name}"
+            for column, value in zip(element.columns, row)
+        )
+        for row in rows
+    )
+    return f"({selects}) AS {element.name}" if asfrom else f"({selects})"
+
+def load_service(directory: str, module: str):
+    """Importa o módulo principal de um serviço (ex.: cart-service/cart_service.py)."""
+    if module in sys.modules:
+        return sys.modules[module]
+    path = os.path.join(ROOT, "services", directory, f"{module}.py")
+    spec = importlib.util.spec_from_file_location(module, path)
+    service = importlib.util.module_from_spec(spec)
+    sys.modules[module] = service
+    spec.loader.exec_module(service)
+    return service
+
+class QueryCounter:
+    """Conta os statements executados no engine enquanto ativo."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+def _sqlite_functions(dbapi_connection, connection_record):
+    # GREATEST do PostgreSQL (ignora NULLs), usado nos upserts de totais
+    dbapi_connection.create_function(
+        "greatest", -1, lambda *args: max((arg for arg in args if arg is not None), default=None)
+    )
+
+@pytest.fixture
+def db_engine():
+    from core.database import Base, engine
+    import models  # noqa: F401 - registra todos os mappers
+
+    if not event.contains(engine, "connect", _sqlite_functions):
+        event.listen(engine, "connect", _sqlite_functions)
+        engine.dispose()
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,99 @@
+"""
+Operações em lote e merge do carrinho, com o carrinho no banco (sql) e no cart store (memory)
+"""
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+from core.cart_store import InMemoryCartStore
+from tests.conftest import load_service
+
+class FakeBookCache:
+    def __init__(self, prices):
+        self._prices = prices
+
+    async def prices(self, book_ids):
+        ids = [str(book_id) for book_id in book_ids]
+        return {book_id: self._prices[book_id] for book_id in ids if book_id in self._prices}, \
+            [book_id for book_id in ids if book_id not in self._prices]
+
+@pytest.fixture(params=["sql", "memory"])
+def cart_app(request, db_engine, monkeypatch):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+    from models.cart import Cart, CartItem
+    from models.user import User
+
+    cart_service = load_service("cart-service", "cart_service")
+
+    db = SessionLocal()
+    category = Category(name="Poesia", slug="poesia")
+    user = User(email="lote@example.com", password_hash="x", full_name="Leitor")
+    db.add_all([category, user])
+    db.flush()
+    books = [
+        Book(title=f"Poema {i}", author="Autor", isbn=f"97800000004{i:02d}", publisher="Editora",
+             published_year=2000, price=10 + i, category_id=category.id, stock_quantity=10)
+        for i in range(4)
+    ]
+    cart = Cart(user_id=user.id)
+    db.add_all(books + [cart])
+    db.flush()
+    db.add(CartItem(cart_id=cart.id, book_id=books[0].id, quantity=2))
+    db.commit()
+    user_id = user.id
+    book_ids = [str(book.id) for book in books]
+    db.close()
+
+    store = InMemoryCartStore() if request.param == "memory" else None
+    monkeypatch.setattr(cart_service, "get_cart_store", lambda: store)
+    monkeypatch.setattr(cart_service, "get_book_cache", lambda: FakeBookCache({book_id: 10.0 for book_id in book_ids}))
+    cart_service.app.dependency_overrides[cart_service.get_user_id] = lambda: user_id
+    yield cart_service.app, book_ids, store
+    cart_service.app.dependency_overrides.clear()
+
+def post(app, path: str, body) -> httpx.Response:
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, json=body)
+    return asyncio.run(request())
+
+def quantities(response: httpx.Response):
+    assert response.status_code == 200, response.text
+    return {item["book_id"]: item["quantity"] for item in response.json()["items"]}
+
+def test_bulk_operations(cart_app):
+    app, book_ids, store = cart_app
+    response = post(app, "/cart/items:bulk", {"operations": [
+        {"op": "add", "book_id": book_ids[0], "quantity": 1},
+        {"op": "set", "book_id": book_ids[1], "quantity": 3},
+        {"op": "add", "book_id": book_ids[2], "quantity": 1},
+        {"op": "remove", "book_id": book_ids[2]},
+        {"op": "add", "book_id": book_ids[1], "quantity": 1},
+    ]})
+
+    assert quantities(response) == {book_ids[0]: 3, book_ids[1]: 4}
+    if store is not None:
+        assert store.pop_dirty() != []
+
+def test_merge_adds_guest_items(cart_app):
+    app, book_ids, _ = cart_app
+    response = post(app, "/cart/merge", {"items": [
+        {"book_id": book_ids[0], "quantity": 1},
+        {"book_id": book_ids[3], "quantity": 2},
+    ]})
+
+    assert quantities(response) == {book_ids[0]: 3, book_ids[3]: 2}
+
+def test_unknown_book_rejects_whole_batch(cart_app):
+    app, book_ids, _ = cart_app
+    response = post(app, "/cart/items:bulk", {"operations": [
+        {"op": "add", "book_id": book_ids[1], "quantity": 1},
+        {"op": "add", "book_id": str(uuid.uuid4()), "quantity": 1},
+    ]})
+    assert response.status_code == 404
+
+    response = post(app, "/cart/merge", {"items": []})
+    assert quantities(response) == {book_ids[0]: 2}
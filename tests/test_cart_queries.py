@@ -0,0 +1,63 @@
+"""
+Regressão do número de consultas de leitura do carrinho
+
+GET /cart e GET /cart/summary montam o carrinho com uma única consulta
+(load_cart_view), qualquer que seja o número de itens; antes eram 2N+2.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from tests.conftest import QueryCounter, load_service
+
+ITEMS = 5
+
+@pytest.fixture
+def cart_client(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+    from models.cart import Cart, CartItem
+    from models.user import User
+
+    cart_service = load_service("cart-service", "cart_service")
+
+    db = SessionLocal()
+    category = Category(name="Ficção", slug="ficcao")
+    user = User(email="leitor@example.com", password_hash="x", full_name="Leitor")
+    db.add_all([category, user])
+    db.flush()
+    books = [
+        Book(title=f"Livro {i}", author="Autor", isbn=f"978000000000{i}", publisher="Editora",
+             published_year=2000, price=10 + i, category_id=category.id, stock_quantity=10)
+        for i in range(ITEMS)
+    ]
+    db.add_all(books)
+    cart = Cart(user_id=user.id)
+    db.add(cart)
+    db.flush()
+    db.add_all([CartItem(cart_id=cart.id, book_id=book.id, quantity=2) for book in books])
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    cart_service.app.dependency_overrides[cart_service.get_user_id] = lambda: user_id
+    yield cart_service.app
+    cart_service.app.dependency_overrides.clear()
+
+def get(app, path: str) -> httpx.Response:
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path)
+    return asyncio.run(request())
+
+@pytest.mark.parametrize("path", ["/cart", "/cart/summary"])
+def test_cart_read_is_single_query(cart_client, db_engine, path):
+    with QueryCounter(db_engine) as counter:
+        response = get(cart_client, path)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == ITEMS
+    assert body["total_items"] == ITEMS * 2
+    assert counter.count == 1, counter.statements
@@ -0,0 +1,53 @@
+"""
+Cart store: carrinhos só deixam de ser sujos depois do commit e cópias
+carregadas antes de o carrinho ser consumido não voltam ao banco
+"""
+import uuid
+
+import pytest
+
+from core.cart_store import InMemoryCartStore, flush_dirty, ADD, PUT, REMOVE
+
+class FailingSession:
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("banco indisponível")
+
+    def query(self, *entities):
+        raise RuntimeError("banco indisponível")
+
+def test_failed_flush_keeps_carts_dirty():
+    store = InMemoryCartStore()
+    user_id = str(uuid.uuid4())
+    store.add(user_id, uuid.uuid4(), 1)
+
+    with pytest.raises(RuntimeError):
+        flush_dirty(FailingSession(), store)
+
+    assert store.pop_dirty() == [user_id]
+
+def test_discard_only_drops_older_copies():
+    store = InMemoryCartStore()
+    user_id = str(uuid.uuid4())
+    book_id = str(uuid.uuid4())
+    store.seed(user_id, {book_id: 2}, 3)
+    store.clear(user_id)
+    store.add(user_id, book_id, 1)
+
+    store.discard(user_id, 3)
+    assert store.load(user_id) == {book_id: 1}
+    assert store.version(user_id) == 3
+
+    store.discard(user_id, 4)
+    assert store.load(user_id) is None
+    assert store.version(user_id) is None
+
+def test_apply_runs_batch_and_marks_cart_dirty():
+    store = InMemoryCartStore()
+    user_id = str(uuid.uuid4())
+    kept, replaced, removed = (str(uuid.uuid4()) for _ in range(3))
+    store.seed(user_id, {kept: 2, replaced: 5, removed: 1}, 0)
+
+    store.apply(user_id, {kept: (ADD, 1), replaced: (PUT, 1), removed: (REMOVE, 0)})
+
+    assert store.load(user_id) == {kept: 3, replaced: 1}
+    assert store.pop_dirty() == [user_id]
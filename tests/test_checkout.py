@@ -0,0 +1,112 @@
+"""
+Checkout transacional: pedido, estoque, totais, carrinho e evento do outbox na
+mesma transação; com cart store, a cópia do carrinho anterior ao pedido não
+volta ao banco
+"""
+from decimal import Decimal
+
+import pytest
+
+import core.checkout as checkout
+from core import inventory
+from core.cart_store import InMemoryCartStore, load_cart_items, flush_cart
+from core.order_events import clear_cart_store
+
+@pytest.fixture
+def cart_user(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+    from models.cart import Cart, CartItem
+    from models.user import User
+
+    db = SessionLocal()
+    category = Category(name="Contos", slug="contos")
+    user = User(email="checkout@example.com", password_hash="x", full_name="Cliente")
+    db.add_all([category, user])
+    db.flush()
+    books = [
+        Book(title=f"Conto {i}", author="Autor", isbn=f"97800000003{i:02d}", publisher="Editora",
+             published_year=2000, price=10 + i, category_id=category.id, stock_quantity=5)
+        for i in range(2)
+    ]
+    cart = Cart(user_id=user.id)
+    db.add_all(books + [cart])
+    db.flush()
+    db.add_all([CartItem(cart_id=cart.id, book_id=book.id, quantity=1) for book in books])
+    db.commit()
+    yield db, user.id, [book.id for book in books]
+    db.close()
+
+def test_checkout_writes_order_stock_totals_and_event(cart_user):
+    from models.book import Book
+    from models.cart import CartItem
+    from models.order import Order, OrderItem, UserOrderSummary
+    from models.outbox import OutboxEvent
+
+    db, user_id, book_ids = cart_user
+    order = checkout.place_order(db, user_id, {"city": "Recife"}, "pix")
+
+    assert order["total_amount"] == Decimal("21.00")
+    assert [item["book_id"] for item in order["items"]] == sorted(book_ids, key=str)
+    assert db.query(Order).count() == 1 and db.query(OrderItem).count() == 2
+    assert [stock for (stock,) in db.query(Book.stock_quantity).all()] == [4, 4]
+    assert db.query(CartItem).count() == 0
+    summary = db.query(UserOrderSummary).filter(UserOrderSummary.user_id == user_id).one()
+    assert (summary.orders_count, summary.total_spent) == (1, Decimal("21.00"))
+    event = db.query(OutboxEvent).one()
+    assert event.payload["order_id"] == str(order["id"]) and event.payload["cart_version"] == 1
+
+    with pytest.raises(checkout.EmptyCart):
+        checkout.place_order(db, user_id, {"city": "Recife"}, "pix")
+
+def test_checkout_without_stock_keeps_cart(cart_user):
+    from models.book import Book
+    from models.cart import CartItem
+    from models.order import Order
+
+    db, user_id, book_ids = cart_user
+    db.query(Book).filter(Book.id == book_ids[1]).update({"stock_quantity": 0})
+    db.commit()
+
+    with pytest.raises(inventory.InsufficientStock) as error:
+        checkout.place_order(db, user_id, {"city": "Recife"}, "pix")
+
+    assert error.value.book_ids == [book_ids[1]]
+    assert db.query(Order).count() == 0
+    assert db.query(CartItem).count() == 2
+    assert db.query(Book.stock_quantity).filter(Book.id == book_ids[0]).scalar() == 5
+
+def test_checkout_discards_store_copy_and_stale_flush_writes_nothing(cart_user, monkeypatch):
+    from models.cart import CartItem
+
+    db, user_id, book_ids = cart_user
+    store = InMemoryCartStore()
+    stale = InMemoryCartStore()  # outro worker com a cópia carregada antes do checkout
+    load_cart_items(store, db, user_id)
+    load_cart_items(stale, db, user_id)
+    monkeypatch.setattr(checkout, "get_cart_store", lambda: store)
+
+    order = checkout.place_order(db, user_id, {"city": "Recife"}, "pix")
+    assert len(order["items"]) == 2
+    assert store.load(str(user_id)) is None
+
+    flush_cart(db, user_id, stale)
+    db.commit()
+    assert db.query(CartItem).count() == 0
+    assert stale.load(str(user_id)) is None
+
+def test_outbox_retry_keeps_items_added_after_checkout(cart_user, monkeypatch):
+    import core.order_events as order_events
+
+    db, user_id, book_ids = cart_user
+    store = InMemoryCartStore()
+    load_cart_items(store, db, user_id)
+    monkeypatch.setattr(checkout, "get_cart_store", lambda: store)
+    monkeypatch.setattr(order_events, "get_cart_store", lambda: store)
+
+    order = checkout.place_order(db, user_id, {"city": "Recife"}, "pix")
+    load_cart_items(store, db, user_id)
+    store.add(str(user_id), str(book_ids[0]), 1)
+
+    clear_cart_store(db, {"order_id": str(order["id"]), "user_id": str(user_id), "book_ids": [], "cart_version": 1})
+    assert store.load(str(user_id)) == {str(book_ids[0]): 1}
@@ -0,0 +1,28 @@
+"""
+Re-ranking por diversidade: livros sem autor não dividem o limite por autor
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from ml.content_based import ContentBasedRecommender, MISSING_CODE
+from ml.diversity import DiversityReranker
+
+def test_missing_authors_get_sentinel_code():
+    codes = ContentBasedRecommender._encode(["Machado", None, " machado ", "", "Clarice"])
+    assert codes[0] == codes[2]
+    assert codes[1] == codes[3] == MISSING_CODE
+    assert codes[4] not in (codes[0], MISSING_CODE)
+
+def test_books_without_author_are_not_capped_together():
+    books = ["a1", "a2", "n1", "n2"]
+    content = SimpleNamespace(
+        book_index={book_id: index for index, book_id in enumerate(books)},
+        similarity_matrix=np.zeros((4, 4)),
+        author_codes=ContentBasedRecommender._encode(["Autor", "Autor", None, ""]),
+        category_codes=None,
+    )
+    reranker = DiversityReranker(content, lambda_param=1.0, max_per_author=1)
+    candidates = [("a1", 0.9), ("a2", 0.8), ("n1", 0.7), ("n2", 0.6)]
+
+    assert [book_id for book_id, _ in reranker.rerank(candidates, 3)] == ["a1", "n1", "n2"]
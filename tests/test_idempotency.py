@@ -0,0 +1,105 @@
+"""
+Idempotency-Key: repetição, corpo diferente, duplicatas concorrentes e escopo por pedido
+
+As travas usam SET LOCAL lock_timeout e SELECT ... FOR UPDATE: precisa de um
+PostgreSQL em TEST_POSTGRES_URL; sem ele os testes são pulados.
+"""
+import asyncio
+import os
+import uuid
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from tests.conftest import load_service
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL não definida")
+
+@pytest.fixture
+def idempotency(monkeypatch):
+    import core.idempotency as idempotency
+    from models.idempotency import IdempotencyKey
+
+    engine = create_engine(POSTGRES_URL)
+    IdempotencyKey.__table__.create(engine, checkfirst=True)
+    monkeypatch.setattr(idempotency, "LockSession", sessionmaker(bind=engine))
+    keys = []
+    yield idempotency, keys
+    with engine.begin() as connection:
+        connection.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys)))
+    engine.dispose()
+
+def counting_handler(calls, delay=0.0):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"id": len(calls)}
+    return handler
+
+def test_repeated_key_replays_stored_response(idempotency):
+    module, keys = idempotency
+    key = str(uuid.uuid4())
+    keys.append(key)
+    calls = []
+
+    async def run():
+        first = await module.run_idempotent(key, "test:replay", {"a": 1}, counting_handler(calls), status_code=201)
+        second = await module.run_idempotent(key, "test:replay", {"a": 1}, counting_handler(calls), status_code=201)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert calls == [1]
+    assert second.status_code == 201 and second.body == first.body
+    assert second.headers[module.REPLAYED_HEADER] == "true"
+
+def test_same_key_with_other_body_is_rejected(idempotency):
+    module, keys = idempotency
+    key = str(uuid.uuid4())
+    keys.append(key)
+
+    async def run():
+        await module.run_idempotent(key, "test:reuse", {"a": 1}, counting_handler([]))
+        await module.run_idempotent(key, "test:reuse", {"a": 2}, counting_handler([]))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 422
+
+def test_concurrent_duplicates_run_handler_once(idempotency):
+    module, keys = idempotency
+    key = str(uuid.uuid4())
+    keys.append(key)
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*[
+            module.run_idempotent(key, "test:concurrent", {"a": 1}, counting_handler(calls, delay=0.2))
+            for _ in range(3)
+        ])
+
+    responses = asyncio.run(run())
+    assert calls == [1]
+    assert sorted(module.REPLAYED_HEADER in response.headers for response in responses) == [False, True, True]
+
+def test_payment_keys_are_scoped_per_order(idempotency):
+    _, keys = idempotency
+    payment = load_service("payment-service", "payment_service")
+    key = str(uuid.uuid4())
+    keys.append(key)
+
+    async def run():
+        transport = httpx.ASGITransport(app=payment.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://payment") as client:
+            return [
+                await client.post("/payments", json={"order_id": order_id, "amount": 10}, headers={"Idempotency-Key": key})
+                for order_id in (str(uuid.uuid4()), str(uuid.uuid4()))
+            ]
+
+    first, second = asyncio.run(run())
+    assert first.status_code == second.status_code == 200
+    assert first.json()["payment_id"] != second.json()["payment_id"]
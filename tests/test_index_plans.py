@@ -0,0 +1,30 @@
+"""
+Planos das consultas usam os índices esperados (utils/explain_indexes.py)
+
+Precisa de um PostgreSQL migrado (alembic upgrade head) em TEST_POSTGRES_URL;
+sem ele o teste é pulado.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL não definida")
+
+def test_queries_use_expected_indexes():
+    from utils.explain_indexes import check_indexes
+
+    engine = create_engine(POSTGRES_URL)
+    db = Session(bind=engine)
+    try:
+        results = check_indexes(db)
+    finally:
+        db.rollback()
+        db.close()
+        engine.dispose()
+
+    missing = [f"{description}: esperado {expected}, usados {sorted(used)}" for description, expected, used in results if expected not in used]
+    assert not missing, "\n".join(missing)
@@ -0,0 +1,67 @@
+"""
+Estoque em lote: um UPDATE para todos os itens, tudo ou nada, e liberação sem devolver em dobro
+"""
+import pytest
+
+from core import inventory
+from tests.conftest import QueryCounter
+
+@pytest.fixture
+def stock(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+
+    db = SessionLocal()
+    category = Category(name="Teatro", slug="teatro")
+    db.add(category)
+    db.flush()
+    books = [
+        Book(title=f"Peça {i}", author="Autor", isbn=f"97800000006{i:02d}", publisher="Editora",
+             published_year=2000, price=10, category_id=category.id, stock_quantity=3)
+        for i in range(3)
+    ]
+    db.add_all(books)
+    db.commit()
+    yield db, [book.id for book in books]
+    db.close()
+
+def quantities(db, book_ids):
+    from models.book import Book
+
+    stock = dict(db.query(Book.id, Book.stock_quantity).filter(Book.id.in_(book_ids)).all())
+    return [stock[book_id] for book_id in book_ids]
+
+def test_decrement_is_one_statement_and_sums_repeated_ids(stock, db_engine):
+    db, book_ids = stock
+    items = [{"book_id": book_id, "quantity": 1} for book_id in book_ids] + [{"book_id": book_ids[0], "quantity": 1}]
+
+    with QueryCounter(db_engine) as counter:
+        remaining = inventory.decrement_stock(db, items)
+    db.commit()
+
+    assert counter.count == 1
+    assert remaining == {book_ids[0]: 1, book_ids[1]: 2, book_ids[2]: 2}
+    assert quantities(db, book_ids) == [1, 2, 2]
+
+def test_insufficient_stock_changes_nothing(stock):
+    db, book_ids = stock
+    with pytest.raises(inventory.InsufficientStock) as error:
+        inventory.decrement_stock(db, [{"book_id": book_ids[0], "quantity": 1}, {"book_id": book_ids[1], "quantity": 4}])
+    db.rollback()
+
+    assert error.value.book_ids == [book_ids[1]]
+    assert quantities(db, book_ids) == [3, 3, 3]
+
+def test_release_returns_stock_once(stock):
+    db, book_ids = stock
+    reservation = inventory.reserve(db, [{"book_id": book_ids[0], "quantity": 2}])
+    db.commit()
+    assert quantities(db, book_ids)[0] == 1
+
+    inventory.release_reservation(db, reservation.id)
+    db.commit()
+    with pytest.raises(inventory.ReservationStateError):
+        inventory.release_reservation(db, reservation.id)
+    db.rollback()
+
+    assert quantities(db, book_ids)[0] == 3
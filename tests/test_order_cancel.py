@@ -0,0 +1,33 @@
+"""
+Cancelamento condicional: cancelar duas vezes só conta o pedido uma vez
+"""
+import uuid
+from decimal import Decimal
+
+from core.order_status import cancel_order
+from models.order import OrderStatus
+
+def test_second_cancel_does_not_touch_totals(db_engine):
+    from core.database import SessionLocal
+    from models.order import Order, UserOrderSummary
+    from models.user import User
+
+    db = SessionLocal()
+    user = User(email="cliente@example.com", password_hash="x", full_name="Cliente")
+    db.add(user)
+    db.flush()
+    order = Order(
+        id=uuid.uuid4(), user_id=user.id, status=OrderStatus.PENDING, total_amount=Decimal("30.00"),
+        shipping_address={}, payment_method="pix"
+    )
+    db.add_all([order, UserOrderSummary(user_id=user.id, orders_count=1, cancelled_count=0, total_spent=Decimal("30.00"))])
+    db.commit()
+
+    assert cancel_order(db, order.id, [OrderStatus.PENDING]) is True
+    assert cancel_order(db, order.id, [OrderStatus.PENDING]) is False
+    db.commit()
+
+    summary = db.query(UserOrderSummary).filter(UserOrderSummary.user_id == user.id).one()
+    assert summary.cancelled_count == 1
+    assert summary.total_spent == Decimal("0.00")
+    db.close()
@@ -0,0 +1,46 @@
+"""
+Histórico de pedidos: cursor keyset e cursores com valores de outro tipo
+"""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from core.order_history import order_history, HISTORY_SORT_FIELDS
+from core.pagination import encode_cursor
+from models.order import OrderStatus
+
+def test_history_pages_with_cursor(db_engine):
+    from core.database import SessionLocal
+    from models.order import Order
+    from models.user import User
+
+    db = SessionLocal()
+    user = User(email="historico@example.com", password_hash="x", full_name="Cliente")
+    db.add(user)
+    db.flush()
+    start = datetime(2026, 1, 1)
+    db.add_all([
+        Order(
+            id=uuid.uuid4(), user_id=user.id, status=OrderStatus.PENDING, total_amount=Decimal("10.00"),
+            shipping_address={}, payment_method="pix", created_at=start + timedelta(days=day)
+        )
+        for day in range(3)
+    ])
+    db.commit()
+
+    first, cursor = order_history(db, user.id, limit=2)
+    second, last_cursor = order_history(db, user.id, limit=2, cursor=cursor)
+    assert [row["created_at"].day for row in first + second] == [3, 2, 1]
+    assert last_cursor is None
+    db.close()
+
+@pytest.mark.parametrize("values", [[123, 456], [None, str(uuid.uuid4())], ["2026-01-01T00:00:00", ["x"]]])
+def test_cursor_with_non_string_values_is_value_error(db_engine, values):
+    from core.database import SessionLocal
+
+    db = SessionLocal()
+    with pytest.raises(ValueError):
+        order_history(db, uuid.uuid4(), cursor=encode_cursor(HISTORY_SORT_FIELDS, values))
+    db.close()
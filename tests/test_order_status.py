@@ -0,0 +1,77 @@
+"""
+Status em lote: um UPDATE para todas as mudanças, com a transição validada no WHERE
+"""
+import uuid
+from decimal import Decimal
+
+from core import inventory
+from core.order_status import bulk_transition
+from models.order import OrderStatus
+from schemas.order import OrderStatusChange, OrderStatusResult
+
+def test_bulk_transition_classifies_each_change(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+    from models.inventory import ReservationStatus
+    from models.order import Order, UserOrderSummary
+    from models.user import User
+
+    db = SessionLocal()
+    category = Category(name="Crônicas", slug="cronicas")
+    user = User(email="admin-lote@example.com", password_hash="x", full_name="Cliente")
+    db.add_all([category, user])
+    db.flush()
+    book = Book(title="Crônica", author="Autor", isbn="9780000000701", publisher="Editora",
+                published_year=2000, price=10, category_id=category.id, stock_quantity=5)
+    orders = {
+        status: Order(id=uuid.uuid4(), user_id=user.id, status=status, total_amount=Decimal("10.00"),
+                      shipping_address={}, payment_method="pix")
+        for status in (OrderStatus.PENDING, OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+    }
+    db.add_all([book, *orders.values(), UserOrderSummary(user_id=user.id, orders_count=4, cancelled_count=0, total_spent=Decimal("40.00"))])
+    db.flush()
+    inventory.reserve(db, [{"book_id": book.id, "quantity": 2}], order_id=orders[OrderStatus.PAID].id, status=ReservationStatus.COMMITTED)
+    db.commit()
+
+    missing = uuid.uuid4()
+    results = bulk_transition(db, [
+        OrderStatusChange(order_id=orders[OrderStatus.PENDING].id, status=OrderStatus.PAID),
+        OrderStatusChange(order_id=orders[OrderStatus.PAID].id, status=OrderStatus.CANCELLED),
+        OrderStatusChange(order_id=orders[OrderStatus.SHIPPED].id, status=OrderStatus.DELIVERED, tracking_code="BR123"),
+        OrderStatusChange(order_id=orders[OrderStatus.DELIVERED].id, status=OrderStatus.DELIVERED),
+        OrderStatusChange(order_id=orders[OrderStatus.DELIVERED].id, status=OrderStatus.PENDING),
+        OrderStatusChange(order_id=missing, status=OrderStatus.PAID),
+    ])
+
+    assert [(result["order_id"], result["result"], result["status"]) for result in results] == [
+        (orders[OrderStatus.PENDING].id, OrderStatusResult.UPDATED, OrderStatus.PAID),
+        (orders[OrderStatus.PAID].id, OrderStatusResult.UPDATED, OrderStatus.CANCELLED),
+        (orders[OrderStatus.SHIPPED].id, OrderStatusResult.UPDATED, OrderStatus.DELIVERED),
+        (orders[OrderStatus.DELIVERED].id, OrderStatusResult.INVALID_TRANSITION, OrderStatus.DELIVERED),
+        (missing, OrderStatusResult.NOT_FOUND, None),
+    ]
+
+    db.expire_all()
+    assert db.query(Order.tracking_code).filter(Order.id == orders[OrderStatus.SHIPPED].id).scalar() == "BR123"
+    assert db.query(Book.stock_quantity).filter(Book.id == book.id).scalar() == 5
+    summary = db.query(UserOrderSummary).filter(UserOrderSummary.user_id == user.id).one()
+    assert (summary.cancelled_count, summary.total_spent) == (1, Decimal("30.00"))
+    db.close()
+
+def test_repeated_status_is_unchanged(db_engine):
+    from core.database import SessionLocal
+    from models.order import Order
+    from models.user import User
+
+    db = SessionLocal()
+    user = User(email="admin-repetido@example.com", password_hash="x", full_name="Cliente")
+    db.add(user)
+    db.flush()
+    order = Order(id=uuid.uuid4(), user_id=user.id, status=OrderStatus.PAID, total_amount=Decimal("10.00"),
+                  shipping_address={}, payment_method="pix")
+    db.add(order)
+    db.commit()
+
+    [result] = bulk_transition(db, [OrderStatusChange(order_id=order.id, status=OrderStatus.PAID)])
+    assert (result["result"], result["status"]) == (OrderStatusResult.UNCHANGED, OrderStatus.PAID)
+    db.close()
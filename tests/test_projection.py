@@ -0,0 +1,40 @@
+"""
+fields= no snapshot: o resumo é montado uma vez por livro e acompanha as alterações
+"""
+from core.projection import parse_fields, project
+from schemas.book import BOOK_SUMMARY_FIELDS
+from tests.conftest import load_service
+
+def test_snapshot_projections_match_full_payloads(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+
+    snapshot_module = load_service("catalog-service", "catalog_snapshot")
+    db = SessionLocal()
+    category = Category(name="Ensaios", slug="ensaios")
+    db.add(category)
+    db.flush()
+    books = [
+        Book(title=f"Ensaio {i}", author="Autora", isbn=f"97800000005{i:02d}", publisher="Editora",
+             published_year=2000, price=10 + i, category_id=category.id, stock_quantity=1)
+        for i in range(3)
+    ]
+    db.add_all(books)
+    db.commit()
+
+    snapshot = snapshot_module.CatalogSnapshot()
+    snapshot.load(db)
+    full, _, _ = snapshot.query_page(sort_by="price")
+    summary, _, _ = snapshot.query_page(sort_by="price", projection=parse_fields("summary"))
+    titles, _, _ = snapshot.query_page(sort_by="price", projection=parse_fields("title"))
+
+    assert summary == project(full, BOOK_SUMMARY_FIELDS)
+    assert titles == [{"title": book["title"]} for book in full]
+
+    books[0].title = "Ensaio revisto"
+    db.commit()
+    snapshot._upsert([books[0]])
+    summary, _, _ = snapshot.query_page(sort_by="price", projection=BOOK_SUMMARY_FIELDS)
+    revised = next(book for book in summary if book["id"] == str(books[0].id))
+    assert revised["title"] == "Ensaio revisto"
+    db.close()
@@ -0,0 +1,63 @@
+"""
+Cache de respostas: invalidação por rota, gravações atrasadas e 304 pelo gateway
+"""
+import asyncio
+
+import httpx
+
+from core.cache import ResponseCache
+from tests.conftest import load_service
+
+def test_invalidate_paths_keeps_other_routes():
+    cache = ResponseCache()
+    cache.get_or_set("/books/a?", lambda: b'"a"')
+    cache.get_or_set("/books/a?fields=title", lambda: b'"a-title"')
+    cache.get_or_set("/categories?", lambda: b"[]")
+
+    cache.invalidate_paths(["/books/a"])
+
+    assert cache.get_or_set("/books/a?", lambda: b'"a2"').body == b'"a2"'
+    assert cache.get_or_set("/books/a?fields=title", lambda: b'"a2-title"').body == b'"a2-title"'
+    assert cache.get_or_set("/categories?", lambda: b'["new"]').body == b"[]"
+
+def test_response_built_before_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    def stale_build():
+        # Outra requisição invalida enquanto esta monta a resposta antiga
+        cache.invalidate_paths(["/books/a"])
+        return b'"old"'
+
+    assert cache.get_or_set("/books/a?", stale_build).body == b'"old"'
+    assert cache.get_or_set("/books/a?", lambda: b'"new"').body == b'"new"'
+
+def test_gateway_forwards_if_none_match_and_returns_empty_304():
+    gateway = load_service("api-gateway", "api_gateway")
+    seen = []
+
+    def catalog(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("if-none-match"))
+        headers = {"ETag": '"v1"', "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, json=[{"id": "1"}], headers=headers)
+
+    async def run():
+        original = gateway.http_client
+        gateway.http_client = httpx.AsyncClient(transport=httpx.MockTransport(catalog))
+        try:
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                first = await client.get("/api/v1/categories")
+                second = await client.get("/api/v1/categories", headers={"If-None-Match": first.headers["etag"]})
+        finally:
+            await gateway.http_client.aclose()
+            gateway.http_client = original
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200 and first.json() == [{"id": "1"}]
+    assert first.headers["etag"] == '"v1"'
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["etag"] == '"v1"'
+    assert seen == [None, '"v1"']
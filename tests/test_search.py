@@ -0,0 +1,51 @@
+"""
+Busca ranqueada acima de SEARCH_MAX_RESULTS não descarta resultados
+"""
+from core.search import InMemorySearchBackend
+
+def test_search_beyond_max_results_keeps_every_match(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+
+    db = SessionLocal()
+    category = Category(name="Romance", slug="romance")
+    db.add(category)
+    db.flush()
+    db.add_all([
+        Book(title=f"Romance {i}", author="Autor", isbn=f"97800000001{i:02d}", publisher="Editora",
+             published_year=2000, price=10, category_id=category.id, stock_quantity=1)
+        for i in range(5)
+    ] + [
+        Book(title="Poesia", author="Outro", isbn="9780000000999", publisher="Editora",
+             published_year=2000, price=10, category_id=category.id, stock_quantity=1)
+    ])
+    db.commit()
+
+    backend = InMemorySearchBackend(max_results=3)
+    assert len(backend.search(db, "romance", None)) == 5
+
+    query, rank = backend.apply(db, db.query(Book), "romance")
+    assert query.count() == 5
+    db.close()
+
+def test_fallback_sql_does_not_grow_with_matches_and_escapes_like(db_engine):
+    from core.database import SessionLocal
+    from models.book import Book, Category
+
+    db = SessionLocal()
+    category = Category(name="Técnicos", slug="tecnicos")
+    db.add(category)
+    db.flush()
+    db.add_all([
+        Book(title=title, author="Autor", isbn=f"97800000002{i:02d}", publisher="Editora",
+             published_year=2000, price=10, category_id=category.id, stock_quantity=1)
+        for i, title in enumerate(["snake_case um", "snake_case dois", "snakexcase tres"])
+    ])
+    db.commit()
+
+    backend = InMemorySearchBackend(max_results=1)
+    query, rank = backend.apply(db, db.query(Book.title), "snake_case")
+
+    assert sorted(title for title, in query.all()) == ["snake_case dois", "snake_case um"]
+    assert " IN (" not in str(query.statement.compile(db.get_bind()))
+    db.close()
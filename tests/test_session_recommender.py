@@ -0,0 +1,47 @@
+"""
+Recomendações de sessão: buffer compartilhado, só misturado no modo hybrid e
+alimentado pelas compras do outbox
+"""
+import uuid
+from types import SimpleNamespace
+
+from core import order_events
+from core.session_store import InMemorySessionStore
+from ml.hybrid_recommender import HybridRecommender
+from ml.session_recommender import SessionRecommender
+from models.recommendation import InteractionType, INTERACTION_WEIGHTS
+
+def content_model(book_ids):
+    return SimpleNamespace(book_index={book_id: index for index, book_id in enumerate(book_ids)})
+
+def test_workers_share_the_session_store():
+    store = InMemorySessionStore()
+    content = content_model(["b1", "b2"])
+    worker_a = SessionRecommender(content, store=store)
+    worker_b = SessionRecommender(content, store=store)
+
+    worker_a.record_interaction("u1", "b2", 3.0)
+    worker_a.record_interaction("u1", "desconhecido")
+
+    assert worker_b.get_session("u1") == [(1, 3.0)]
+
+def test_session_is_blended_only_into_hybrid(tmp_path, monkeypatch):
+    recommender = HybridRecommender(str(tmp_path))
+    long_term = [("b1", 1.0, None)]
+    monkeypatch.setattr(recommender, "_get_content_recommendations", lambda *args: long_term)
+    monkeypatch.setattr(recommender, "_get_collaborative_recommendations", lambda *args: long_term)
+    monkeypatch.setattr(recommender, "_get_hybrid_recommendations", lambda *args: long_term)
+    monkeypatch.setattr(recommender.session_recommender, "get_recommendations", lambda *args: [("s1", 1.0, None)])
+
+    for algorithm in ("content", "collaborative"):
+        assert recommender.get_user_recommendations("u1", [], 5, algorithm) == [("b1", 1.0)]
+    assert {book_id for book_id, _ in recommender.get_user_recommendations("u1", [], 5, "hybrid")} == {"b1", "s1"}
+
+def test_order_purchases_reach_the_session(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(order_events, "get_session_store", lambda: store)
+    user_id, book_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+    order_events.record_purchase_sessions(None, {"order_id": str(uuid.uuid4()), "user_id": user_id, "book_ids": [book_id]})
+
+    assert store.get(user_id) == [(book_id, INTERACTION_WEIGHTS[InteractionType.PURCHASE])]
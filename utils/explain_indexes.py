@@ -0,0 +1,143 @@
+"""
+Verifica, via EXPLAIN, que as consultas dos repositórios/serviços usam os índices esperados
+
+Cada caso executa a consulta real (método do repositório ou a mesma forma de
+query usada pelo serviço), captura o SQL emitido e roda EXPLAIN (FORMAT JSON)
+com enable_seqscan = off: assim o teste mede se o índice *pode* servir a
+consulta, independente do volume de dados do banco local.
+
+Uso (na raiz do projeto, com DATABASE_URL apontando para um PostgreSQL migrado):
+    python utils/explain_indexes.py
+
+Sai com código 1 se algum caso não usar o índice esperado. Os mesmos casos
+rodam na suíte de testes (tests/test_index_plans.py) quando
+TEST_POSTGRES_URL aponta para um PostgreSQL migrado.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime
+from typing import Callable, List, Set, Tuple, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal, engine
+from models.user import User
+from models.book import Book, Category
+from models.order import Order, OrderItem, OrderStatus
+from models.review import Review
+from models.cart import Cart, CartItem
+from models.recommendation import UserInteraction
+from repositories.book_repository import BookRepository, BookTagRepository
+from repositories.user_repository import UserRepository
+
+def _first_id(db: Session, column) -> Any:
+    """Um id existente (ou aleatório se a tabela estiver vazia) para parametrizar as consultas."""
+    value = db.query(column).limit(1).scalar()
+    return value if value is not None else uuid.uuid4()
+
+def build_cases(db: Session) -> List[Tuple[str, Callable[[], Any], str]]:
+    """(descrição, consulta, índice esperado)"""
+    book_id = _first_id(db, Book.id)
+    category_id = _first_id(db, Category.id)
+    user_id = _first_id(db, User.id)
+    cart_id = _first_id(db, Cart.id)
+    order_id = _first_id(db, Order.id)
+    books = BookRepository(db)
+
+    return [
+        ("BookRepository.search_books relevance",
+         lambda: books.search_books({"sort_by": "relevance", "limit": 20}), "ix_books_rating"),
+        ("BookRepository.search_books rating",
+         lambda: books.search_books({"sort_by": "rating", "limit": 20}), "ix_books_rating_id"),
+        ("BookRepository.search_books price_asc",
+         lambda: books.search_books({"sort_by": "price_asc", "limit": 20}), "ix_books_price"),
+        ("BookRepository.search_books newest",
+         lambda: books.search_books({"sort_by": "newest", "limit": 20}), "ix_books_created_at"),
+        ("BookRepository.search_books category + relevance",
+         lambda: books.search_books({"category_id": str(category_id), "limit": 20}), "ix_books_category_rating"),
+        ("BookRepository.get_books_by_category",
+         lambda: books.get_books_by_category(str(category_id)), "ix_books_category_rating"),
+        ("BookRepository.get_recent_books",
+         lambda: books.get_recent_books(), "ix_books_created_at"),
+        ("BookTagRepository.get_by_book_id",
+         lambda: BookTagRepository(db).get_by_book_id(book_id), "ix_book_tags_book_id"),
+        ("UserRepository.get_by_email",
+         lambda: UserRepository(db).get_by_email("explain@example.com"), "ix_users_email"),
+        ("catalog snapshot refresh (updated_at >= marca d'água)",
+         lambda: db.query(Book.id).filter(Book.updated_at >= datetime(2000, 1, 1)).all(), "ix_books_updated_at"),
+        ("cart-service item do carrinho (cart_id, book_id)",
+         lambda: db.query(CartItem).filter(CartItem.cart_id == cart_id, CartItem.book_id == book_id).first(),
+         "ix_cart_items_cart_id_book_id"),
+        ("orders-service pedidos do usuário por status",
+         lambda: db.query(Order).filter(Order.user_id == user_id, Order.status == OrderStatus.PENDING).all(),
+         "ix_orders_user_id_status"),
+        ("orders histórico do usuário (created_at desc)",
+         lambda: db.query(Order).filter(Order.user_id == user_id).order_by(Order.created_at.desc()).limit(20).all(),
+         "ix_orders_user_id_created_at"),
+        ("order_items de um pedido",
+         lambda: db.query(OrderItem).filter(OrderItem.order_id == order_id).all(), "ix_order_items_order_id"),
+        ("recommendation perfil do usuário",
+         lambda: db.query(UserInteraction.book_id, UserInteraction.interaction_value)
+         .filter(UserInteraction.user_id == user_id).all(), "ix_user_interactions_user_id"),
+        ("reviews de um livro",
+         lambda: db.query(Review).filter(Review.book_id == book_id).order_by(Review.created_at.desc()).all(),
+         "ix_reviews_book_id"),
+    ]
+
+def _plan_indexes(plan: dict) -> Set[str]:
+    """Nomes de índice usados em qualquer nó do plano."""
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= _plan_indexes(child)
+    return found
+
+def explain_case(db: Session, run: Callable[[], Any]) -> Set[str]:
+    """Executa a consulta capturando o SQL e devolve os índices usados nos planos."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+    used = set()
+    for statement, parameters in statements:
+        result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        used |= _plan_indexes(result.scalar()[0]["Plan"])
+    return used
+
+def check_indexes(db: Session) -> List[Tuple[str, str, Set[str]]]:
+    """(descrição, índice esperado, índices usados) de cada caso, com seq scan desligado na sessão."""
+    db.connection().exec_driver_sql("SET enable_seqscan = off")
+    return [(description, expected, explain_case(db, run)) for description, run, expected in build_cases(db)]
+
+def main() -> int:
+    db = SessionLocal()
+    failures = 0
+    try:
+        for description, expected, used in check_indexes(db):
+            ok = expected in used
+            failures += not ok
+            print(f"[{'OK' if ok else 'FALHA'}] {description} | esperado={expected} | usados={sorted(used) or '-'}")
+    finally:
+        db.rollback()
+        db.close()
+        engine.dispose()
+
+    print(f"\n{failures} falha(s)" if failures else "\nTodos os casos usam os índices esperados")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())